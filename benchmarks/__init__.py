@@ -0,0 +1 @@
+"""Synthetic workbooks and stage timings for the EHS Student Outcomes Dashboard."""
@@ -0,0 +1,156 @@
+"""Synthetic "All Students" workbooks for benchmarking.
+
+    python -m benchmarks.generate --rows 100000 --out benchmarks/data/outcomes-100000.xlsx
+
+Rows follow the 19-column layout of outcomes.schema with plausible value
+distributions: more recent graduation years are more common, a little over
+half of the students go to graduate school, degrees and graduate school
+types depend on the post-graduation route, GPAs are roughly normal and a
+few cells are 'N/A' like in the real workbook. The same seed always gives
+the same workbook.
+"""
+
+import argparse
+from pathlib import Path
+
+import numpy as np
+import openpyxl
+import pandas as pd
+
+from outcomes.schema import COLUMNS, SHEET_NAME
+
+SIZES = {'1k': 1000, '100k': 100000, '1m': 1000000}
+
+FIRST_NAMES = ['Aaliyah', 'Amara', 'Ayanna', 'Brianna', 'Camille', 'Chloe', 'Destiny', 'Imani', 'Jada', 'Jasmine',
+               'Kayla', 'Kennedy', 'Laila', 'Maya', 'Morgan', 'Nia', 'Sydney', 'Taylor', 'Zoe', 'Zuri']
+LAST_NAMES = ['Adams', 'Baker', 'Brown', 'Carter', 'Davis', 'Edwards', 'Franklin', 'Green', 'Harris', 'Jackson',
+              'Johnson', 'Jones', 'King', 'Lewis', 'Mitchell', 'Moore', 'Parker', 'Robinson', 'Scott', 'Smith',
+              'Taylor', 'Thomas', 'Thompson', 'Walker', 'Washington', 'White', 'Williams', 'Wilson', 'Wright', 'Young']
+SCHOOLS = ['Emory University', 'Morehouse School of Medicine', 'Georgia Institute of Technology', 'Georgia State University',
+           'Johns Hopkins University', 'Howard University', 'Meharry Medical College', 'Duke University',
+           'University of Michigan', 'Columbia University', 'Tulane University', 'University of North Carolina at Chapel Hill',
+           'Xavier University of Louisiana', 'Vanderbilt University', 'University of Georgia']
+
+# route: (share of graduate students, {highest degree: share}, graduate school types, majors)
+ROUTES = {
+    'Masters Professional': (0.28, {'M.P.H.': 0.6, 'M.B.A.': 0.15, 'M.S.W.': 0.15, 'No Degree': 0.1},
+                             ['Public Health', 'Business School', 'Social Work'], ['Epidemiology', 'Health Policy', 'Global Health', 'Business Administration']),
+    'Masters Biomedical': (0.18, {'M.S.': 0.85, 'No Degree': 0.15},
+                           ['Graduate School'], ['Biomedical Sciences', 'Environmental Science', 'Toxicology', 'Chemistry']),
+    'Doctorate Professional': (0.2, {'M.D.': 0.55, 'D.D.S.': 0.15, 'Pharm.D.': 0.15, 'D.P.T.': 0.1, 'No Degree': 0.05},
+                               ['Medical School', 'Dental School', 'Pharmacy School', 'Physical Therapy'], ['Medicine', 'Dentistry', 'Pharmacy', 'Physical Therapy']),
+    'Doctorate Biomedical': (0.12, {'Ph.D.': 0.7, 'M.D./Ph.D.': 0.2, 'No Degree': 0.1},
+                             ['Graduate School', 'Medical School'], ['Biomedical Sciences', 'Neuroscience', 'Immunology']),
+    'Ph.D.': (0.17, {'Ph.D.': 0.85, 'No Degree': 0.15},
+              ['Graduate School'], ['Environmental Health Sciences', 'Epidemiology', 'Chemistry', 'Toxicology']),
+    'Unknown': (0.05, {'No Degree': 1.0}, ['Graduate School'], ['Undecided']),
+}
+
+NA_SHARE = 0.03
+
+
+def _choice(rng, values, n, weights=None):
+    weights = None if weights is None else np.asarray(weights, dtype=float) / np.sum(weights)
+    return rng.choice(np.asarray(values, dtype=object), n, p=weights)
+
+
+def generate_outcomes(n_rows, seed=0):
+    # A DataFrame with the columns of the "All Students" sheet, as the workbook stores them
+    rng = np.random.default_rng(seed)
+    n = n_rows
+
+    years = np.arange(2005, 2025)
+    year = _choice(rng, years, n, weights=np.linspace(1, 3, len(years)))
+    grad = _choice(rng, ['Yes', 'No'], n, weights=[0.55, 0.45])
+    is_grad = grad == 'Yes'
+
+    route = np.full(n, 'Work', dtype=object)
+    route[is_grad] = _choice(rng, list(ROUTES), is_grad.sum(), weights=[spec[0] for spec in ROUTES.values()])
+    degree = np.full(n, 'No Degree', dtype=object)
+    school_type = np.full(n, None, dtype=object)
+    grad_major = np.full(n, None, dtype=object)
+    for name, (_, degrees, types, majors) in ROUTES.items():
+        rows = np.flatnonzero(route == name)
+        degree[rows] = _choice(rng, list(degrees), len(rows), weights=list(degrees.values()))
+        school_type[rows] = _choice(rng, types, len(rows))
+        grad_major[rows] = _choice(rng, majors, len(rows))
+    school = np.where(is_grad, _choice(rng, SCHOOLS, n, weights=1 / np.arange(1, len(SCHOOLS) + 1)), None)
+
+    gpa = np.clip(rng.normal(3.25, 0.4, n), 2.0, 4.0).round(2)
+    overall_gpa = np.clip(gpa + rng.normal(0, 0.08, n), 2.0, 4.0).round(2)
+    gpa = gpa.astype(object)
+    gpa[rng.random(n) < NA_SHARE] = 'N/A'
+
+    phone = [f"{area}-555-{number:04d}" for area, number in zip(_choice(rng, ['404', '470', '678', '770'], n), rng.integers(0, 10000, n))]
+    df = pd.DataFrame({
+        'SCHOLARS': np.where(rng.random(n) < 0.35, _choice(rng, ['MARC', 'RISE', 'MBRS', 'Honors'], n), None),
+        'LAST NAME': _choice(rng, LAST_NAMES, n, weights=1 / np.arange(1, len(LAST_NAMES) + 1) ** 0.5),
+        'FIRST NAME': _choice(rng, FIRST_NAMES, n),
+        '900#': [f"9{i:08d}" for i in range(n)],
+        'MAJOR': _choice(rng, ['Environmental Science', 'Health Science', 'Public Health', 'Biology'], n, weights=[3, 4, 2, 1]),
+        'SUPPORT': _choice(rng, ['Yes', 'No'], n, weights=[0.4, 0.6]),
+        'YEAR': year,
+        'CLASSIFICATION': 'Alumna',
+        'CATEGORY': _choice(rng, ['Environmental', 'Health'], n),
+        'DEGREE': _choice(rng, ['B.S.', 'B.A.'], n, weights=[0.85, 0.15]),
+        'CUMMULATIVE GPA': gpa,
+        'OVERALL GPA': overall_gpa,
+        'CELL PHONE NUMBER': phone,
+        'GRADUATE SCHOOL?': grad,
+        'WHAT GRADUATE SCHOOL?': school,
+        'GRADUATE SCHOOL TYPE (IF ANY)': school_type,
+        'MAJOR IN GRADUATE SCHOOL?': grad_major,
+        'HIGHEST DEGREE FROM GRADUATE SCHOOL': degree,
+        'DECIDED TO WORK/TYPE OF GRADUATE SCHOOL': route,
+    })
+    return df[COLUMNS]
+
+
+def write_workbook(df, path):
+    # Write-only openpyxl keeps memory flat even at a million rows; a small "Summary" sheet comes first like in the real file
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    workbook = openpyxl.Workbook(write_only=True)
+    summary = workbook.create_sheet('Summary')
+    summary.append(['YEAR', 'STUDENTS'])
+    for year, count in df['YEAR'].value_counts().sort_index().items():
+        summary.append([int(year), int(count)])
+
+    sheet = workbook.create_sheet(SHEET_NAME)
+    sheet.append(list(df.columns))
+    for row in df.itertuples(index=False, name=None):
+        sheet.append([None if value is None or value != value else value for value in row])
+    workbook.save(path)
+    return path
+
+
+def workbook_path(n_rows, data_dir, seed=0):
+    return Path(data_dir) / f'outcomes-{n_rows}-seed{seed}.xlsx'
+
+
+def ensure_workbook(n_rows, data_dir, seed=0, log=print):
+    # Path of the generated workbook, writing it on first use
+    path = workbook_path(n_rows, data_dir, seed)
+    if not path.exists():
+        log(f"Generating {n_rows:,} rows into {path}...")
+        write_workbook(generate_outcomes(n_rows, seed), path)
+    return path
+
+
+def parse_size(value):
+    return SIZES.get(value.lower()) or int(value)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write a synthetic EHS Student Outcomes workbook.")
+    parser.add_argument('--rows', type=parse_size, default=1000, help=f"number of students, or one of {', '.join(SIZES)} (default: 1k)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', help="output .xlsx (default: benchmarks/data/outcomes-<rows>-seed<seed>.xlsx)")
+    args = parser.parse_args(argv)
+
+    path = args.out or workbook_path(args.rows, Path(__file__).parent / 'data', args.seed)
+    print(write_workbook(generate_outcomes(args.rows, args.seed), path))
+
+
+if __name__ == '__main__':
+    main()
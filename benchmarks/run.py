@@ -0,0 +1,184 @@
+"""Benchmark harness: times each stage of the dashboard on generated workbooks.
+
+    python -m benchmarks.run                      # 1k and 100k rows, compared to benchmarks/baseline.json
+    python -m benchmarks.run --rows 1k 100k 1m --save
+
+Stages: the original read_excel ingest, the streaming ingest, the snapshot
+reload, building the filter index/option table/cube, the work type and
+degree options (computed, then answered from the memo), filter_Outcomes
+(row positions and the materialized rows) for representative selections,
+chart aggregation, figure rendering, the browser chart specs, cohort
+statistics, text search and CSV export. Each stage is run --repeat times
+and its median is kept. With a baseline file,
+stages slower than baseline by more than --threshold are flagged and the exit
+code is 1; --save writes the current results as the new baseline.
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from benchmarks.generate import SIZES, ensure_workbook, parse_size
+from outcomes.cohorts import CohortStats
+from outcomes.dataset import Dataset
+from outcomes.engine import filter_outcomes, render_selection, search_rows, select_rows, selection_specs, summarize
+from outcomes.export import export_bytes
+from outcomes.ingest import read_snapshot, stream_workbook, write_snapshot
+from outcomes.options import OptionTable
+from outcomes.schema import DTYPES, NA_VALUES, SHEET_NAME
+
+BENCHMARK_DIR = Path(__file__).parent
+DEFAULT_BASELINE = BENCHMARK_DIR / 'baseline.json'
+DEFAULT_DATA_DIR = BENCHMARK_DIR / 'data'
+
+# Sidebar selections a user typically makes, from the broadest to narrow ones
+SELECTIONS = {
+    'everyone': dict(years=['All Years'], grad_school='All Students', work_type=['All'], degrees=['All Degrees']),
+    'one_year_masters': dict(years=['2019'], grad_school='Yes', work_type=['Masters Professional'], degrees=['All Degrees']),
+    'recent_doctorates': dict(years=['2022', '2023', '2024'], grad_school='All Students', work_type=['Doctorate Professional', 'Ph.D.'], degrees=['M.D.', 'Ph.D.']),
+    'workforce': dict(years=['2020', '2021'], grad_school='No', work_type=None, degrees=None),
+}
+SEARCH_QUERIES = ['johnson', 'emory public health', 'washingtn']
+
+# Stages that are only run --slow-repeat times (full workbook parses and PNG rendering)
+SLOW_STAGES = {'ingest.read_excel', 'ingest.stream', 'render'}
+
+
+def measure(fn, repeat):
+    # Median wall time of fn() over repeat runs
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def read_excel(path):
+    # The dashboard's original ingest
+    return pd.read_excel(path, sheet_name=SHEET_NAME, index_col=None, usecols='A:S', dtype=DTYPES, na_values=NA_VALUES)
+
+
+def run_size(n_rows, data_dir, repeat, slow_repeat, skip=(), log=print):
+    # {stage: median seconds} for one workbook size
+    path = ensure_workbook(n_rows, data_dir, log=log)
+    data = path.read_bytes()
+    results = {}
+
+    def stage(name, fn):
+        if any(name.startswith(prefix) for prefix in skip):
+            return
+        results[name] = measure(fn, slow_repeat if name in SLOW_STAGES else repeat)
+        log(f"  {name:<28} {results[name] * 1000:>12.2f} ms")
+
+    log(f"{n_rows:,} rows ({path.stat().st_size / 1024 ** 2:.1f} MB)")
+    stage('ingest.read_excel', lambda: read_excel(path))
+    stage('ingest.stream', lambda: stream_workbook(data))
+
+    df, _ = stream_workbook(data)
+    with tempfile.TemporaryDirectory() as tmp:
+        snapshot = Path(tmp) / 'outcomes.arrow'
+        write_snapshot(df, snapshot)
+        stage('ingest.snapshot', lambda: read_snapshot(snapshot))
+
+    def build():
+        dataset = Dataset(df, 'benchmark')
+        dataset.filter_index
+        dataset.options
+        dataset.cube
+        return dataset
+
+    stage('index', build)
+    dataset = build()
+
+    def all_options(options):
+        for selection in SELECTIONS.values():
+            options.work_type_options(selection['years'], selection['grad_school'])
+            options.degree_options(selection['years'], selection['work_type'] or [], selection['grad_school'])
+
+    # A fresh OptionTable over the same count table each run, so no answer comes from its memo
+    stage('options', lambda: all_options(OptionTable(table=dataset.options.table)))
+    # The same lists again from the memo, as a filter rerun with unchanged inputs gets them
+    all_options(dataset.options)
+    stage('options.memo', lambda: all_options(dataset.options))
+    stage('filter', lambda: [select_rows(dataset, **selection) for selection in SELECTIONS.values()])
+    stage('filter.materialize', lambda: [filter_outcomes(dataset, **selection) for selection in SELECTIONS.values()])
+    stage('aggregate', lambda: [summarize(dataset, **selection) for selection in SELECTIONS.values()])
+    stage('render', lambda: [render_selection(dataset, **selection) for selection in SELECTIONS.values()])
+    stage('render.spec', lambda: [selection_specs(dataset, **selection) for selection in SELECTIONS.values()])
+    # A fresh CohortStats each run, so neither the sorted runs nor the comparisons come from its cache
+    stage('cohorts', lambda: [CohortStats(dataset.frame).compare(**selection) for selection in SELECTIONS.values()])
+
+    everyone = select_rows(dataset, **SELECTIONS['everyone'])
+    dataset.search_index
+    stage('search', lambda: [search_rows(dataset, everyone, query) for query in SEARCH_QUERIES])
+
+    frames = [filter_outcomes(dataset, **selection) for selection in SELECTIONS.values()]
+    stage('export.csv', lambda: [export_bytes(frame, 'csv') for frame in frames])
+    return results
+
+
+def compare(results, baseline, threshold, min_seconds):
+    # One row per (rows, stage) with the change against baseline and a regression flag
+    rows = []
+    for size, stages in results.items():
+        for name, seconds in stages.items():
+            before = baseline.get(size, {}).get(name)
+            change = seconds / before - 1 if before else None
+            regressed = before is not None and change > threshold and seconds - before > min_seconds
+            rows.append({
+                'rows': int(size), 'stage': name,
+                'baseline_ms': before * 1000 if before else None, 'current_ms': seconds * 1000,
+                'change': f"{change:+.0%}" if change is not None else 'new', 'regression': regressed,
+            })
+    return pd.DataFrame(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time each stage of the EHS Student Outcomes dashboard on synthetic workbooks.")
+    parser.add_argument('--rows', nargs='+', type=parse_size, default=[SIZES['1k'], SIZES['100k']], help=f"workbook sizes ({', '.join(SIZES)} or a number; default: 1k 100k)")
+    parser.add_argument('--repeat', type=int, default=5, help="runs per stage, the median is kept (default: 5)")
+    parser.add_argument('--slow-repeat', type=int, default=1, help=f"runs of the slow stages {', '.join(sorted(SLOW_STAGES))} (default: 1)")
+    parser.add_argument('--skip', nargs='*', default=[], help="stages to skip, by name prefix (e.g. ingest.read_excel render)")
+    parser.add_argument('--data-dir', default=DEFAULT_DATA_DIR, help="where generated workbooks are kept")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="baseline results file (default: benchmarks/baseline.json)")
+    parser.add_argument('--threshold', type=float, default=0.25, help="relative slowdown flagged as a regression (default: 0.25)")
+    parser.add_argument('--min-ms', type=float, default=1.0, help="ignore slowdowns smaller than this many milliseconds (default: 1)")
+    parser.add_argument('--save', action='store_true', help="write these results to the baseline file")
+    args = parser.parse_args(argv)
+
+    results = {str(n_rows): run_size(n_rows, args.data_dir, args.repeat, args.slow_repeat, args.skip) for n_rows in args.rows}
+
+    baseline_path = Path(args.baseline)
+    baseline = json.loads(baseline_path.read_text()) if baseline_path.exists() else {}
+    report = compare(results, baseline.get('results', {}), args.threshold, args.min_ms / 1000)
+    print()
+    print(report.to_string(index=False))
+
+    if args.save:
+        # Sizes that were not run this time keep their previous baseline
+        merged = {**baseline.get('results', {}), **results}
+        baseline_path.write_text(json.dumps({
+            'machine': {'python': platform.python_version(), 'pandas': pd.__version__, 'platform': platform.platform(), 'processor': platform.processor()},
+            'saved': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'results': merged,
+        }, indent=2))
+        print(f"\nBaseline written to {baseline_path}")
+
+    regressions = report[report['regression']]
+    if len(regressions) and not args.save:
+        print(f"\n{len(regressions)} stage(s) regressed by more than {args.threshold:.0%}: "
+              + ', '.join(f"{row.stage} @ {row.rows:,} rows" for row in regressions.itertuples()), file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1 @@
+"""Data layer for the EHS Student Outcomes Dashboard."""
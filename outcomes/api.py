@@ -0,0 +1,229 @@
+"""Local HTTP/JSON query API: the dashboard's counts and GPA averages for other dashboards.
+
+    python -m outcomes.api "EHS DataStatistics Phase II (Student Outcomes).xlsx" --port 8502
+    python -m outcomes.api --snapshot outcomes.arrow
+
+Endpoints (GET, JSON):
+
+- /summary  the numbers shown above the charts for a selection: total
+            filtered entries, entries in the selected years and their
+            percentages, students per degree and the average GPA per
+            year (or per degree for a single year)
+- /options  the routes and degrees the sidebar offers for a selection,
+            with their counts, and the years
+- /health   the dataset's fingerprint and number of students
+
+A selection is given with the sidebar's parameters: years, grad_school,
+work_type and degrees. Repeat a parameter to pass several values
+(?years=2021&years=2022). Parameters that are left out default to the
+sidebar's defaults ("All Years", "All Students", "All", "All Degrees").
+Equivalent selections are normalized to one cache key, and their JSON is
+cached. Each response carries an ETag derived from the dataset
+fingerprint and that key, so a client that polls with If-None-Match gets
+a 304 without the selection being looked up again.
+
+Requests are served concurrently, one thread each. The dataset is only
+read, so the threads share it.
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import sys
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+from outcomes.cache import ByteLRUCache, filter_signature
+from outcomes.charts import gpa_series
+from outcomes.dataset import Dataset
+from outcomes.engine import normalize_selection, summarize
+from outcomes.ingest import fingerprint, load_workbooks, read_snapshot
+from outcomes.perf import span
+from outcomes.schema import SHEET_NAME
+
+# Bump when a response changes for the same data, so clients don't keep stale copies
+API_VERSION = 1
+API_CACHE_BYTES = 16 * 1024 * 1024
+
+GRAD_SCHOOL_CHOICES = ["All Students", "Yes", "No"]
+SELECTION_PARAMS = {'years', 'grad_school', 'work_type', 'degrees'}
+
+
+class BadRequest(ValueError):
+    pass
+
+
+def _number(value):
+    # JSON has no NaN; a missing average is null
+    return None if value is None or math.isnan(value) else round(float(value), 4)
+
+
+def parse_selection(query):
+    # Sidebar selection from the query parameters, with the sidebar's defaults for the ones left out
+    unknown = set(query) - SELECTION_PARAMS
+    if unknown:
+        raise BadRequest(f"Unknown parameter(s): {', '.join(sorted(unknown))}")
+    grad_school = query.get('grad_school', ["All Students"])
+    if len(grad_school) != 1 or grad_school[0] not in GRAD_SCHOOL_CHOICES:
+        raise BadRequest(f"grad_school must be one of: {', '.join(GRAD_SCHOOL_CHOICES)}")
+    grad_school = grad_school[0]
+    selection = {'years': query.get('years', ['All Years']), 'grad_school': grad_school}
+    if grad_school == "No":
+        # As in the sidebar, routes and degrees don't apply to students who did not go to graduate school
+        if 'work_type' in query or 'degrees' in query:
+            raise BadRequest("work_type and degrees can't be used with grad_school=No")
+        selection.update(work_type=None, degrees=None)
+    else:
+        selection.update(work_type=query.get('work_type', ['All']), degrees=query.get('degrees', ['All Degrees']))
+    return normalize_selection(**selection)
+
+
+class QueryAPI:
+    def __init__(self, dataset, cache_bytes=API_CACHE_BYTES):
+        self.dataset = dataset
+        self.cache = ByteLRUCache(cache_bytes)
+        self.endpoints = {'/summary': self.summary, '/options': self.options, '/health': self.health}
+
+    def etag(self, endpoint, key):
+        payload = json.dumps([API_VERSION, self.dataset.key, endpoint, key])
+        return '"' + hashlib.sha256(payload.encode()).hexdigest()[:32] + '"'
+
+    def handle(self, target, if_none_match=None):
+        # (status, headers, body) of a GET request for target (path and query string)
+        url = urlsplit(target)
+        path = url.path.rstrip('/') or '/'
+        endpoint = self.endpoints.get(path)
+        if endpoint is None:
+            return self._error(404, f"Unknown endpoint {url.path}; try /summary, /options or /health")
+        with span('api', endpoint=path) as record:
+            try:
+                selection = parse_selection(parse_qs(url.query, keep_blank_values=True)) if path != '/health' else {}
+            except BadRequest as error:
+                record['status'] = 400
+                return self._error(400, str(error))
+
+            key = filter_signature(None, **selection)[1:] if selection else None
+            etag = self.etag(path, key)
+            headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+            if if_none_match and _etag_matches(if_none_match, etag):
+                record['status'] = 304
+                return 304, headers, b''
+
+            body = self.cache.get((path, key))
+            if body is None:
+                body = json.dumps(endpoint(selection)).encode()
+                self.cache.put((path, key), body, len(body))
+                record['bytes'] = len(body)
+            record['status'] = 200
+            return 200, {**headers, 'Content-Type': 'application/json'}, body
+
+    def summary(self, selection):
+        summary = summarize(self.dataset, **selection)
+        aggregates = summary['aggregates']
+        avg_gpa, by = gpa_series(aggregates, selection['years']) if not aggregates.empty else ({}, None)
+        return {
+            'dataset': self.dataset.key,
+            'selection': selection,
+            'total_filtered': summary['total_filtered'],
+            'total_students': summary['total_students'],
+            'total_in_years': summary['total_in_years'],
+            'percentage_in_years': round(summary['percentage_in_years'], 2),
+            'percentage_of_total': round(summary['percentage_of_total'], 2),
+            'degree_counts': {str(degree): int(count) for degree, count in summary['degree_counts'].items()},
+            'average_gpa': {'by': by, 'values': {str(label): _number(gpa) for label, gpa in avg_gpa.items()}},
+        }
+
+    def options(self, selection):
+        options = self.dataset.options
+        work_types, work_type_counts = options.work_type_options(selection['years'], selection['grad_school'])
+        degrees, degree_counts = options.degree_options(selection['years'], selection['work_type'], selection['grad_school'])
+        return {
+            'dataset': self.dataset.key,
+            'selection': selection,
+            'years': ['All Years'] + [str(year) for year in options.years],
+            'work_type': {'options': work_types, 'counts': {str(k): v for k, v in work_type_counts.items()}},
+            'degrees': {'options': degrees, 'counts': {str(k): v for k, v in degree_counts.items()}},
+        }
+
+    def health(self, selection):
+        return {'dataset': self.dataset.key, 'students': len(self.dataset), 'api_version': API_VERSION}
+
+    @staticmethod
+    def _error(status, message):
+        return status, {'Content-Type': 'application/json', 'Cache-Control': 'no-store'}, json.dumps({'error': message}).encode()
+
+
+def _etag_matches(if_none_match, etag):
+    # If-None-Match holds "*" or a comma-separated list of (possibly weak) ETags
+    tags = [tag.strip() for tag in if_none_match.split(',')]
+    return '*' in tags or any(tag.removeprefix('W/') == etag for tag in tags)
+
+
+def make_server(api, host='127.0.0.1', port=8502):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # Keep-alive, so polling clients reuse their connection
+
+        def do_GET(self):
+            status, headers, body = api.handle(self.path, self.headers.get('If-None-Match'))
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    return server
+
+
+def load_dataset(workbooks=None, sheet_names=(SHEET_NAME,), snapshot=None):
+    # Dataset of the workbooks (through the snapshot cache), or of a prebuilt snapshot keyed by its file identity
+    if snapshot is not None:
+        snapshot = Path(snapshot)
+        stat = snapshot.stat()
+        key = fingerprint(f"{snapshot.resolve()}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+        df, report = read_snapshot(snapshot)
+    else:
+        df, key, report = load_workbooks(workbooks, sheet_names)
+    dataset = Dataset(df, key, report)
+    # Build the indexes before serving, rather than in the first requests
+    dataset.filter_index
+    dataset.options
+    dataset.cube
+    return dataset
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the EHS Student Outcomes counts and GPA averages as JSON.")
+    parser.add_argument('workbooks', nargs='*', help="Outcomes workbook(s) (.xlsx); several are combined like in the app")
+    parser.add_argument('--snapshot', help="serve a prebuilt snapshot (python -m outcomes.ingest ... --out FILE) instead of workbooks")
+    parser.add_argument('--sheet', action='append', dest='sheets', help=f"sheet to read, may be repeated (default: {SHEET_NAME})")
+    parser.add_argument('--host', default='127.0.0.1', help="address to listen on (default: 127.0.0.1, this machine only)")
+    parser.add_argument('--port', type=int, default=8502, help="port to listen on (default: 8502)")
+    args = parser.parse_args(argv)
+    if bool(args.workbooks) == bool(args.snapshot):
+        parser.error("give either workbook(s) or --snapshot")
+
+    workbooks = [(Path(path).name, Path(path).read_bytes()) for path in args.workbooks]
+    try:
+        dataset = load_dataset(workbooks, args.sheets or [SHEET_NAME], snapshot=args.snapshot)
+    except (OSError, ValueError) as error:
+        print(f"The dataset could not be read: {error}", file=sys.stderr)
+        return 1
+
+    server = make_server(QueryAPI(dataset), args.host, args.port)
+    print(f"Serving {len(dataset):,} students on http://{args.host}:{server.server_address[1]} (/summary, /options, /health)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
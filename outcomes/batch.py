@@ -0,0 +1,172 @@
+"""Batch report generator: charts, CSVs and summaries for every filter combination.
+
+    python -m outcomes.batch "EHS DataStatistics Phase II (Student Outcomes).xlsx" --out report
+
+Enumerates each year (plus 'All Years') x graduate school x route x degree
+combination the sidebar can produce, renders them in a process pool and
+writes one folder per combination plus an index.csv. Combinations whose
+inputs did not change since the last run (same workbook, same selection)
+are skipped.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import pandas as pd
+
+from outcomes.dataset import Dataset
+from outcomes.engine import filter_outcomes, normalize_selection, render_selection, summarize
+from outcomes.compact import SIDE_COLUMNS
+from outcomes.ingest import load_workbooks, read_snapshot, snapshot_columns, snapshot_path
+from outcomes.schema import SHEET_NAME, YEAR
+
+# Bump when the rendered output changes for the same data, to invalidate earlier reports
+REPORT_VERSION = 1
+MANIFEST_NAME = 'manifest.json'
+
+_worker_dataset = None
+
+
+def enumerate_selections(dataset):
+    # Every selection the sidebar can produce, one route and one degree at a time
+    years = sorted(dataset.frame[YEAR].dropna().unique())
+    for selected_years in [['All Years']] + [[year] for year in years]:
+        for grad_school in ['All Students', 'Yes', 'No']:
+            if grad_school == 'No':
+                yield normalize_selection(selected_years, grad_school)
+                continue
+            work_types, _ = dataset.options.work_type_options(selected_years, grad_school)
+            for work_type in work_types:
+                degrees, _ = dataset.options.degree_options(selected_years, [work_type], grad_school)
+                for degree in degrees:
+                    yield normalize_selection(selected_years, grad_school, [work_type], [degree])
+
+
+def selection_slug(selection):
+    parts = [
+        'years-' + '+'.join(selection['years']),
+        'grad-' + selection['grad_school'],
+        'route-' + '+'.join(selection['work_type'] or ['none']),
+        'degree-' + '+'.join(selection['degrees'] or ['none']),
+    ]
+    return '__'.join(re.sub(r'[^A-Za-z0-9+]+', '-', part).strip('-').lower() for part in parts)
+
+
+def selection_digest(dataset_key, selection, dpi):
+    payload = json.dumps([REPORT_VERSION, dataset_key, selection, dpi], sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _init_worker(snapshot, key):
+    global _worker_dataset
+    df, report = read_snapshot(snapshot)
+    _worker_dataset = Dataset(df, key, report, side_loader=snapshot_columns(key, SIDE_COLUMNS))
+
+
+def write_selection(dataset, selection, folder, dpi):
+    # Write charts.png, outcomes.csv and summary.json for one selection; returns the summary row for index.csv
+    folder.mkdir(parents=True, exist_ok=True)
+    summary = summarize(dataset, **selection)
+    png, notes = render_selection(dataset, dpi=dpi, summary=summary, **selection)
+    (folder / 'charts.png').write_bytes(png)
+    filter_outcomes(dataset, **selection).to_csv(folder / 'outcomes.csv', index=False)
+
+    row = {
+        **{key: ', '.join(value) if isinstance(value, list) else value for key, value in selection.items()},
+        'total_filtered': summary['total_filtered'],
+        'total_in_years': summary['total_in_years'],
+        'percentage_in_years': round(summary['percentage_in_years'], 2),
+        'percentage_of_total': round(summary['percentage_of_total'], 2),
+        'notes': ' '.join(notes),
+    }
+    (folder / 'summary.json').write_text(json.dumps({**row, 'degree_counts': summary['degree_counts'].astype(int).to_dict()}, indent=2))
+    return row
+
+
+def _run_job(selection, folder, dpi):
+    return write_selection(_worker_dataset, selection, folder, dpi)
+
+
+def load_dataset(workbooks, sheet_names=(SHEET_NAME,)):
+    # Loading through the snapshot cache also leaves a snapshot for the worker processes to map
+    df, key, report = load_workbooks(workbooks, sheet_names)
+    return Dataset(df, key, report, side_loader=snapshot_columns(key, SIDE_COLUMNS))
+
+
+def generate_report(dataset, out_dir, workers=None, dpi=200, force=False, log=print):
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    key = dataset.key
+
+    manifest_path = out_dir / MANIFEST_NAME
+    manifest = json.loads(manifest_path.read_text()) if manifest_path.exists() and not force else {}
+
+    jobs, rows, current = [], {}, {}
+    for selection in enumerate_selections(dataset):
+        slug = selection_slug(selection)
+        digest = selection_digest(key, selection, dpi)
+        entry = manifest.get(slug)
+        if entry and entry['digest'] == digest and (out_dir / slug / 'charts.png').exists():
+            rows[slug] = entry['row']
+            current[slug] = entry
+        else:
+            jobs.append((slug, digest, selection))
+    log(f"{len(rows) + len(jobs)} combinations, {len(rows)} unchanged, {len(jobs)} to render")
+
+    start = time.perf_counter()
+    snapshot = snapshot_path(key)
+    new_entries = {}
+    if jobs and snapshot.exists() and workers != 1:
+        # Workers memory-map the snapshot written by load_workbooks instead of receiving the frame
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=_init_worker, initargs=(snapshot, key)) as pool:
+            futures = {pool.submit(_run_job, selection, out_dir / slug, dpi): (slug, digest) for slug, digest, selection in jobs}
+            for done, future in enumerate(as_completed(futures), start=1):
+                slug, digest = futures[future]
+                new_entries[slug] = {'digest': digest, 'row': future.result()}
+                if done % 25 == 0 or done == len(jobs):
+                    log(f"  rendered {done}/{len(jobs)}")
+    else:
+        for done, (slug, digest, selection) in enumerate(jobs, start=1):
+            new_entries[slug] = {'digest': digest, 'row': write_selection(dataset, selection, out_dir / slug, dpi)}
+            if done % 25 == 0 or done == len(jobs):
+                log(f"  rendered {done}/{len(jobs)}")
+
+    # The manifest only keeps combinations that still exist in the data
+    for slug, entry in new_entries.items():
+        rows[slug] = entry['row']
+        current[slug] = entry
+    manifest_path.write_text(json.dumps(current, indent=2))
+    pd.DataFrame([{'folder': slug, **row} for slug, row in sorted(rows.items())]).to_csv(out_dir / 'index.csv', index=False)
+    log(f"Report written to {out_dir} in {time.perf_counter() - start:.1f}s")
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate the EHS Student Outcomes report for every filter combination.")
+    parser.add_argument('workbooks', nargs='+', help="Outcomes workbook(s) (.xlsx); several are combined like in the app")
+    parser.add_argument('--out', default='report', help="report directory (default: report)")
+    parser.add_argument('--sheet', action='append', dest='sheets', help=f"sheet to read, may be repeated (default: {SHEET_NAME})")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: number of cores, 1 to render in-process)")
+    parser.add_argument('--dpi', type=int, default=200, help="chart resolution (default: 200)")
+    parser.add_argument('--force', action='store_true', help="re-render every combination, even unchanged ones")
+    args = parser.parse_args(argv)
+
+    workbooks = [(Path(path).name, Path(path).read_bytes()) for path in args.workbooks]
+    try:
+        dataset = load_dataset(workbooks, args.sheets or [SHEET_NAME])
+    except ValueError as error:
+        print(f"The workbook could not be read: {error}", file=sys.stderr)
+        return 1
+    generate_report(dataset, args.out, workers=args.workers, dpi=args.dpi, force=args.force)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,61 @@
+"""Byte-budgeted LRU cache keyed by a canonical filter signature."""
+
+import threading
+from collections import OrderedDict
+
+
+def filter_signature(dataset_key, years=None, grad_school=None, work_type=None, degrees=None):
+    # Normalize a sidebar selection so that equivalent selections share one cache key. An emptied multiselect ([])
+    # stays apart from an unused one (None): no degree chosen hides the pie chart, no degree filter doesn't.
+    def normalized(values):
+        return tuple(sorted(values)) if values is not None else None
+
+    return (dataset_key, normalized(years), grad_school, normalized(work_type), normalized(degrees))
+
+
+class ByteLRUCache:
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key, value, size):
+        # Entries larger than the whole budget are not cached at all
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.total_bytes -= old[1]
+            self._entries[key] = (value, size)
+            self.total_bytes += size
+
+            # Evict least recently used entries until under budget
+            while self.total_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.total_bytes -= evicted_size
+
+    def items(self):
+        # Snapshot of (key, value, size), least recently used first
+        with self._lock:
+            return [(key, value, size) for key, (value, size) in self._entries.items()]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
@@ -0,0 +1,270 @@
+"""Matplotlib rendering of the degree pie chart and the GPA bar chart.
+
+The plot functions draw onto a given Axes from the aggregates of a selection
+(see cube.CubeSelection). Messages that used to be written next to the chart
+are appended to ``notes`` so callers decide how to show them. The chart
+titles and plotted series are built by the helpers at the top, which the
+browser-rendered charts (see vega.py) share.
+
+matplotlib is imported inside the functions, so importing this module (and
+outcomes.engine) costs nothing until a chart is actually drawn.
+"""
+
+import io
+
+import numpy as np
+
+from outcomes.perf import span
+
+ALL_YEARS = ['2019', '2021', '2022', '2023', '2024']
+
+# Combinations of post-graduation routes that titles name as a group
+ROUTE_GROUPS = [
+    (['Doctorate Biomedical', 'Doctorate Professional', 'Masters Biomedical', 'Masters Professional', 'Ph.D.'], 'All'),
+    (['Doctorate Biomedical', 'Doctorate Professional'], 'All Doctorate'),
+    (['Masters Biomedical', 'Masters Professional'], 'All Masters'),
+    (['Doctorate Biomedical', 'Doctorate Professional', 'Masters Biomedical', 'Masters Professional'], 'All Doctorate & Masters'),
+    (['Doctorate Biomedical', 'Masters Biomedical'], 'All Biomedical'),
+    (['Doctorate Professional', 'Masters Professional'], 'All Professional'),
+]
+
+
+def years_label(years):
+    years = sorted(years)
+    return ['All Years'] if years == ALL_YEARS else years
+
+
+def route_label(work_type):
+    work_type = sorted(work_type)
+    for routes, label in ROUTE_GROUPS:
+        if work_type == routes:
+            return [label]
+    return work_type
+
+
+def workforce(series):
+    # Replace "No Degree" with "Workforce"
+    if "No Degree" in series:
+        series = series.copy()
+        series.index = series.index.str.replace("No Degree", "Workforce")
+    return series
+
+
+def degree_shares(aggregates, degrees):
+    # Students per degree of the selection, or None when the pie chart is not drawn
+    # (a single degree selected, or no data)
+    degree_counts = workforce(aggregates.degree_counts(degrees))
+    if (len(degree_counts) > 1 or 'All Degrees' in degrees) and not degree_counts.empty:
+        return degree_counts
+    return None
+
+
+def gpa_series(aggregates, years):
+    # (average GPA per degree for a single year or per year otherwise, "Degree"/"Year");
+    # the series is empty when none of the filtered students has a GPA on record
+    if len(years) == 1 and 'All Years' not in years:
+        # Filter out degrees with zero occurrences
+        avg_gpa = aggregates.gpa_by_degree(years[0])
+        return workforce(avg_gpa[avg_gpa > 0]), "Degree"
+    return workforce(aggregates.gpa_by_year()), "Year"
+
+
+def pie_title(years, work_type):
+    # Dynamic title based on selected years and work type
+    years, work_type = years_label(years), route_label(work_type)
+    years_str = ', '.join(map(str, years)) if years else "Filtered Data"
+    work_str = ', '.join(work_type) if work_type else "Filtered Data"
+    return f"{work_str} Filtered Graduate Degrees' Distribution in {years_str}"
+
+
+def bar_title(years, degrees, work, graduate):
+    if len(years) == 1 and 'All Years' not in years:
+        year = years[0]
+        if graduate == 'No':
+            return f"Average GPA of Working Alumnae in {year}"
+        work = route_label(work)
+        if "All" in work:
+            return f"Average GPA by Filtered Graduate Degrees in {year}"
+        return f"Average GPA of {', '.join(work)} Filtered Graduate Degrees by Degree in {year}"
+
+    years = years_label(years)
+    years_str = ', '.join(map(str, years))
+    if graduate == 'No':
+        return f"Average GPA of Working Alumnae per Year in {years_str}" if years else "Average GPA per Year"
+    work = route_label(work)
+    few_degrees = len(degrees) <= 4 and "All Degrees" not in degrees
+    if "All" in work:
+        # Handle title for all work types and degrees
+        if few_degrees:
+            return f"Average GPA of {', '.join(degrees)} Graduate Degrees per Year in {years_str}" if years else "Average GPA per Year"
+        return f"Average GPA of Multiple Graduate Degrees per Year in {years_str}" if years else "Average GPA per Year"
+    # Handle title when specific work type is selected
+    if few_degrees:
+        return f"Average GPA of {', '.join(work)} ({', '.join(degrees)}) Graduate Degrees per Year in {years_str}"
+    return f"Average GPA of {', '.join(work)} Filtered Graduate Degrees per Year in {years_str}"
+
+
+def plot_pie_chart(ax, aggregates, degrees, years=None, work_type=None, notes=None):
+    import matplotlib.cm as cm
+
+    # Count occurrences of each degree that is part of the filter (summed from the aggregate cube),
+    # only if there are multiple degrees or 'All Degrees' is selected and data exists
+    degree_counts = degree_shares(aggregates, degrees)
+    if degree_counts is None:
+        notes.append("Pie chart is not displayed for a single degree selection or if no data is available.")
+        return
+
+    # Calculate explode values based on slice size
+    total_count = degree_counts.sum()
+    explode = [(count / total_count) * 0.1 for count in degree_counts]  # Adjust 0.1 for desired explosion
+    explode = np.clip(explode, 0.005, 0.04)  # Set max and min values for explode so spacing won't be too big or small
+
+    # Define a custom formatting function that doesn't show percentages 2% or less
+    def autopct_format(pct):
+        return f'{pct:.1f}%' if pct >= 2 else ''  # Show percentages only if 2% or higher
+
+    # Define a custom label filter that doesn't show labels if percentage's are 2% or less
+    def filter_labels(labels, sizes):
+        return [label if size > 2 else '' for label, size in zip(labels, sizes)]
+
+    sizes = degree_counts / total_count * 100
+    filtered_labels = filter_labels(degree_counts.index, sizes)
+
+    patches, labels, pct_texts = ax.pie(
+        degree_counts,
+        labels=filtered_labels,
+        autopct=autopct_format,
+        startangle=90,
+        colors=cm.tab20c.colors, #plt.get_cmap('cool')(np.linspace(0.25, 1.0, len(degree_counts))),
+        explode=explode,
+        pctdistance=0.85,
+        labeldistance=1.17,
+        rotatelabels=False,
+        textprops={'fontsize': 18}
+    )
+
+    # Rotate labels and percentages for slices with <4% for readability
+    for i, (patch, label, pct_text) in enumerate(zip(patches, labels, pct_texts)):
+        # Calculate the percentage value directly
+        percentage_value = (degree_counts.iloc[i] / total_count) * 100
+
+        # Only rotate slices with percentages <4%
+        if percentage_value < 5:
+            angle = (patch.theta2 + patch.theta1) / 2  # Mid-angle of slice
+            rotation = angle if 90 < angle < 270 else angle  # Adjust rotation for readability
+            if label:
+                label.set_rotation(rotation)
+                label.set_horizontalalignment("center")
+            if pct_text and pct_text.get_text():  # Ensure pct_text is not empty
+                pct_text.set_rotation(rotation)
+
+    #Create Legend with Labels
+    labels_with_pct = [
+        f"{degree}: {count / total_count * 100:.1f}%" for degree, count in degree_counts.items()
+    ]
+    ax.legend(
+        patches,
+        labels_with_pct,
+        title="Degrees",
+        loc="center right",
+        bbox_to_anchor=(1.40, 0.5),
+        fontsize=15,
+        title_fontsize=15
+    )
+
+    ax.set_title(pie_title(years, work_type), pad=20, size=20)
+
+
+#Plotting GPA Chart (calculate and plot the bar chart for average GPA per year)
+def plot_bar_chart(ax, aggregates, years, degrees, work, graduate, notes=None):
+    import matplotlib.cm as cm
+    import matplotlib.colors as mcolors
+    import matplotlib.patches as mpatches
+
+    # Clear the axis to prevent overplotting
+    ax.clear()
+
+    if aggregates.empty:
+        notes.append("No data available for the selected filters. Cannot generate plot.")
+        return  # Exit the function to prevent the error
+
+    # GPA by degree if only one year is selected, average GPA per year otherwise
+    avg_gpa, by = gpa_series(aggregates, years)
+
+    # Nothing to draw when none of the filtered students has a GPA on record
+    if avg_gpa.empty:
+        notes.append("No GPA data available for the selected filters. Cannot generate plot.")
+        return
+
+    # Generate bar colors using Pastel2 colormap
+    colors = cm.Paired(mcolors.Normalize()(range(len(avg_gpa))))
+
+    bars = avg_gpa.plot(kind='bar', ax=ax, color=colors, edgecolor='black')
+
+    # Create dynamic legend
+    handles = [
+        mpatches.Patch(color=colors[i], label=f"{label} - {avg_gpa[label]:.2f}")
+        for i, label in enumerate(avg_gpa.index)
+    ]
+    legend_title = "Degrees and Avg GPA" if by == "Degree" else "Years and Avg GPA"
+    ax.legend(handles=handles, title=legend_title, bbox_to_anchor=(1.25 if graduate == 'No' else 1.20, 0.5), loc='center right', fontsize=15, title_fontsize=15)
+
+    # Set the labels
+    ax.tick_params(axis='both', which='major', labelsize=18)
+    ax.set_xlabel(by, fontsize = 18)
+    ax.set_ylabel("Average GPA", fontsize = 18)
+
+    # Set the title on the plot
+    ax.set_title(bar_title(years, degrees, work, graduate), fontsize=20)
+
+    # Add numeric labels on top of each bar
+    for bar in bars.patches:
+        ax.text(
+            bar.get_x() + bar.get_width() / 2,
+            bar.get_height(),
+            f'{bar.get_height():.2f}',  # Format to 2 decimal places
+            ha='center',
+            va='bottom',
+            fontsize = 18
+        )
+
+    # Add grid for readability
+    ax.grid(axis='y', linestyle='--', alpha=0.7)
+
+    # Rotate x-axis labels for readability
+    ax.tick_params(axis='x', rotation=0)
+
+    # Increase margins for readability (in case bar labels touch the edge)
+    ax.margins(y=0.1)
+
+
+# Draw the charts for one selection and rasterize them to PNG bytes (with the settings st.pyplot uses).
+# A standalone Figure is used instead of pyplot, so rendering keeps no global state and is safe in worker threads/processes.
+def render_charts(aggregates, years, grad_school, work_type, degrees, show_pie, dpi=200):
+    from matplotlib.figure import Figure
+
+    notes = []
+    with span('plot', rows=aggregates.total, pie=show_pie):
+        if show_pie:
+            # Create subplots for pie chart and bar chart side by side
+            fig = Figure(figsize=(20, 20))
+            axes = fig.subplots(2, 1)
+
+            # Plot pie chart for degree distribution
+            plot_pie_chart(axes[0], aggregates, degrees, years=years, work_type=work_type, notes=notes)
+
+            # Plot bar chart for average GPA per year
+            plot_bar_chart(axes[1], aggregates, years, degrees, work_type, grad_school, notes=notes)
+
+            fig.tight_layout(h_pad=5)
+        else:
+            # Plot only the bar chart, occupying the entire plot area
+            fig = Figure(figsize=(15, 7.5))
+            ax = fig.subplots()
+            plot_bar_chart(ax, aggregates, years, degrees, work_type, grad_school, notes=notes)
+
+    with span('rasterize', dpi=dpi) as record:
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format='png', dpi=dpi, bbox_inches='tight')
+        record['bytes'] = buffer.tell()
+    return buffer.getvalue(), notes
@@ -0,0 +1,222 @@
+"""Cohort statistics: GPA distributions compared across years, routes and degrees.
+
+At load, the GPAs of every (YEAR, GRADUATE SCHOOL?, route, degree) cell (the
+cells of the aggregate cube, see cube.py) are sorted once and run-length
+encoded into (cell, value, count) runs. GPAs take few distinct values, so
+there are far fewer runs than rows. A comparison maps the cells of a sidebar
+selection to its cohorts (one per year, route or degree) and answers every
+cohort at once from those runs, in a few NumPy passes:
+
+- counts, mean and standard deviation from weighted sums,
+- min, quartiles and max from the cumulative counts,
+- histograms by binning the run values,
+- bootstrap confidence intervals of the mean and median, by resampling
+  the students of small cohorts and drawing multinomial resamples of the
+  value counts of large ones.
+
+Results are cached per dataset and selection.
+"""
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from outcomes.cache import filter_signature
+from outcomes.compact import float64_values
+from outcomes.cube import CUBE_KEYS
+from outcomes.index import FilterIndex
+from outcomes.schema import DEGREE, GPA, GRAD_SCHOOL, ROUTE, YEAR
+
+OVERALL_GPA = 'OVERALL GPA'
+GPA_COLUMNS = [GPA, OVERALL_GPA]
+
+# Comparison dimensions offered by the "Cohort comparison" view
+COMPARE_BY = {'Year': YEAR, 'Post-Graduation Route': ROUTE, 'Degree': DEGREE, 'Graduate School?': GRAD_SCHOOL}
+
+HISTOGRAM_EDGES = np.round(np.arange(0, 4.01, 0.25), 2)
+
+BOOTSTRAP_RESAMPLES = 1000
+CONFIDENCE = 0.95
+# Cohorts with more distinct values than this are resampled on a 0.01 grid
+MAX_BOOTSTRAP_SUPPORT = 512
+# Resampled students or value counts held in memory at once
+BOOTSTRAP_CHUNK = 4_000_000
+SEED = 0
+
+RESULT_CACHE_SIZE = 64
+
+STAT_COLUMNS = ['students', 'with_gpa', 'mean', 'std', 'min', 'q1', 'median', 'q3', 'max',
+                'mean_ci_low', 'mean_ci_high', 'median_ci_low', 'median_ci_high']
+
+
+def _sorted_runs(cells, values):
+    # (cell, value, count) runs of the non-missing values, sorted by cell then value
+    present = ~np.isnan(values)
+    cells, values = cells[present], values[present]
+    order = np.lexsort((values, cells))
+    cells, values = cells[order], values[order]
+    starts = np.flatnonzero(np.r_[True, (cells[1:] != cells[:-1]) | (values[1:] != values[:-1])])
+    counts = np.diff(np.r_[starts, len(values)])
+    return cells[starts], values[starts], counts
+
+
+def _quantiles(values, counts, first, n, q):
+    # Linear interpolation between order statistics (numpy's default), for every cohort at once.
+    # values/counts are the runs sorted by (cohort, value), first the rank of each cohort's first value.
+    cumulative = np.cumsum(counts)
+    position = q * np.maximum(n - 1, 0)
+    low, high = np.floor(position), np.ceil(position)
+    at_low = values[np.minimum(np.searchsorted(cumulative, first + low, side='right'), len(values) - 1)]
+    at_high = values[np.minimum(np.searchsorted(cumulative, first + high, side='right'), len(values) - 1)]
+    return at_low + (position - low) * (at_high - at_low)
+
+
+def _resample_students(values, counts, n, rng):
+    # (means, medians) of BOOTSTRAP_RESAMPLES resamples of small cohorts, drawing students directly.
+    # values/counts are the runs of these cohorts sorted by (cohort, value), n their sizes.
+    students = np.repeat(values, counts)
+    first = np.cumsum(n) - n
+    draws = first.repeat(n) + (rng.random((BOOTSTRAP_RESAMPLES, len(students))) * n.repeat(n)).astype(np.int64)
+    # Students are sorted by value within each cohort's range of positions, so sorted draws are sorted resamples
+    draws.sort(axis=1)
+    resampled = students[draws]
+    means = np.add.reduceat(resampled, first, axis=1) / n
+    medians = (resampled[:, first + (n - 1) // 2] + resampled[:, first + n // 2]) / 2
+    return means, medians
+
+
+def _resample_counts(cohorts, value_ids, support, counts, n, rng):
+    # (means, medians) of BOOTSTRAP_RESAMPLES resamples of large cohorts, as multinomial draws of their value counts
+    k = len(support)
+    table = np.bincount(cohorts * k + value_ids, weights=counts, minlength=len(n) * k).reshape(len(n), k)
+    draws = rng.multinomial(n, table / n[:, None], size=(BOOTSTRAP_RESAMPLES, len(n)))
+    means = draws @ support / n
+    # Median of each resample: average of the two middle order statistics
+    cumulative = np.cumsum(draws, axis=2)
+    lower = support[(cumulative < ((n + 1) // 2)[:, None]).sum(axis=2)]
+    upper = support[(cumulative < (n // 2 + 1)[:, None]).sum(axis=2)]
+    return means, (lower + upper) / 2
+
+
+def _bootstrap(cohorts, values, counts, n, rng):
+    # Confidence intervals of each cohort's mean and median. Cohorts with fewer students than distinct values
+    # resample their students, the others their value counts; both in batches of at most BOOTSTRAP_CHUNK draws.
+    if len(values) == 0:
+        # No selected cohort has a value, so there is nothing to resample
+        return np.full((len(n), 4), np.nan)
+    support, value_ids = np.unique(values, return_inverse=True)
+    if len(support) > MAX_BOOTSTRAP_SUPPORT:
+        support, value_ids = np.unique(np.round(values, 2), return_inverse=True)
+    n = n.astype(np.int64)
+    small = (n > 0) & (n <= len(support))
+    large = n > len(support)
+
+    means = np.full((BOOTSTRAP_RESAMPLES, len(n)), np.nan)
+    medians = means.copy()
+    per_batch = max(1, BOOTSTRAP_CHUNK // BOOTSTRAP_RESAMPLES)
+    small_ids = np.flatnonzero(small)
+    # Consecutive small cohorts, up to per_batch students at a time
+    batch_of = np.cumsum(n[small_ids]) // per_batch
+    for batch in np.unique(batch_of):
+        ids = small_ids[batch_of == batch]
+        runs = np.isin(cohorts, ids)
+        means[:, ids], medians[:, ids] = _resample_students(values[runs], counts[runs], n[ids], rng)
+    large_ids = np.flatnonzero(large)
+    step = max(1, per_batch // len(support))
+    for start in range(0, len(large_ids), step):
+        ids = large_ids[start:start + step]
+        runs = np.isin(cohorts, ids)
+        local = np.searchsorted(ids, cohorts[runs])
+        means[:, ids], medians[:, ids] = _resample_counts(local, value_ids[runs], support, counts[runs], n[ids], rng)
+
+    tail = (1 - CONFIDENCE) / 2 * 100
+    with np.errstate(invalid='ignore'):
+        return np.column_stack([
+            np.percentile(means, tail, axis=0), np.percentile(means, 100 - tail, axis=0),
+            np.percentile(medians, tail, axis=0), np.percentile(medians, 100 - tail, axis=0),
+        ])
+
+
+class CohortStats:
+    def __init__(self, df):
+        grouped = df[CUBE_KEYS].groupby(CUBE_KEYS, dropna=False, observed=True)
+        cell_of_row = grouped.ngroup().to_numpy()
+        # One row per cell, in ngroup order, with its number of students
+        self.cells = grouped.size().rename('count').reset_index()
+        self.cell_index = FilterIndex(self.cells)
+        self.runs = {
+            col: _sorted_runs(cell_of_row, float64_values(df[col]))
+            for col in GPA_COLUMNS if col in df
+        }
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def nbytes(self):
+        # Cached comparison results are small and bounded (RESULT_CACHE_SIZE), so only the runs and cells count
+        runs = sum(array.nbytes for arrays in self.runs.values() for array in arrays)
+        return int(self.cells.memory_usage(deep=True).sum()) + self.cell_index.nbytes + runs
+
+    def compare(self, years=None, grad_school=None, work_type=None, degrees=None, by=YEAR, column=GPA):
+        # {'stats', 'histogram'} of the selection's cohorts along by, one row per cohort
+        key = (filter_signature(None, years, grad_school, work_type, degrees), by, column)
+        with self._lock:
+            if key in self._results:
+                self._results.move_to_end(key)
+                return self._results[key]
+
+        positions = self.cell_index.select(years=years, grad_school=grad_school, degrees=degrees, work_type=work_type)
+        result = self._compare(positions, by, column)
+
+        with self._lock:
+            self._results[key] = result
+            if len(self._results) > RESULT_CACHE_SIZE:
+                self._results.popitem(last=False)
+        return result
+
+    def _compare(self, positions, by, column):
+        # Cohort of each selected cell, then of each run of those cells
+        cohort_of_selected, labels = pd.factorize(self.cells[by].take(positions), sort=True, use_na_sentinel=False)
+        n_cohorts = len(labels)
+        cohort_of_cell = np.full(len(self.cells), -1)
+        cohort_of_cell[positions] = cohort_of_selected
+        students = np.bincount(cohort_of_selected, weights=self.cells['count'].to_numpy()[positions], minlength=n_cohorts)
+
+        cells, values, counts = self.runs[column]
+        cohorts = cohort_of_cell[cells]
+        kept = cohorts >= 0
+        cohorts, values, counts = cohorts[kept], values[kept], counts[kept]
+        order = np.lexsort((values, cohorts))
+        cohorts, values, counts = cohorts[order], values[order], counts[order]
+
+        n = np.bincount(cohorts, weights=counts, minlength=n_cohorts)
+        first = np.cumsum(n) - n
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.bincount(cohorts, weights=counts * values, minlength=n_cohorts) / n
+            squares = np.bincount(cohorts, weights=counts * (values - mean[cohorts]) ** 2, minlength=n_cohorts)
+            std = np.sqrt(squares / (n - 1))
+        std[n < 2] = np.nan
+
+        stats = {'students': students.astype(np.int64), 'with_gpa': n.astype(np.int64), 'mean': mean, 'std': std}
+        for name, q in [('min', 0), ('q1', 0.25), ('median', 0.5), ('q3', 0.75), ('max', 1)]:
+            stats[name] = np.where(n > 0, _quantiles(values, counts, first, n, q), np.nan) if len(values) else np.full(n_cohorts, np.nan)
+        intervals = _bootstrap(cohorts, values, counts, n, np.random.default_rng(SEED))
+        stats['mean_ci_low'], stats['mean_ci_high'], stats['median_ci_low'], stats['median_ci_high'] = intervals.T
+
+        n_bins = len(HISTOGRAM_EDGES) - 1
+        bins = np.clip(np.searchsorted(HISTOGRAM_EDGES, values, side='right') - 1, 0, n_bins - 1)
+        histogram = np.bincount(cohorts * n_bins + bins, weights=counts, minlength=n_cohorts * n_bins).reshape(n_cohorts, n_bins)
+        # Leave out the empty bins below the lowest and above the highest GPA
+        used = np.flatnonzero(histogram.sum(axis=0))
+        shown = slice(used[0], used[-1] + 1) if len(used) else slice(0, 0)
+        bin_labels = [f"{low:.2f}–{high:.2f}" for low, high in zip(HISTOGRAM_EDGES[:-1], HISTOGRAM_EDGES[1:])][shown]
+
+        index = pd.Index(labels, name=by).astype('string').fillna('(blank)')
+        if by == DEGREE:
+            index = index.str.replace("No Degree", "Workforce")
+        return {
+            'stats': pd.DataFrame(stats, index=index, columns=STAT_COLUMNS),
+            'histogram': pd.DataFrame(histogram[:, shown].astype(np.int64), index=index, columns=bin_labels),
+        }
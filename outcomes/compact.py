@@ -0,0 +1,92 @@
+"""Compact in-memory layout of the Outcomes frame.
+
+Loaded datasets are shared by every session, so their footprint decides
+how many sessions fit in the container. Repetitive text columns become
+categoricals (one small integer code per row plus each distinct value
+once), GPAs are stored as float32, and the contact/identifier columns that
+no filter or chart reads are split into a side table that is only loaded
+when the table or a download asks for them.
+
+float32 is a storage format only: rows taken out of the dataset (tables,
+downloads) and the GPA sums behind averages and cohort statistics get the
+GPAs back as the float64 values the workbook holds.
+"""
+
+import numpy as np
+import pandas as pd
+
+from outcomes.schema import GPA, YEAR
+
+# Text columns with few distinct values relative to the number of rows
+CATEGORY_COLUMNS = [
+    'SCHOLARS',
+    YEAR,
+    'CATEGORY',
+    'WHAT GRADUATE SCHOOL?',
+    'GRADUATE SCHOOL TYPE (IF ANY)',
+    'MAJOR IN GRADUATE SCHOOL?',
+]
+FLOAT32_COLUMNS = [GPA, 'OVERALL GPA']
+
+# Most decimals a float32 GPA is restored with (float32 keeps about 7 significant digits)
+FLOAT32_DECIMALS = 6
+
+# Columns kept out of the main frame (see Dataset.side_table)
+SIDE_COLUMNS = ['900#', 'CELL PHONE NUMBER']
+
+
+def column_bytes(df):
+    # Bytes held by each column, including the values behind strings and categories
+    return df.memory_usage(deep=True, index=False)
+
+
+def compact_frame(df):
+    # Return (compact frame without the side columns, side table)
+    side = df[[col for col in SIDE_COLUMNS if col in df]]
+    compact = df.drop(columns=list(side.columns))
+    compact = compact.astype({
+        **{col: 'category' for col in CATEGORY_COLUMNS if col in compact and compact[col].dtype != 'category'},
+        **{col: np.float32 for col in FLOAT32_COLUMNS if col in compact},
+    })
+    return compact, side
+
+
+def _restore_float64(values):
+    # Each float32 value as the float64 of the shortest decimal (at most FLOAT32_DECIMALS places) that rounds to it,
+    # i.e. the number that was read from the workbook, e.g. 3.09 rather than 3.0899999141693115
+    wide = values.astype(np.float64)
+    restored = wide.copy()
+    pending = ~np.isnan(values)
+    for decimals in range(FLOAT32_DECIMALS + 1):
+        rounded = np.round(wide[pending], decimals)
+        exact = rounded.astype(np.float32) == values[pending]
+        positions = np.flatnonzero(pending)[exact]
+        restored[positions] = rounded[exact]
+        pending[positions] = False
+        if not pending.any():
+            break
+    return restored
+
+
+def float64_values(series):
+    # A GPA column as float64 values at the workbook's precision (NaN for missing), for sums and statistics:
+    # the float32 values are off by up to about 1e-7, enough to move an average across a rounding boundary
+    values = series.to_numpy(dtype=np.float32 if series.dtype == np.float32 else np.float64, na_value=np.nan)
+    return _restore_float64(values) if values.dtype == np.float32 else values
+
+
+def widen_floats(df):
+    # df with its float32 columns back as float64 at the workbook's precision, for anything leaving the dataset
+    columns = [col for col in FLOAT32_COLUMNS if col in df and df[col].dtype == np.float32]
+    if not columns:
+        return df
+    return df.assign(**{col: pd.Series(_restore_float64(df[col].to_numpy()), index=df.index) for col in columns})
+
+
+def memory_report(before, after):
+    # Bytes per column before and after compaction; columns missing from after (an unloaded side table) count as 0
+    report = pd.DataFrame({'before': before, 'after': after.reindex(before.index).fillna(0).astype(int)})
+    report['storage'] = ['side table' if col in SIDE_COLUMNS else 'main frame' for col in report.index]
+    report.loc['Total'] = [report['before'].sum(), report['after'].sum(), '']
+    report['saved'] = 1 - report['after'] / report['before']
+    return report.rename_axis('column')
@@ -0,0 +1,88 @@
+"""Aggregate cube behind the pie chart, the GPA bar chart and the summary counts.
+
+One vectorized groupby at load stores, per (YEAR, GRADUATE SCHOOL?, route,
+degree) cell, the row count, the GPA sum and the number of non-null GPAs.
+Any sidebar selection maps to a set of cells (through the same bitmap filter
+used for rows), and the charts are answered by summing those cells.
+"""
+
+import numpy as np
+import pandas as pd
+
+from outcomes.compact import float64_values
+from outcomes.index import FilterIndex
+from outcomes.schema import DEGREE, GPA, GRAD_SCHOOL, ROUTE, YEAR
+
+CUBE_KEYS = [YEAR, GRAD_SCHOOL, ROUTE, DEGREE]
+CELL_VALUES = ['count', 'gpa_sum', 'gpa_count']
+
+
+def _cube_cells(df):
+    # GPAs may be stored as float32 (see compact.py), sum the workbook's float64 values
+    grouped = df[CUBE_KEYS].assign(**{GPA: float64_values(df[GPA])}).groupby(CUBE_KEYS, dropna=False, observed=True)[GPA]
+    return grouped.agg(count='size', gpa_sum='sum', gpa_count='count').reset_index()
+
+
+class AggregateCube:
+    def __init__(self, df=None, cells=None):
+        self.cells = _cube_cells(df) if cells is None else cells
+        self.cell_index = FilterIndex(self.cells)
+
+    @property
+    def nbytes(self):
+        return int(self.cells.memory_usage(deep=True).sum()) + self.cell_index.nbytes
+
+    def updated(self, removed, added):
+        # Cube after taking the rows of removed out and adding those of added: only those rows are grouped
+        taken_out = _cube_cells(removed)
+        taken_out[CELL_VALUES] *= -1
+        cells = pd.concat([self.cells, taken_out, _cube_cells(added)], ignore_index=True)
+        cells = cells.groupby(CUBE_KEYS, dropna=False, observed=True)[CELL_VALUES].sum().reset_index()
+        return AggregateCube(cells=cells[cells['count'] > 0].reset_index(drop=True))
+
+    def select(self, years=None, grad_school=None, degrees=None, work_type=None):
+        # Cells matching a sidebar selection, with the same semantics as filter_Outcomes
+        positions = self.cell_index.select(years=years, grad_school=grad_school, degrees=degrees, work_type=work_type)
+        return CubeSelection(self.cells.take(positions))
+
+    def year_total(self, selected_years):
+        # Number of rows in the selected years (all rows for 'All Years')
+        if 'All Years' in selected_years:
+            return int(self.cells['count'].sum())
+        return int(self.cells.loc[self.cells[YEAR].isin(selected_years), 'count'].sum())
+
+
+class CubeSelection:
+    def __init__(self, cells):
+        self.cells = cells
+
+    @property
+    def total(self):
+        return int(self.cells['count'].sum())
+
+    @property
+    def empty(self):
+        return self.total == 0
+
+    def degree_counts(self, degrees):
+        # Same as value_counts of the degree column over the filtered rows restricted to the chosen degrees.
+        # No degree chosen ([]) counts none, as in the original pie chart; None (graduate school "No") counts all.
+        cells = self.cells
+        if degrees is not None and 'All Degrees' not in degrees:
+            cells = cells[cells[DEGREE].isin(degrees)]
+        counts = cells.groupby(DEGREE, observed=True)['count'].sum()
+        counts = counts[counts > 0]
+        return counts.sort_values(ascending=False, kind='stable').rename('count')
+
+    @staticmethod
+    def _mean_gpa(cells, by):
+        sums = cells.groupby(by, observed=True)[['gpa_sum', 'gpa_count']].sum()
+        return (sums['gpa_sum'] / sums['gpa_count'].replace(0, np.nan)).rename(GPA)
+
+    def gpa_by_year(self):
+        # Average GPA per year of the filtered rows
+        return self._mean_gpa(self.cells, YEAR)
+
+    def gpa_by_degree(self, year):
+        # Average GPA per degree of the filtered rows in one year
+        return self._mean_gpa(self.cells[self.cells[YEAR] == year], DEGREE)
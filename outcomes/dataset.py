@@ -0,0 +1,125 @@
+"""A loaded Outcomes frame together with the structures derived from it."""
+
+import threading
+from functools import cached_property
+
+import pandas as pd
+
+from outcomes.cohorts import CohortStats
+from outcomes.compact import column_bytes, compact_frame, memory_report, widen_floats
+from outcomes.cube import AggregateCube
+from outcomes.index import FilterIndex
+from outcomes.options import OptionTable
+from outcomes.search import SearchIndex
+from outcomes.table import SortIndex
+
+# Structures built from the frame on first use, counted in Dataset.nbytes once built
+DERIVED = ('filter_index', 'options', 'cube', 'cohorts', 'sort_index', 'search_index')
+
+
+def _derived(build):
+    # A lazily built structure. Building it grows the dataset, which is reported to on_resize (see store.py).
+    def get(self):
+        value = self.__dict__[build.__name__] = build(self)
+        self._resized()
+        return value
+    get.__name__ = build.__name__
+    return cached_property(get)
+
+
+class Dataset:
+    def __init__(self, frame, key, report=None, side_loader=None):
+        # frame is shared by every rerun that loads the same workbook, so it is treated as read-only
+        self.columns = list(frame.columns)
+        self.bytes_before = column_bytes(frame)
+        self.frame, side = compact_frame(frame)
+        # The side columns (900#, phone) stay on disk when side_loader can read them back (see ingest.snapshot_columns)
+        self._side_loader = side_loader or (lambda: side)
+        self._side_lock = threading.Lock()
+        self.key = key
+        # Ingest report: rejected cells, per-file parse timings and 900# conflicts (see ingest.ingest_workbooks)
+        self.report = report or {}
+        self.errors = self.report.get('errors', [])
+        # Called with (dataset, nbytes) when a lazily built structure changes the dataset's size
+        self.on_resize = None
+
+    def __len__(self):
+        return len(self.frame)
+
+    @cached_property
+    def side_table(self):
+        # Sessions share the dataset, so two of them can ask for the side columns at once: only one reads them
+        with self._side_lock:
+            if 'side_table' in self.__dict__:
+                return self.__dict__['side_table']
+            side = self.__dict__['side_table'] = self._side_loader()
+            self._side_loader = None
+        self._resized()
+        return side
+
+    @property
+    def side_loaded(self):
+        return 'side_table' in self.__dict__
+
+    def memory_report(self):
+        after = column_bytes(self.frame)
+        if self.side_loaded:
+            after = pd.concat([after, column_bytes(self.side_table)])
+        return memory_report(self.bytes_before, after)
+
+    @property
+    def nbytes(self):
+        # The frame and loaded side table plus every derived structure built so far
+        derived = sum(self.__dict__[name].nbytes for name in DERIVED if name in self.__dict__)
+        return int(self.memory_report().loc['Total', 'after']) + derived
+
+    def _resized(self):
+        if self.on_resize is not None:
+            self.on_resize(self, self.nbytes)
+
+    @_derived
+    def filter_index(self):
+        return FilterIndex(self.frame)
+
+    @_derived
+    def options(self):
+        return OptionTable(self.frame)
+
+    @_derived
+    def cube(self):
+        return AggregateCube(self.frame)
+
+    @_derived
+    def cohorts(self):
+        return CohortStats(self.frame)
+
+    @_derived
+    def sort_index(self):
+        # Sort permutations are built per column on first use, each one growing the dataset
+        return SortIndex(self.column, len(self.frame), on_grow=self._resized)
+
+    @_derived
+    def search_index(self):
+        return SearchIndex(self.frame)
+
+    def select(self, years=None, grad_school=None, degrees=None, work_type=None):
+        # Row positions matching a selection
+        return self.filter_index.select(years=years, grad_school=grad_school, degrees=degrees, work_type=work_type)
+
+    def column(self, col):
+        return self.frame[col] if col in self.frame else self.side_table[col]
+
+    def take(self, rows, columns=None):
+        # The given rows with all (or the given) columns, in workbook column order, side columns joined in
+        # (GPAs as float64 again, see compact.widen_floats)
+        columns = self.columns if columns is None else columns
+        taken = widen_floats(self.frame[[col for col in columns if col in self.frame]].take(rows))
+        side_columns = [col for col in columns if col not in self.frame]
+        if side_columns:
+            side = self.side_table[side_columns].take(rows)
+            side.index = taken.index
+            taken = pd.concat([taken, side], axis=1)
+        return taken[columns]
+
+    def filter(self, years=None, grad_school=None, degrees=None, work_type=None):
+        return self.take(self.select(years=years, grad_school=grad_school, degrees=degrees, work_type=work_type))
@@ -0,0 +1,150 @@
+"""Incremental reload of an updated workbook.
+
+The newly parsed frame is paired with the previously loaded dataset on 900#
+(plus the occurrence number, so repeated or missing IDs still pair up one to
+one). Rows are then added, removed, changed or unchanged. Only the added
+and changed rows, and the previous version of removed and changed rows, are
+grouped to update the option table and the aggregate cube. The filter
+bitmaps are carried over by position and only the touched rows are
+compared. Cached charts and downloads whose selection contains none of the
+touched cells are reused under the new dataset key.
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+
+from outcomes.cube import CUBE_KEYS
+from outcomes.dataset import Dataset
+from outcomes.index import FilterIndex
+from outcomes.perf import span
+
+ID_COLUMN = '900#'
+MISSING_ID = '\x00missing'
+
+# Past this share of touched rows, rebuilding the derived structures is as cheap as updating them
+MAX_DELTA_SHARE = 0.5
+
+# Changed/added/removed rows listed in the change summary
+MAX_LISTED_ROWS = 1000
+
+
+def _keyed(ids):
+    ids = ids.astype('string').fillna(MISSING_ID).reset_index(drop=True)
+    return pd.DataFrame({'id': ids, 'occurrence': ids.groupby(ids).cumcount(), 'position': np.arange(len(ids))})
+
+
+def _same_values(a, b):
+    # Elementwise equality of two equally long columns, missing equal to missing
+    a, b = a.astype(object).to_numpy(), b.astype(object).to_numpy()
+    a_na, b_na = pd.isna(a), pd.isna(b)
+    same = a_na & b_na
+    present = ~(a_na | b_na)
+    same[present] = a[present] == b[present]
+    return same
+
+
+def diff_datasets(previous, dataset):
+    # Pair the rows of two datasets on 900# and find which of the paired rows differ, and in which columns
+    merged = _keyed(previous.column(ID_COLUMN)).merge(
+        _keyed(dataset.column(ID_COLUMN)), on=['id', 'occurrence'], how='outer', suffixes=('_old', '_new'), indicator=True
+    )
+    paired = merged[merged['_merge'] == 'both']
+    old_rows = paired['position_old'].to_numpy(dtype=np.int64)
+    new_rows = paired['position_new'].to_numpy(dtype=np.int64)
+
+    changed = np.zeros(len(paired), dtype=bool)
+    changed_columns = {}
+    for col in dataset.columns:
+        if col not in previous.columns:
+            continue
+        differs = ~_same_values(previous.column(col).take(old_rows), dataset.column(col).take(new_rows))
+        if differs.any():
+            changed_columns[col] = differs
+            changed |= differs
+
+    return {
+        'old_rows': old_rows,
+        'new_rows': new_rows,
+        'changed': changed,
+        'changed_columns': changed_columns,
+        'added': np.sort(merged.loc[merged['_merge'] == 'right_only', 'position_new'].to_numpy(dtype=np.int64)),
+        'removed': np.sort(merged.loc[merged['_merge'] == 'left_only', 'position_old'].to_numpy(dtype=np.int64)),
+    }
+
+
+def _listed_rows(previous, dataset, delta):
+    # A few rows of each kind for the change summary: 900#, what happened and which columns changed
+    changed = np.flatnonzero(delta['changed'])
+    rows = [
+        {ID_COLUMN: dataset.column(ID_COLUMN).iloc[delta['new_rows'][i]], 'change': 'changed',
+         'columns': ', '.join(col for col, differs in delta['changed_columns'].items() if differs[i])}
+        for i in changed[:MAX_LISTED_ROWS]
+    ]
+    rows += [{ID_COLUMN: dataset.column(ID_COLUMN).iloc[i], 'change': 'added', 'columns': ''} for i in delta['added'][:MAX_LISTED_ROWS]]
+    rows += [{ID_COLUMN: previous.column(ID_COLUMN).iloc[i], 'change': 'removed', 'columns': ''} for i in delta['removed'][:MAX_LISTED_ROWS]]
+    return rows
+
+
+def carry_over(cache, previous_key, key, touched_cells):
+    # Re-key cached charts/downloads of the previous dataset whose selection contains none of the touched cells.
+    # Chart keys are filter signatures, download keys are (signature, format, dropped columns).
+    carried = 0
+    for entry_key, value, size in cache.items():
+        nested = isinstance(entry_key[0], tuple)
+        signature = entry_key[0] if nested else entry_key
+        if signature[0] != previous_key:
+            continue
+        _, years, grad_school, work_type, degrees = signature
+        if len(touched_cells.select(years=years or [], grad_school=grad_school, work_type=work_type, degrees=degrees)):
+            continue
+        new_signature = (key,) + signature[1:]
+        cache.put((new_signature,) + entry_key[1:] if nested else new_signature, value, size)
+        carried += 1
+    return carried
+
+
+def apply_delta(previous, frame, key, report=None, side_loader=None, caches=()):
+    # (dataset, changes): the Dataset of frame (the updated workbook), with its derived structures updated from
+    # previous instead of rebuilt, and a summary of what changed. The summary names rows of previous, so it belongs
+    # to whoever uploaded both versions and is not stored on the (shared) dataset.
+    started = time.perf_counter()
+    with span('delta', rows=len(frame)) as record:
+        dataset = Dataset(frame, key, report, side_loader=side_loader)
+        delta = diff_datasets(previous, dataset)
+        changed = delta['changed']
+        touched_rows = np.sort(np.concatenate([delta['new_rows'][changed], delta['added']]))
+        before_rows = np.sort(np.concatenate([delta['old_rows'][changed], delta['removed']]))
+        record['touched'] = len(touched_rows) + len(before_rows)
+
+        removed = previous.frame.take(before_rows)
+        added = dataset.frame.take(touched_rows)
+        incremental = len(touched_rows) + len(before_rows) <= MAX_DELTA_SHARE * max(len(dataset), 1)
+        if incremental:
+            # Structures the previous dataset has built are updated; the others are still built lazily
+            if 'filter_index' in previous.__dict__:
+                dataset.filter_index = previous.filter_index.updated(
+                    dataset.frame, delta['old_rows'][~changed], delta['new_rows'][~changed], touched_rows
+                )
+            if 'options' in previous.__dict__:
+                dataset.options = previous.options.updated(removed, added)
+            if 'cube' in previous.__dict__:
+                dataset.cube = previous.cube.updated(removed, added)
+
+        touched_cells = FilterIndex(pd.concat([removed[CUBE_KEYS], added[CUBE_KEYS]], ignore_index=True))
+        reused = sum(carry_over(cache, previous.key, key, touched_cells) for cache in caches)
+
+    changes = {
+        'previous_key': previous.key,
+        'added': len(delta['added']),
+        'removed': len(delta['removed']),
+        'changed': int(changed.sum()),
+        'unchanged': int((~changed).sum()),
+        'columns': {col: int(differs.sum()) for col, differs in delta['changed_columns'].items()},
+        'rows': _listed_rows(previous, dataset, delta),
+        'incremental': incremental,
+        'reused_cache_entries': reused,
+        'seconds': time.perf_counter() - started,
+    }
+    return dataset, changes
@@ -0,0 +1,104 @@
+"""Headless query engine: the dashboard's filtering, summary and charts as plain functions.
+
+Everything takes a Dataset (see dataset.py) and a sidebar selection and
+returns data, so the same logic serves the Streamlit app, the batch report
+generator (batch.py) and anything else that imports it.
+"""
+
+from outcomes.cache import filter_signature
+from outcomes.charts import render_charts
+from outcomes.perf import span
+from outcomes.schema import GPA, YEAR
+from outcomes.vega import chart_specs
+
+
+def normalize_selection(years=None, grad_school=None, work_type=None, degrees=None):
+    # Canonical (sorted) form of a selection; equivalent selections give identical results and charts
+    _, years, grad_school, work_type, degrees = filter_signature(None, years, grad_school, work_type, degrees)
+    return {
+        'years': list(years or []),
+        'grad_school': grad_school,
+        'work_type': list(work_type) if work_type else None,
+        'degrees': list(degrees) if degrees is not None else None,
+    }
+
+
+def select_rows(dataset, years=None, grad_school=None, work_type=None, degrees=None):
+    # Row positions of the selection in Outcomes, without copying any rows
+    with span('filter') as record:
+        rows = dataset.select(years=years, grad_school=grad_school, degrees=degrees, work_type=work_type)
+        record['rows'] = len(rows)
+    return rows
+
+
+def search_rows(dataset, rows, query):
+    # The rows (positions) matching a free-text query on names, graduate schools and majors, best matches first
+    with span('search') as record:
+        rows = dataset.search_index.rank(rows, query)
+        record['rows'] = len(rows)
+    return rows
+
+
+def filter_outcomes(dataset, years=None, grad_school=None, work_type=None, degrees=None):
+    # Rows of Outcomes matching the selection ("All Students": matching grad students, then non-grad students)
+    with span('filter') as record:
+        filtered = dataset.filter(years=years, grad_school=grad_school, degrees=degrees, work_type=work_type)
+        record['rows'] = len(filtered)
+    return filtered
+
+
+def summarize(dataset, years=None, grad_school=None, work_type=None, degrees=None):
+    # Counts and percentages shown above the charts, plus the aggregates the charts are drawn from
+    with span('aggregate') as record:
+        aggregates = dataset.cube.select(years=years, grad_school=grad_school, degrees=degrees, work_type=work_type)
+
+        total_filtered = aggregates.total
+        total_students = len(dataset)
+        total_in_years = dataset.cube.year_total(years or [])
+        degree_counts = aggregates.degree_counts(degrees)
+        record['rows'] = total_filtered
+
+    if grad_school == 'No':
+        show_pie = False
+    else:
+        # Pie chart only when there is degree data to compare
+        show_pie = bool((total_filtered > 1 or 'All Degrees' in (degrees or [])) and len(degree_counts) > 1)
+
+    return {
+        'total_filtered': total_filtered,
+        'total_students': total_students,
+        'total_in_years': total_in_years,
+        'percentage_in_years': total_filtered / total_in_years * 100 if total_in_years else 0.0,
+        'percentage_of_total': total_filtered / total_students * 100 if total_students else 0.0,
+        'degree_counts': degree_counts,
+        'show_pie': show_pie,
+        'aggregates': aggregates,
+    }
+
+
+def compare_cohorts(dataset, years=None, grad_school=None, work_type=None, degrees=None, by=YEAR, column=GPA):
+    # GPA distribution statistics and histograms of the selection's cohorts (one per value of by), see cohorts.py
+    with span('cohorts', by=by, column=column) as record:
+        result = dataset.cohorts.compare(years=years, grad_school=grad_school, work_type=work_type, degrees=degrees, by=by, column=column)
+        record['rows'] = int(result['stats']['students'].sum())
+    return result
+
+
+def render_selection(dataset, years=None, grad_school=None, work_type=None, degrees=None, dpi=200, summary=None):
+    # (PNG bytes, notes) for the charts of a selection, drawn from its canonical form
+    selection = normalize_selection(years, grad_school, work_type, degrees)
+    summary = summary or summarize(dataset, **selection)
+    return render_charts(
+        summary['aggregates'], selection['years'], selection['grad_school'],
+        selection['work_type'] or [], selection['degrees'] or [], summary['show_pie'], dpi=dpi
+    )
+
+
+def selection_specs(dataset, years=None, grad_school=None, work_type=None, degrees=None, summary=None):
+    # (Vega-Lite specs, notes) for the same charts, drawn by the browser from the aggregated series only
+    selection = normalize_selection(years, grad_school, work_type, degrees)
+    summary = summary or summarize(dataset, **selection)
+    return chart_specs(
+        summary['aggregates'], selection['years'], selection['grad_school'],
+        selection['work_type'] or [], selection['degrees'] or [], summary['show_pie']
+    )
@@ -0,0 +1,70 @@
+"""On-demand export of filtered rows as CSV, Parquet or Excel.
+
+Nothing is serialized until a download is requested. CSV is produced in
+row chunks so the whole file never has to exist as one Python string, and
+the finished bytes are cached by filter signature, format and dropped
+columns, so a repeated download is a lookup.
+"""
+
+import io
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from outcomes.compact import widen_floats
+from outcomes.perf import span
+
+# format: (label, file extension, MIME type)
+EXPORT_FORMATS = {
+    'csv': ('CSV', '.csv', 'text/csv'),
+    'parquet': ('Parquet', '.parquet', 'application/vnd.apache.parquet'),
+    'xlsx': ('Excel', '.xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+}
+
+# Contact/identifier columns that can be left out of a download
+SENSITIVE_COLUMNS = ['CELL PHONE NUMBER', '900#']
+
+CSV_CHUNK_ROWS = 10000
+
+
+def export_columns(df, drop_columns=()):
+    # float32 is only how the dataset stores GPAs; files get float64 at the workbook's precision
+    return widen_floats(df.drop(columns=[col for col in drop_columns if col in df]))
+
+
+def iter_csv_chunks(df, chunk_rows=CSV_CHUNK_ROWS):
+    # Yield the CSV as encoded chunks of chunk_rows rows, header first
+    yield df.iloc[:0].to_csv(index=False).encode()
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start:start + chunk_rows].to_csv(index=False, header=False).encode()
+
+
+def write_export(df, fmt, sink):
+    # Serialize df into the binary file object sink
+    if fmt == 'csv':
+        for chunk in iter_csv_chunks(df):
+            sink.write(chunk)
+    elif fmt == 'parquet':
+        pq.write_table(pa.Table.from_pandas(df, preserve_index=False), sink)
+    elif fmt == 'xlsx':
+        df.to_excel(sink, index=False, sheet_name='Filtered Outcomes', engine='openpyxl')
+    else:
+        raise ValueError(f"Unknown export format '{fmt}'")
+
+
+def export_bytes(df, fmt, drop_columns=()):
+    with span('export', rows=len(df), format=fmt) as record:
+        buffer = io.BytesIO()
+        write_export(export_columns(df, drop_columns), fmt, buffer)
+        record['bytes'] = buffer.tell()
+    return buffer.getvalue()
+
+
+def cached_export(cache, signature, fmt, drop_columns, build_frame):
+    # Bytes of one export, built from build_frame() only on a cache miss
+    key = (signature, fmt, tuple(sorted(drop_columns)))
+    data = cache.get(key)
+    if data is None:
+        data = export_bytes(build_frame(), fmt, drop_columns)
+        cache.put(key, data, len(data))
+    return data
@@ -0,0 +1,84 @@
+"""Bitmap index over the sidebar filter columns.
+
+Each distinct value of YEAR, GRADUATE SCHOOL?, the highest degree and the
+post-graduation route gets a boolean row mask, built once at load. A sidebar
+selection is then a handful of vectorized OR/AND operations that yield one
+array of row positions, so the frame is only copied by the final take.
+"""
+
+import numpy as np
+import pandas as pd
+
+from outcomes.schema import DEGREE, GRAD_SCHOOL, ROUTE, YEAR
+
+INDEXED_COLUMNS = (YEAR, GRAD_SCHOOL, DEGREE, ROUTE)
+
+
+class FilterIndex:
+    def __init__(self, df, columns=INDEXED_COLUMNS):
+        self.n_rows = len(df)
+        self.bitmaps = {}
+        for col in columns:
+            # Missing values get code -1 and therefore no bitmap, like isin/== never matching NaN
+            codes, uniques = pd.factorize(df[col])
+            self.bitmaps[col] = {value: codes == code for code, value in enumerate(uniques)}
+
+    def updated(self, frame, old_rows, new_rows, touched_rows):
+        # Index of frame, a new version of the indexed frame: the rows at old_rows moved unchanged to new_rows,
+        # and the rows at touched_rows (positions in frame) are new or changed. Only the touched rows are compared.
+        index = FilterIndex.__new__(FilterIndex)
+        index.n_rows = len(frame)
+        index.bitmaps = {}
+        for col, bitmaps in self.bitmaps.items():
+            updated = {}
+            for value, bitmap in bitmaps.items():
+                updated[value] = np.zeros(index.n_rows, dtype=bool)
+                updated[value][new_rows] = bitmap[old_rows]
+            codes, uniques = pd.factorize(frame[col].take(touched_rows))
+            for code, value in enumerate(uniques):
+                updated.setdefault(value, np.zeros(index.n_rows, dtype=bool))[touched_rows[codes == code]] = True
+            # Values that no longer occur lose their bitmap, as if the index had been built from frame
+            index.bitmaps[col] = {value: bitmap for value, bitmap in updated.items() if bitmap.any()}
+        return index
+
+    @property
+    def nbytes(self):
+        return sum(bitmap.nbytes for bitmaps in self.bitmaps.values() for bitmap in bitmaps.values())
+
+    def values(self, col):
+        return list(self.bitmaps[col])
+
+    def mask(self, col, values):
+        # OR of the bitmaps of the given values (values not in the data match nothing)
+        mask = np.zeros(self.n_rows, dtype=bool)
+        for value in values:
+            bitmap = self.bitmaps[col].get(value)
+            if bitmap is not None:
+                mask |= bitmap
+        return mask
+
+    def select(self, years=None, grad_school=None, degrees=None, work_type=None):
+        # Row positions matching a sidebar selection, in the order filter_Outcomes has always returned them
+        selected = np.ones(self.n_rows, dtype=bool)
+
+        # Year Filter (only filter if not "All Years")
+        if years and "All Years" not in years:
+            selected &= self.mask(YEAR, years)
+
+        # Graduate School Filter (only filter if not "All Students")
+        if grad_school and grad_school != "All Students":
+            selected &= self.mask(GRAD_SCHOOL, [grad_school])
+
+        degree_route = np.ones(self.n_rows, dtype=bool)
+        if degrees and "All Degrees" not in degrees:
+            degree_route &= self.mask(DEGREE, degrees)
+        if work_type and "All" not in work_type:
+            degree_route &= self.mask(ROUTE, work_type)
+
+        if grad_school == "All Students":
+            # Degree & work filters only apply to grad students, who are listed before non-grad students
+            grad_students = selected & self.mask(GRAD_SCHOOL, ["Yes"]) & degree_route
+            non_grad_students = selected & self.mask(GRAD_SCHOOL, ["No"])
+            return np.concatenate([np.flatnonzero(grad_students), np.flatnonzero(non_grad_students)])
+
+        return np.flatnonzero(selected & degree_route)
@@ -0,0 +1,386 @@
+"""Workbook ingest with an on-disk Arrow snapshot cache.
+
+Parsing the .xlsx with openpyxl is the slowest step of the app, so the
+"All Students" sheet is parsed once per distinct upload and stored as an
+uncompressed Arrow IPC file. Later reruns (and server restarts) memory-map
+that file instead of parsing the workbook again.
+
+The parse itself streams rows in openpyxl's read-only mode into typed column
+buffers, so peak memory stays close to the size of the final frame, and rows
+with malformed cells are rejected with a row-level error report.
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import numpy as np
+import openpyxl
+import pandas as pd
+import pyarrow as pa
+
+from outcomes.perf import span
+from outcomes.schema import COLUMNS, DTYPES, NA_VALUES, SHEET_NAME
+
+SNAPSHOT_DIR = Path(os.environ.get('EHS_SNAPSHOT_DIR', Path.home() / '.cache' / 'ehs-outcomes' / 'snapshots'))
+SNAPSHOT_SUFFIX = '.arrow'
+REPORT_METADATA_KEY = b'ehs_ingest_report'
+# Part of every snapshot's file name. Bump it whenever the ingest output changes (columns, dtypes, parsing rules,
+# the report), so snapshots written by older code are parsed again rather than read back in their old form.
+SNAPSHOT_VERSION = 1
+
+# Eviction limits for the snapshot directory
+MAX_SNAPSHOT_BYTES = int(os.environ.get('EHS_SNAPSHOT_MAX_BYTES', 512 * 1024 * 1024))
+MAX_SNAPSHOT_AGE = float(os.environ.get('EHS_SNAPSHOT_MAX_AGE', 30 * 24 * 60 * 60))
+
+# Rows converted per chunk while streaming the sheet
+CHUNK_ROWS = 5000
+
+# Worker processes used when several workbooks/sheets are ingested (defaults to the number of cores)
+INGEST_WORKERS = int(os.environ.get('EHS_INGEST_WORKERS', 0))
+# Workers are started from a clean server process rather than forked: the app's process runs threads (tornado,
+# background precomputation) whose held locks a forked child would inherit and could deadlock on
+INGEST_START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+# Cell text treated as missing: what the app declares plus read_excel's defaults
+STREAM_NA_VALUES = set(NA_VALUES) | {
+    '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+    '<NA>', 'NA', 'NULL', 'None', 'n/a', 'nan', 'null'
+}
+
+
+def fingerprint(data):
+    # Content hash of the uploaded bytes, used as the snapshot key
+    return hashlib.sha256(data).hexdigest()
+
+
+def _is_na(value):
+    return value is None or (isinstance(value, str) and value in STREAM_NA_VALUES) or (isinstance(value, float) and math.isnan(value))
+
+
+def _to_text(value):
+    # Same text pandas produces for a cell read into a string/category column
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _to_float(value):
+    if isinstance(value, (int, float)):
+        return float(value)
+    return float(str(value).strip())
+
+
+def _new_buffers(columns, capacity):
+    return {col: np.full(capacity, np.nan) if DTYPES[col] is float else np.empty(capacity, dtype=object) for col in columns}
+
+
+def _grow_buffers(buffers, capacity):
+    grown = _new_buffers(buffers, capacity)
+    for col, buffer in buffers.items():
+        grown[col][:len(buffer)] = buffer
+    return grown
+
+
+def stream_workbook(data, sheet_name=SHEET_NAME, chunk_rows=CHUNK_ROWS, progress=None):
+    # Stream the sheet row by row (openpyxl read-only mode) into preallocated typed column buffers.
+    # Returns (Outcomes, errors) where errors lists the rejected rows, one dict per bad cell.
+    workbook = openpyxl.load_workbook(io.BytesIO(data), read_only=True, data_only=True)
+    try:
+        if sheet_name not in workbook.sheetnames:
+            raise ValueError(f"Worksheet named '{sheet_name}' not found")
+        sheet = workbook[sheet_name]
+
+        # The 19 columns are matched by header name, so workbooks whose columns were moved still line up
+        rows = sheet.iter_rows(values_only=True)
+        header = [None if cell is None else str(cell).strip() for cell in next(rows, ())]
+        missing = [col for col in COLUMNS if col not in header]
+        if missing:
+            raise ValueError(f"Sheet '{sheet_name}' is missing the column(s): {', '.join(missing)}")
+        positions = [(header.index(col), col) for col in COLUMNS]
+
+        # The sheet dimension is only an estimate (it may be missing or stale), so buffers can still grow
+        expected_rows = max((sheet.max_row or 1) - 1, 0)
+        capacity = max(expected_rows, chunk_rows)
+        buffers = _new_buffers(COLUMNS, capacity)
+        errors = []
+        n_rows = 0
+        chunk = []
+
+        def write_chunk():
+            nonlocal buffers, capacity, n_rows
+            if n_rows + len(chunk) > capacity:
+                capacity = max(capacity * 2, n_rows + len(chunk))
+                buffers = _grow_buffers(buffers, capacity)
+
+            for excel_row, values in chunk:
+                row_errors = []
+                for position, col in positions:
+                    value = values[position] if position < len(values) else None
+                    if _is_na(value):
+                        continue
+                    if DTYPES[col] is float:
+                        try:
+                            buffers[col][n_rows] = _to_float(value)
+                        except ValueError:
+                            row_errors.append({'row': excel_row, 'column': col, 'value': str(value), 'error': 'not a number'})
+                    else:
+                        buffers[col][n_rows] = _to_text(value)
+
+                if row_errors:
+                    # Reject the whole row and clear what was already written for it
+                    errors.extend(row_errors)
+                    for col, buffer in buffers.items():
+                        buffer[n_rows] = np.nan if DTYPES[col] is float else None
+                else:
+                    n_rows += 1
+            chunk.clear()
+
+            if progress:
+                progress(min(n_rows / expected_rows, 1.0) if expected_rows else 1.0, n_rows)
+
+        for excel_row, values in enumerate(rows, start=2):
+            # Blank rows are skipped. read_excel only drops trailing ones and keeps the others as all-missing rows,
+            # which would count as students with no year.
+            if all(_is_na(value) for value in values):
+                continue
+            chunk.append((excel_row, values))
+            if len(chunk) >= chunk_rows:
+                write_chunk()
+        write_chunk()
+    finally:
+        workbook.close()
+
+    Outcomes = pd.DataFrame({col: pd.Series(buffers[col][:n_rows]).astype(dtype) for col, dtype in DTYPES.items()})
+    return Outcomes, errors
+
+
+def snapshot_path(key, snapshot_dir=None):
+    # Snapshots of an older SNAPSHOT_VERSION are never looked up again and age out through evict_snapshots
+    return Path(snapshot_dir or SNAPSHOT_DIR) / f'{key}.v{SNAPSHOT_VERSION}{SNAPSHOT_SUFFIX}'
+
+
+def write_snapshot(df, path, report=None):
+    # Write to a temporary file first so readers never see a partial snapshot
+    path.parent.mkdir(parents=True, exist_ok=True)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+
+    # The ingest report (row-level errors, per-file timings, conflicts) travels with the snapshot
+    metadata = dict(table.schema.metadata or {})
+    metadata[REPORT_METADATA_KEY] = json.dumps(report or {}).encode()
+    table = table.replace_schema_metadata(metadata)
+
+    tmp_path = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+    with pa.OSFile(str(tmp_path), 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, path)
+
+
+def read_snapshot(path):
+    # Returns (Outcomes, report) as they were when the snapshot was written
+    with pa.memory_map(str(path), 'r') as source:
+        table = pa.ipc.open_file(source).read_all()
+    df = _declared_types(table.to_pandas())
+    report = json.loads((table.schema.metadata or {}).get(REPORT_METADATA_KEY, b'{}'))
+
+    # Mark the snapshot as recently used for eviction (a read-only, server-provided snapshot is fine too)
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    return df, report
+
+
+def _declared_types(df):
+    # Re-apply the declared types in case the pandas metadata didn't round-trip
+    mismatched = {col: dtype for col, dtype in DTYPES.items() if col in df and df[col].dtype != dtype}
+    return df.astype(mismatched) if mismatched else df
+
+
+def snapshot_columns(key, columns, snapshot_dir=None):
+    return map_snapshot_columns(snapshot_path(key, snapshot_dir), columns)
+
+
+def map_snapshot_columns(path, columns):
+    # Loader for some columns of a snapshot, or None without one. The file is mapped now, so a later
+    # eviction can't pull it away, but its pages are only read when the loader is called.
+    try:
+        table = pa.ipc.open_file(pa.memory_map(str(path), 'r')).read_all().select(list(columns))
+    except (OSError, pa.ArrowInvalid, KeyError):
+        return None
+    return lambda: _declared_types(table.to_pandas())
+
+
+def evict_snapshots(snapshot_dir=None, max_bytes=MAX_SNAPSHOT_BYTES, max_age=MAX_SNAPSHOT_AGE, keep=()):
+    # Drop snapshots older than max_age, then the least recently used ones until under max_bytes
+    snapshot_dir = Path(snapshot_dir or SNAPSHOT_DIR)
+    if not snapshot_dir.is_dir():
+        return []
+
+    now = time.time()
+    keep = {Path(path) for path in keep}
+    snapshots = []
+    for path in snapshot_dir.glob(f'*{SNAPSHOT_SUFFIX}'):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        snapshots.append((stat.st_mtime, stat.st_size, path))
+    snapshots.sort()
+
+    removed = []
+    total = sum(size for _, size, _ in snapshots)
+    for mtime, size, path in snapshots:
+        if path in keep:
+            continue
+        if now - mtime <= max_age and total <= max_bytes:
+            continue
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+        total -= size
+        removed.append(path)
+    return removed
+
+
+def workbooks_fingerprint(workbooks, sheet_names=(SHEET_NAME,)):
+    # Key of a combined upload: a single "All Students" workbook keeps its plain content hash
+    sheet_names = list(sheet_names)
+    if len(workbooks) == 1 and sheet_names == [SHEET_NAME]:
+        return fingerprint(workbooks[0][1])
+    parts = [fingerprint(data) for _, data in workbooks] + sheet_names
+    return fingerprint('\n'.join(parts).encode())
+
+
+def parse_sheet(name, data, sheet_name, progress=None):
+    # Parse one sheet of one workbook; runs in a worker process when several sheets are ingested
+    start = time.perf_counter()
+    part = {'file': name, 'sheet': sheet_name, 'rows': 0, 'rejected': 0, 'seconds': 0.0, 'error': None}
+    try:
+        df, errors = stream_workbook(data, sheet_name=sheet_name, progress=progress)
+    except ValueError as error:
+        df, errors = None, []
+        part['error'] = str(error)
+    else:
+        part['rows'] = len(df)
+        part['rejected'] = len({error['row'] for error in errors})
+        errors = [{'file': name, 'sheet': sheet_name, **error} for error in errors]
+    part['seconds'] = round(time.perf_counter() - start, 3)
+    return df, errors, part
+
+
+def _dedupe(parts):
+    # Keep the last row for each 900# (later workbooks win) and report 900#s whose rows disagree
+    combined = pd.concat([df.assign(_source=label) for label, df in parts], ignore_index=True)
+    keyed = combined[combined['900#'].notna()]
+    duplicated = keyed[keyed.duplicated('900#', keep=False)]
+
+    conflicts = []
+    if not duplicated.empty:
+        groups = duplicated.groupby('900#', sort=True)
+        differing = pd.DataFrame({col: groups[col].nunique(dropna=False) > 1 for col in COLUMNS if col != '900#'})
+        differing = differing[differing.any(axis=1)]
+        sources = groups['_source'].unique()
+        for student_id, flags in differing.iterrows():
+            conflicts.append({'900#': student_id, 'sources': ', '.join(sources[student_id]), 'columns': ', '.join(flags.index[flags])})
+
+    drop = keyed.index[keyed.duplicated('900#', keep='last')]
+    combined = combined.drop(index=drop).drop(columns='_source').reset_index(drop=True)
+    return combined, conflicts, len(drop)
+
+
+def ingest_workbooks(workbooks, sheet_names=(SHEET_NAME,), max_workers=None, progress=None):
+    # Parse every (workbook, sheet) pair, in a process pool when there is more than one, and merge them.
+    # workbooks is a list of (file name, bytes). Returns (Outcomes, report).
+    tasks = [(name, data, sheet_name) for name, data in workbooks for sheet_name in sheet_names]
+    results = [None] * len(tasks)
+
+    if len(tasks) == 1:
+        results[0] = parse_sheet(*tasks[0], progress=progress)
+    else:
+        max_workers = min(len(tasks), max_workers or INGEST_WORKERS or os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context(INGEST_START_METHOD)) as pool:
+            futures = {pool.submit(parse_sheet, *task): i for i, task in enumerate(tasks)}
+            for done, future in enumerate(as_completed(futures), start=1):
+                results[futures[future]] = future.result()
+                if progress:
+                    progress(done / len(tasks), sum(part['rows'] for _, _, part in filter(None, results)))
+
+    # Parts stay in upload order so that "later workbooks win" is deterministic
+    parsed = [(f"{part['file']} / {part['sheet']}", df) for df, _, part in results if df is not None]
+    report = {
+        'errors': [error for _, errors, _ in results for error in errors],
+        'parts': [part for _, _, part in results],
+        'conflicts': [],
+        'duplicates_dropped': 0,
+    }
+    if not parsed:
+        raise ValueError('; '.join(part['error'] for part in report['parts']))
+
+    if len(parsed) == 1:
+        df = parsed[0][1]
+    else:
+        df, report['conflicts'], report['duplicates_dropped'] = _dedupe(parsed)
+        # Categories differ between parts, so the declared types are applied once more on the combined frame
+        df = df.astype(DTYPES)
+    return df, report
+
+
+def load_workbooks(workbooks, sheet_names=(SHEET_NAME,), key=None, snapshot_dir=None, progress=None):
+    # Return (Outcomes, fingerprint, report), parsing the workbooks only on a snapshot miss
+    key = key or workbooks_fingerprint(workbooks, sheet_names)
+    path = snapshot_path(key, snapshot_dir)
+
+    if path.exists():
+        try:
+            with span('ingest.snapshot') as record:
+                df, report = read_snapshot(path)
+                record['rows'] = len(df)
+            return df, key, report
+        except (OSError, pa.ArrowInvalid):
+            # Corrupt or truncated snapshot, rebuild it below
+            path.unlink(missing_ok=True)
+
+    with span('ingest', files=len(workbooks), sheets=len(sheet_names)) as record:
+        df, report = ingest_workbooks(workbooks, sheet_names, progress=progress)
+        record['rows'] = len(df)
+    try:
+        with span('ingest.snapshot_write', rows=len(df)):
+            write_snapshot(df, path, report)
+        evict_snapshots(snapshot_dir, keep=[path])
+    except OSError:
+        # A read-only or full disk only costs us the cache, not the upload
+        pass
+    return df, key, report
+
+
+def load_outcomes(data, key=None, snapshot_dir=None, progress=None):
+    # Single-workbook shortcut: return (Outcomes, fingerprint, report) for the "All Students" sheet
+    return load_workbooks([('workbook.xlsx', data)], key=key, snapshot_dir=snapshot_dir, progress=progress)
+
+
+def main(argv=None):
+    # Build a snapshot ahead of time, e.g. the server's default dataset (EHS_DEFAULT_SNAPSHOT)
+    parser = argparse.ArgumentParser(description="Parse EHS Student Outcomes workbook(s) into an Arrow snapshot.")
+    parser.add_argument('workbooks', nargs='+', help="Outcomes workbook(s) (.xlsx); several are combined like in the app")
+    parser.add_argument('--out', required=True, help="snapshot file to write (.arrow)")
+    parser.add_argument('--sheet', action='append', dest='sheets', help=f"sheet to read, may be repeated (default: {SHEET_NAME})")
+    args = parser.parse_args(argv)
+
+    workbooks = [(Path(path).name, Path(path).read_bytes()) for path in args.workbooks]
+    df, report = ingest_workbooks(workbooks, args.sheets or [SHEET_NAME])
+    write_snapshot(df, Path(args.out), report)
+    print(f"{len(df):,} students written to {args.out} ({len(report['errors'])} malformed cell(s) skipped)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""Year x route x degree count table behind the cascading sidebar options.
+
+The table is built with one groupby at load, so working out which routes and
+degrees exist for the chosen years is a lookup over a few dozen cells rather
+than a rescan of Outcomes. The counts double as labels for the multiselects.
+Answers are remembered per selection, so a filter rerun that doesn't change
+the inputs of an option list reuses it.
+"""
+
+import threading
+from collections import OrderedDict
+from functools import cached_property
+
+import pandas as pd
+
+from outcomes.schema import DEGREE, ROUTE, YEAR
+
+OPTION_KEYS = [YEAR, ROUTE, DEGREE]
+
+# Option lists remembered per table
+OPTION_CACHE_SIZE = 256
+
+
+def _count_table(df):
+    # One row per (year, route, degree) combination present in df, missing values included
+    return df.groupby(OPTION_KEYS, dropna=False, observed=True).size().reset_index(name='count')
+
+
+class OptionTable:
+    def __init__(self, df=None, table=None):
+        self.table = _count_table(df) if table is None else table
+        self._answers = OrderedDict()
+        self._lock = threading.Lock()
+
+    @cached_property
+    def years(self):
+        # Graduation years present, for the year selector
+        return sorted(self.table[YEAR].dropna().unique())
+
+    @property
+    def nbytes(self):
+        return int(self.table.memory_usage(deep=True).sum())
+
+    def _remembered(self, key, compute):
+        # Option lists are shared by every session; callers treat them as read-only
+        with self._lock:
+            if key in self._answers:
+                self._answers.move_to_end(key)
+                return self._answers[key]
+        answer = compute()
+        with self._lock:
+            self._answers[key] = answer
+            if len(self._answers) > OPTION_CACHE_SIZE:
+                self._answers.popitem(last=False)
+        return answer
+
+    def updated(self, removed, added):
+        # Table after taking the rows of removed out and adding those of added, without rescanning the frame
+        taken_out = _count_table(removed)
+        taken_out['count'] *= -1
+        table = pd.concat([self.table, taken_out, _count_table(added)], ignore_index=True)
+        table = table.groupby(OPTION_KEYS, dropna=False, observed=True)['count'].sum().reset_index()
+        return OptionTable(table=table[table['count'] > 0].reset_index(drop=True))
+
+    def _cells(self, selected_years, selected_work_type=None):
+        cells = self.table
+
+        # Filter data based on selected years
+        if not (selected_years and 'All Years' in selected_years):
+            cells = cells[cells[YEAR].isin(selected_years or [])]
+
+        # Apply work type filter only if "All" is not selected
+        if selected_work_type and 'All' not in selected_work_type:
+            cells = cells[cells[ROUTE].isin(selected_work_type)]
+        return cells
+
+    @staticmethod
+    def _counts(cells, col):
+        counts = cells.groupby(col, observed=True)['count'].sum()
+        return {value: int(count) for value, count in counts.items() if count > 0}
+
+    def work_type_options(self, selected_years, grad_school):
+        # (options, counts) for the Post-Graduation Route selector
+        key = ('work_type', tuple(selected_years or ()), grad_school)
+        return self._remembered(key, lambda: self._work_type_options(selected_years, grad_school))
+
+    def degree_options(self, selected_years, selected_work_type, grad_school):
+        # (options, counts) for the Degree(s) selector
+        key = ('degree', tuple(selected_years or ()), tuple(selected_work_type or ()), grad_school)
+        return self._remembered(key, lambda: self._degree_options(selected_years, selected_work_type, grad_school))
+
+    def _work_type_options(self, selected_years, grad_school):
+        counts = self._counts(self._cells(selected_years), ROUTE)
+        work_types = sorted(counts)
+
+        if 'All' not in work_types:
+            work_types.insert(0, 'All')
+
+        if 'Unknown' in work_types:
+            work_types.remove('Unknown')
+
+        # Remove 'Work' from options when "Graduate School?" is "Yes"
+        if grad_school == "Yes" and 'Work' in work_types:
+            work_types.remove('Work')
+
+        return work_types, counts
+
+    def _degree_options(self, selected_years, selected_work_type, grad_school):
+        counts = self._counts(self._cells(selected_years, selected_work_type), DEGREE)
+        degrees = sorted(counts)
+
+        # Insert 'All Degrees' at the top of the list if not already present
+        if 'All Degrees' not in degrees:
+            degrees.insert(0, 'All Degrees')
+
+        if 'No Degree' in degrees:
+            degrees.remove('No Degree')
+            degrees.insert(len(degrees), 'No Degree')
+
+        # Remove 'No Degree' from options when "Graduate School?" is "Yes"
+        if grad_school == "Yes" and 'No Degree' in degrees:
+            degrees.remove('No Degree')
+
+        return degrees, counts
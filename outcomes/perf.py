@@ -0,0 +1,118 @@
+"""Named timing spans for the stages of a request.
+
+    with span('filter') as record:
+        rows = ...
+        record['rows'] = len(rows)
+
+Each span records its wall time, an optional row count and how much the
+peak memory grew while it ran, into a bounded process-wide log shared by
+all sessions. Spans nest; a record names its parent span. Set
+EHS_PERF_LOG to a file path to also append every record to it as a JSON
+line.
+
+Peak memory comes from tracemalloc when it is tracing (python -X
+tracemalloc, or EHS_PERF_TRACEMALLOC=1), otherwise from the growth of the
+process's maximum resident set size, which is coarser but free.
+"""
+
+import json
+import os
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+MAX_RECORDS = int(os.environ.get('EHS_PERF_MAX_RECORDS', 10000))
+PERF_LOG = os.environ.get('EHS_PERF_LOG')
+
+if os.environ.get('EHS_PERF_TRACEMALLOC') == '1' and not tracemalloc.is_tracing():
+    tracemalloc.start()
+
+_records = deque(maxlen=MAX_RECORDS)
+_lock = threading.Lock()
+_local = threading.local()
+
+
+def _peak_memory():
+    # (bytes, source) of the peak memory so far
+    if tracemalloc.is_tracing():
+        return tracemalloc.get_traced_memory()[1], 'tracemalloc'
+    if resource is not None:
+        # ru_maxrss is in kilobytes on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024, 'maxrss'
+    return 0, None
+
+
+@contextmanager
+def span(name, **fields):
+    # Time the body; fields (and anything the body sets on the yielded record) are stored with it
+    stack = _local.__dict__.setdefault('stack', [])
+    record = {
+        'span': name,
+        'parent': stack[-1]['span'] if stack else None,
+        'start': time.time(),
+        'thread': threading.current_thread().name,
+        'rows': None,
+        **fields,
+    }
+    peak_before, source = _peak_memory()
+    stack.append(record)
+    started = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record['seconds'] = time.perf_counter() - started
+        stack.pop()
+        record['peak_memory_delta'] = _peak_memory()[0] - peak_before
+        record['memory_source'] = source
+        _add(record)
+
+
+def _add(record):
+    with _lock:
+        _records.append(record)
+        if PERF_LOG:
+            with open(PERF_LOG, 'a') as log:
+                log.write(json.dumps(record, default=str) + '\n')
+
+
+def records():
+    with _lock:
+        return list(_records)
+
+
+def clear():
+    with _lock:
+        _records.clear()
+
+
+def to_jsonl(records):
+    return ''.join(json.dumps(record, default=str) + '\n' for record in records)
+
+
+def summarize_spans(records):
+    # One row per span name: how often it ran and how its wall time, rows and memory are distributed
+    if not records:
+        return pd.DataFrame(columns=['span', 'calls', 'total_s', 'mean_ms', 'p95_ms', 'max_ms', 'mean_rows', 'max_peak_memory_delta'])
+    df = pd.DataFrame(records)
+    df['ms'] = df['seconds'] * 1000
+    df['rows'] = pd.to_numeric(df['rows'])
+    grouped = df.groupby('span')
+    summary = pd.DataFrame({
+        'calls': grouped.size(),
+        'total_s': grouped['seconds'].sum(),
+        'mean_ms': grouped['ms'].mean(),
+        'p95_ms': grouped['ms'].quantile(0.95),
+        'max_ms': grouped['ms'].max(),
+        'mean_rows': grouped['rows'].mean(),
+        'max_peak_memory_delta': grouped['peak_memory_delta'].max(),
+    })
+    return summary.sort_values('total_s', ascending=False).reset_index()
@@ -0,0 +1,169 @@
+"""Background precomputation of the most common selections after a load.
+
+As soon as a dataset is loaded, a small thread pool works through the
+selections users ask for most, in priority order: the default view, each
+single year, graduate school Yes/No, then each route. For each one it
+stores the filtered rows and the summary in the result cache, then the
+charts of the server's default chart mode in the chart cache: the
+Vega-Lite specs in browser mode, the PNG images only in image mode, so no
+matplotlib rendering is spent on images nobody is shown. These are the
+same caches, under the same filter signatures, that the dashboard reads,
+so clicking "Show Outcomes" on one of these selections finds everything
+already done.
+
+Threads rather than processes are used because the results must land in
+this process's caches. Filtering, aggregating and building specs are
+short NumPy/pandas passes, and the figures are standalone matplotlib
+Figures (see charts.py), so the work is safe to run next to the sessions.
+
+There is one job per dataset. It can be cancelled, for instance when a new
+workbook replaces the dataset. Its queued selections are then skipped,
+and a selection already running stops before its next stage.
+"""
+
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from outcomes.cache import filter_signature
+from outcomes.engine import render_selection, select_rows, selection_specs, summarize
+from outcomes.perf import span
+
+DEFAULT_VIEW = {'years': ['All Years'], 'grad_school': 'All Students', 'work_type': ['All'], 'degrees': ['All Degrees']}
+
+
+def common_selections(dataset):
+    # The sidebar selections most often shown, most common first, as the widgets hold them
+    selections = [DEFAULT_VIEW]
+    for year in reversed(dataset.options.years):
+        selections.append({**DEFAULT_VIEW, 'years': [year]})
+    selections.append({**DEFAULT_VIEW, 'grad_school': 'Yes'})
+    selections.append({**DEFAULT_VIEW, 'grad_school': 'No', 'work_type': None, 'degrees': None})
+    work_types, _ = dataset.options.work_type_options(DEFAULT_VIEW['years'], DEFAULT_VIEW['grad_school'])
+    for work_type in work_types:
+        if work_type != 'All':
+            selections.append({**DEFAULT_VIEW, 'work_type': [work_type]})
+    return selections
+
+
+def _result_size(rows, summary):
+    return int(rows.nbytes + summary['aggregates'].cells.memory_usage(deep=True).sum() + summary['degree_counts'].memory_usage(deep=True))
+
+
+def selection_result(dataset, result_cache, years=None, grad_school=None, work_type=None, degrees=None):
+    # (rows, summary) of a selection: the positions of its rows and the numbers shown above the charts
+    signature = filter_signature(dataset.key, years, grad_school, work_type, degrees)
+    result = result_cache.get(signature)
+    if result is None:
+        rows = select_rows(dataset, years=years, grad_school=grad_school, work_type=work_type, degrees=degrees)
+        summary = summarize(dataset, years=years, grad_school=grad_school, work_type=work_type, degrees=degrees)
+        result = (rows, summary)
+        result_cache.put(signature, result, _result_size(rows, summary))
+    return result
+
+
+def selection_chart(dataset, chart_cache, years=None, grad_school=None, work_type=None, degrees=None, summary=None):
+    # (PNG bytes, notes) of the matplotlib charts of a selection
+    signature = filter_signature(dataset.key, years, grad_school, work_type, degrees)
+    chart = chart_cache.get(signature)
+    if chart is None:
+        chart = render_selection(dataset, years, grad_school, work_type, degrees, summary=summary)
+        chart_cache.put(signature, chart, len(chart[0]))
+    return chart
+
+
+def selection_chart_specs(dataset, chart_cache, years=None, grad_school=None, work_type=None, degrees=None, summary=None):
+    # (Vega-Lite specs, notes) of a selection, kept in the chart cache next to its PNG
+    key = (filter_signature(dataset.key, years, grad_school, work_type, degrees), 'vega')
+    specs = chart_cache.get(key)
+    if specs is None:
+        specs = selection_specs(dataset, years, grad_school, work_type, degrees, summary=summary)
+        chart_cache.put(key, specs, len(json.dumps(specs[0])))
+    return specs
+
+
+class PrecomputeJob:
+    # Progress of the precomputation of one dataset's common selections
+    def __init__(self, key, selections):
+        self.key = key
+        self.selections = selections
+        self.total = 2 * len(selections)  # Results, then charts (specs or images)
+        self.done = 0
+        self.failed = 0
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    @property
+    def finished(self):
+        return self.cancelled or self.done >= self.total
+
+    @property
+    def progress(self):
+        return self.done / self.total if self.total else 1.0
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def _step_done(self, failed=False):
+        with self._lock:
+            self.done += 1
+            self.failed += failed
+
+
+class Precomputer:
+    def __init__(self, workers, result_cache, chart_cache, chart_mode='browser'):
+        # chart_mode: the charts prepared after the results, Vega-Lite specs ('browser') or PNG images ('image')
+        self.result_cache = result_cache
+        self.chart_cache = chart_cache
+        self.chart_mode = chart_mode
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='precompute') if workers > 0 else None
+        self._jobs = {}  # dataset key -> PrecomputeJob
+        self._lock = threading.Lock()
+
+    def start(self, dataset):
+        # The dataset's job, started unless it already ran or is running (None when precomputation is off)
+        if self._executor is None:
+            return None
+        with self._lock:
+            job = self._jobs.get(dataset.key)
+            if job is not None and not job.cancelled:
+                return job
+            job = self._jobs[dataset.key] = PrecomputeJob(dataset.key, common_selections(dataset))
+        # The pool takes tasks in order: every selection's results first, since they make a click instant,
+        # then their charts
+        for selection in job.selections:
+            self._executor.submit(self._run, job, dataset, selection, False)
+        for selection in job.selections:
+            self._executor.submit(self._run, job, dataset, selection, True)
+        return job
+
+    def job(self, key):
+        with self._lock:
+            return self._jobs.get(key)
+
+    def cancel(self, key):
+        with self._lock:
+            job = self._jobs.pop(key, None)
+        if job is not None:
+            job.cancel()
+
+    def _run(self, job, dataset, selection, chart):
+        if job.cancelled:
+            return
+        failed = False
+        image = self.chart_mode == 'image'
+        with span('precompute', stage=('image' if image else 'spec') if chart else 'result') as record:
+            try:
+                _, summary = selection_result(dataset, self.result_cache, **selection)
+                if chart and not job.cancelled:
+                    build = selection_chart if image else selection_chart_specs
+                    build(dataset, self.chart_cache, summary=summary, **selection)
+            except Exception as error:
+                # Recorded in the perf log; the foreground computes this selection itself when it is asked for
+                record['error'] = f"{type(error).__name__}: {error}"
+                failed = True
+        job._step_done(failed)
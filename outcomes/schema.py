@@ -0,0 +1,36 @@
+"""Column layout of the "All Students" sheet."""
+
+SHEET_NAME = 'All Students'
+
+# Types declared for each of the 19 columns (A:S) of the sheet
+DTYPES = {
+    'SCHOLARS': 'string',
+    'LAST NAME': 'string',
+    'FIRST NAME': 'string',
+    '900#': 'string',
+    'MAJOR': 'category',
+    'SUPPORT': 'category',
+    'YEAR': 'string',
+    'CLASSIFICATION': 'category',
+    'CATEGORY': 'string',
+    'DEGREE': 'category',
+    'CUMMULATIVE GPA': float,
+    'OVERALL GPA': float,
+    'CELL PHONE NUMBER': 'string',
+    'GRADUATE SCHOOL?': 'category',
+    'WHAT GRADUATE SCHOOL?': 'string',
+    'GRADUATE SCHOOL TYPE (IF ANY)': 'string',
+    'MAJOR IN GRADUATE SCHOOL?': 'string',
+    'HIGHEST DEGREE FROM GRADUATE SCHOOL': 'category',
+    'DECIDED TO WORK/TYPE OF GRADUATE SCHOOL': 'category'
+}
+
+COLUMNS = list(DTYPES)
+NA_VALUES = ['N/A', 'NaN', ""]
+
+# Columns the filters and charts are built on
+YEAR = 'YEAR'
+GRAD_SCHOOL = 'GRADUATE SCHOOL?'
+DEGREE = 'HIGHEST DEGREE FROM GRADUATE SCHOOL'
+ROUTE = 'DECIDED TO WORK/TYPE OF GRADUATE SCHOOL'
+GPA = 'CUMMULATIVE GPA'
@@ -0,0 +1,197 @@
+"""Server-side text search over names, graduate schools and majors.
+
+Every distinct word of the searched columns is stored once in a sorted
+vocabulary, with the row positions it occurs in laid out contiguously
+(CSR style). A prefix is therefore one bisect and one slice, and typos are
+found through a trigram index over the vocabulary (not the rows), then
+confirmed with a bounded edit distance. Multi-word queries intersect the
+rows of each word, and results are ranked exact > prefix > typo.
+"""
+
+import re
+import sys
+import threading
+import unicodedata
+from bisect import bisect_left
+from collections import Counter, OrderedDict
+from functools import cached_property
+
+import numpy as np
+import pandas as pd
+
+SEARCH_COLUMNS = (
+    'LAST NAME',
+    'FIRST NAME',
+    'WHAT GRADUATE SCHOOL?',
+    'MAJOR IN GRADUATE SCHOOL?',
+    'GRADUATE SCHOOL TYPE (IF ANY)',
+)
+
+# Match scores; a row's score is the sum over query words of its best match
+EXACT_SCORE = 3.0
+PREFIX_SCORE = 2.0
+FUZZY_SCORE = 1.0
+
+# Words shorter than this are matched by prefix only (too few trigrams to be typo tolerant)
+MIN_FUZZY_LENGTH = 4
+TERM_CACHE_SIZE = 256
+
+
+def tokenize(text):
+    # Lowercase words with accents removed, e.g. "Université Laval" -> ['universite', 'laval']
+    text = unicodedata.normalize('NFKD', str(text)).encode('ascii', 'ignore').decode()
+    return re.findall(r'[a-z0-9]+', text.lower())
+
+
+def trigrams(word):
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def max_edits(word):
+    return 0 if len(word) < MIN_FUZZY_LENGTH else 1 if len(word) < 8 else 2
+
+
+def edit_distance(a, b, limit):
+    # Optimal string alignment distance (a transposition counts as one edit), or limit + 1 once it is exceeded
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous, current = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        before, previous, current = previous, current, [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], before[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+    return current[-1]
+
+
+class SearchIndex:
+    def __init__(self, df, columns=SEARCH_COLUMNS):
+        self.n_rows = len(df)
+        postings = {}
+        for col in columns:
+            # Tokenize each distinct cell value once, then attach the rows holding it to each of its words
+            codes, uniques = pd.factorize(df[col])
+            order = np.argsort(codes, kind='stable')
+            bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+            for code, value in enumerate(uniques):
+                rows = order[bounds[code]:bounds[code + 1]]
+                for word in set(tokenize(value)):
+                    postings.setdefault(word, []).append(rows)
+
+        self.vocabulary = sorted(postings)
+        row_lists = [np.unique(np.concatenate(postings[word])) for word in self.vocabulary]
+        self.offsets = np.cumsum([0] + [len(rows) for rows in row_lists])
+        self.rows = np.concatenate(row_lists).astype(np.int32) if row_lists else np.empty(0, dtype=np.int32)
+
+        self.word_trigrams = {}
+        for word_id, word in enumerate(self.vocabulary):
+            for gram in trigrams(word):
+                self.word_trigrams.setdefault(gram, []).append(word_id)
+
+        self._term_cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    @cached_property
+    def nbytes(self):
+        # Posting arrays plus an estimate of the vocabulary strings and the trigram lists (the term cache is bounded)
+        words = sum(sys.getsizeof(word) + 8 for word in self.vocabulary)
+        grams = sum(sys.getsizeof(gram) + sys.getsizeof(ids) + 28 * len(ids) for gram, ids in self.word_trigrams.items())
+        return int(self.rows.nbytes + self.offsets.nbytes + words + grams + sys.getsizeof(self.word_trigrams))
+
+    def word_rows(self, first_id, last_id):
+        # Rows of the vocabulary words first_id..last_id - 1 (may repeat a row)
+        return self.rows[self.offsets[first_id]:self.offsets[last_id]]
+
+    def fuzzy_words(self, term):
+        # (word id, distance) of the words within max_edits(term) edits of term
+        limit = max_edits(term)
+        if not limit:
+            return []
+        grams = trigrams(term)
+        # An edit changes at most 3 trigrams (4 for a transposition), so closer words must share the rest
+        min_shared = max(len(grams) - 4 * limit, 1)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self.word_trigrams.get(gram, ()))
+        matches = []
+        for word_id, count in shared.items():
+            if count < min_shared:
+                continue
+            distance = edit_distance(term, self.vocabulary[word_id], limit)
+            if 0 < distance <= limit:
+                matches.append((word_id, distance))
+        return matches
+
+    def match_term(self, term):
+        # (sorted unique row positions, score per row) for one query word
+        with self._lock:
+            if term in self._term_cache:
+                self._term_cache.move_to_end(term)
+                return self._term_cache[term]
+
+        # Words starting with term form one contiguous range of the sorted vocabulary
+        first = bisect_left(self.vocabulary, term)
+        last = bisect_left(self.vocabulary, term + '\x7f', first)
+        exact = first < last and self.vocabulary[first] == term
+        parts = []
+        if exact:
+            parts.append((self.word_rows(first, first + 1), EXACT_SCORE))
+            first += 1
+        if first < last:
+            parts.append((self.word_rows(first, last), PREFIX_SCORE))
+        for word_id, distance in self.fuzzy_words(term):
+            parts.append((self.word_rows(word_id, word_id + 1), FUZZY_SCORE - 0.25 * (distance - 1)))
+
+        if sum(len(rows) for rows, _ in parts) > self.n_rows // 16:
+            # Broad matches: scatter into a dense score array, lowest scores first so each row keeps its best
+            best = np.zeros(self.n_rows)
+            for rows, score in sorted(parts, key=lambda part: part[1]):
+                best[rows] = score
+            rows = np.flatnonzero(best)
+            result = (rows, best[rows])
+        elif parts:
+            rows = np.concatenate([rows for rows, _ in parts])
+            scores = np.concatenate([np.full(len(rows), score) for rows, score in parts])
+            # Keep each row's best score: sort by row, best score first, then take the first of each run
+            order = np.lexsort((-scores, rows))
+            rows, scores = rows[order], scores[order]
+            first_of_row = np.r_[True, rows[1:] != rows[:-1]]
+            result = (rows[first_of_row], scores[first_of_row])
+        else:
+            result = (np.empty(0, dtype=np.int32), np.empty(0))
+
+        with self._lock:
+            self._term_cache[term] = result
+            if len(self._term_cache) > TERM_CACHE_SIZE:
+                self._term_cache.popitem(last=False)
+        return result
+
+    def search(self, query):
+        # (row positions, scores) of the rows matching every word of query, unranked
+        rows, scores = None, None
+        for term in dict.fromkeys(tokenize(query)):
+            term_rows, term_scores = self.match_term(term)
+            if rows is None:
+                rows, scores = term_rows, term_scores
+            else:
+                rows, left, right = np.intersect1d(rows, term_rows, assume_unique=True, return_indices=True)
+                scores = scores[left] + term_scores[right]
+        if rows is None:
+            return np.arange(self.n_rows), np.zeros(self.n_rows)
+        return rows, scores
+
+    def rank(self, rows, query):
+        # The given row positions that match query, best matches first (ties keep their order in rows)
+        if not tokenize(query):
+            return rows
+        hits, scores = self.search(query)
+        # Look the rows up in a dense score array rather than sorting both sides to intersect them
+        row_scores = np.zeros(self.n_rows)
+        row_scores[hits] = scores
+        matched = rows[row_scores[rows] > 0]
+        return matched[np.argsort(-row_scores[matched], kind='stable')]
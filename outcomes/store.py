@@ -0,0 +1,177 @@
+"""Process-wide store of loaded datasets, shared by every session.
+
+One Dataset is kept per workbook fingerprint, together with its derived
+structures (filter bitmaps, option table, aggregate cube, sort and search
+indexes), and every session showing that workbook uses the same object.
+Filters return row positions into it, and pages and exports take only the
+rows they need. Nothing writes to a stored dataset; pandas copy-on-write
+keeps the frames taken from it from writing back.
+
+A dataset is charged for its frame and for each derived structure it has
+built: datasets build those lazily and report their new size (see
+Dataset.on_resize), so the budget follows what they really hold.
+
+Each session holds a Lease. A dataset that some lease holds is never
+evicted. The others are evicted least recently used first once the store
+is over its memory budget. A lease lets go of its dataset when it holds
+another one, is released, or is garbage collected with its session. When
+several sessions ask for a workbook that is not loaded yet, it is loaded
+once and the others wait for it.
+"""
+
+import itertools
+import threading
+import weakref
+from collections import OrderedDict
+from functools import partial
+
+
+class Lease:
+    # One holder's (a session's) reference to a dataset of a DatasetStore
+    def __init__(self, store, owner):
+        self.store = store
+        self.owner = owner
+        weakref.finalize(self, store.release, owner)
+
+    @property
+    def key(self):
+        return self.store.held_key(self.owner)
+
+    def release(self):
+        self.store.release(self.owner)
+
+
+class DatasetStore:
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._entries = OrderedDict()  # key -> (dataset, size)
+        self._holders = {}  # key -> owners holding it
+        self._held = {}  # owner -> key
+        self._loading = {}  # key -> lock of the load in progress
+        # Reentrant, because a lease can be garbage collected (and release) while the lock is held
+        self._lock = threading.RLock()
+        self._owners = itertools.count()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def lease(self):
+        return Lease(self, next(self._owners))
+
+    def get(self, key, default=None, lease=None):
+        # The dataset stored under key; with a lease, the lease now holds it
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            self._entries.move_to_end(key)
+            if lease is not None:
+                self._hold(lease.owner, key)
+            return entry[0]
+
+    def put(self, key, dataset, size, lease=None):
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.total_bytes -= old[1]
+            self._entries[key] = (dataset, size)
+            self.total_bytes += size
+            if hasattr(dataset, 'on_resize'):
+                dataset.on_resize = partial(self.resize, key)
+            if lease is not None:
+                self._hold(lease.owner, key)
+            self._evict()
+
+    def resize(self, key, dataset, size):
+        # The dataset stored under key now takes size bytes (it built a derived structure); others may be evicted
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] is not dataset:
+                return
+            self._entries[key] = (dataset, size)
+            self.total_bytes += size - entry[1]
+            self._evict()
+
+    def get_or_load(self, key, load, lease=None):
+        # The dataset stored under key, or load() stored under it. Concurrent callers for the same key wait
+        # for the first one's load instead of loading it again.
+        dataset = self.get(key, lease=lease)
+        if dataset is not None:
+            return dataset
+        with self._lock:
+            loading = self._loading.setdefault(key, threading.Lock())
+        with loading:
+            try:
+                dataset = self.get(key, lease=lease)
+                if dataset is None:
+                    dataset = load()
+                    self.put(key, dataset, dataset.nbytes, lease=lease)
+            finally:
+                with self._lock:
+                    self._loading.pop(key, None)
+        return dataset
+
+    def release(self, owner):
+        # Let go of whatever owner holds; the dataset may now be evicted
+        with self._lock:
+            key = self._held.pop(owner, None)
+            if key is not None:
+                self._drop(owner, key)
+                self._evict()
+
+    def held_key(self, owner):
+        with self._lock:
+            return self._held.get(owner)
+
+    def holders(self, key):
+        # Number of leases (sessions) holding key
+        with self._lock:
+            return len(self._holders.get(key, ()))
+
+    def items(self):
+        # Snapshot of (key, dataset, size), least recently used first
+        with self._lock:
+            return [(key, dataset, size) for key, (dataset, size) in self._entries.items()]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'datasets': len(self._entries),
+                'held': len(self._holders),
+                'leases': len(self._held),
+                'bytes': self.total_bytes,
+                'max_bytes': self.max_bytes,
+            }
+
+    def _hold(self, owner, key):
+        # A lease holds one dataset at a time (the one its session shows)
+        previous = self._held.get(owner)
+        if previous == key:
+            return
+        self._held[owner] = key
+        self._holders.setdefault(key, set()).add(owner)
+        if previous is not None:
+            self._drop(owner, previous)
+            self._evict()
+
+    def _drop(self, owner, key):
+        holders = self._holders.get(key)
+        if holders is not None:
+            holders.discard(owner)
+            if not holders:
+                self._holders.pop(key, None)
+
+    def _evict(self):
+        # Evict least recently used datasets that no lease holds until under budget
+        for key in list(self._entries):
+            if self.total_bytes <= self.max_bytes:
+                break
+            if key in self._holders:
+                continue
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self.total_bytes -= entry[1]
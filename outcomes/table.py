@@ -0,0 +1,96 @@
+"""Server-side paging and sorting of the filtered rows.
+
+Sort permutations are computed once per (column, direction) and dataset.
+Ordering a selection is then one boolean gather over the permutation (one
+per run of increasing positions, merged so that ties keep the selection's
+order, for "All Students"), and only the rows and columns of the visible
+page are materialized.
+"""
+
+import math
+import threading
+
+import numpy as np
+import pandas as pd
+
+from outcomes.perf import span
+
+PAGE_SIZES = [25, 50, 100, 250]
+
+# Rows made of more increasing runs than this are sorted directly rather than gathered run by run
+MAX_GATHERED_RUNS = 4
+
+
+class SortIndex:
+    def __init__(self, get_column, n_rows, on_grow=None):
+        # get_column(col) returns the whole column as a Series; on_grow() is called after a permutation is added
+        self.get_column = get_column
+        self.n_rows = n_rows
+        self.on_grow = on_grow
+        self._keys = {}  # col -> (sort key of each row, number of distinct values)
+        self._permutations = {}
+        self._lock = threading.Lock()
+
+    @property
+    def nbytes(self):
+        with self._lock:
+            keys = sum(keys.nbytes for keys, _ in self._keys.values())
+            return keys + sum(permutation.nbytes for permutation in self._permutations.values())
+
+    def _sort_keys(self, col, ascending):
+        # Called with the lock held. Sort on the codes of the sorted distinct values rather than Series.rank, which
+        # the pyarrow-backed string columns pass to a deprecated pyarrow option. Missing values (code -1) go last.
+        if col not in self._keys:
+            codes, uniques = pd.factorize(self.get_column(col), sort=True)
+            self._keys[col] = (np.where(codes < 0, len(uniques), codes).astype(np.int32), len(uniques))
+        keys, n_values = self._keys[col]
+        return keys if ascending else np.where(keys < n_values, n_values - 1 - keys, keys)
+
+    def permutation(self, col, ascending=True):
+        # Row positions of the whole frame in sorted order (stable, missing values last)
+        key = (col, ascending)
+        added = False
+        with self._lock:
+            permutation = self._permutations.get(key)
+            if permutation is None:
+                permutation = np.argsort(self._sort_keys(col, ascending), kind='stable')
+                self._permutations[key] = permutation
+                added = True
+        if added and self.on_grow is not None:
+            self.on_grow()
+        return permutation
+
+    def sort_rows(self, rows, col, ascending=True):
+        # The given row positions reordered by col; rows that tie keep their order in rows
+        permutation = self.permutation(col, ascending)
+        # Runs of increasing positions: one for most selections, two for "All Students" (graduate students first)
+        runs = np.split(rows, np.flatnonzero(np.diff(rows) < 0) + 1)
+        if len(runs) > MAX_GATHERED_RUNS:
+            with self._lock:
+                keys = self._sort_keys(col, ascending)
+            return rows[np.argsort(keys[rows], kind='stable')]
+        parts = []
+        for run in runs:
+            selected = np.zeros(self.n_rows, dtype=bool)
+            selected[run] = True
+            parts.append(permutation[selected[permutation]])
+        if len(parts) == 1:
+            return parts[0]
+        # Merge the sorted runs, earlier runs first among equal values
+        ordered = np.concatenate(parts)
+        with self._lock:
+            keys = self._sort_keys(col, ascending)
+        return ordered[np.argsort(keys[ordered], kind='stable')]
+
+
+def page_count(n_rows, page_size):
+    return max(math.ceil(n_rows / page_size), 1)
+
+
+def page_frame(dataset, rows, page=1, page_size=PAGE_SIZES[0], sort_by=None, ascending=True, columns=None):
+    # The visible slice of the filtered rows (page numbers start at 1)
+    with span('table', rows=len(rows), sort_by=sort_by):
+        if sort_by:
+            rows = dataset.sort_index.sort_rows(rows, sort_by, ascending)
+        start = (page - 1) * page_size
+        return dataset.take(rows[start:start + page_size], columns)
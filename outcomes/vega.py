@@ -0,0 +1,193 @@
+"""Vega-Lite specs of the degree pie chart and the GPA bar chart.
+
+The browser draws these charts (st.vega_lite_chart), so the server only
+computes the few aggregated numbers they show (students per degree, average
+GPA per degree or year) instead of rasterizing a figure. Titles, legends,
+the "Workforce" label and the hidden labels of small slices are the same as
+in the matplotlib charts (charts.py), which remain the static/export
+rendering. The data is inlined in each spec, so a spec is a plain,
+JSON-serializable dict.
+
+The cohort comparison charts (a box plot of the quartiles and a histogram
+per cohort) are drawn from the precomputed statistics of cohorts.py the same
+way.
+"""
+
+import json
+import math
+
+from outcomes.charts import bar_title, degree_shares, gpa_series, pie_title
+from outcomes.perf import span
+
+SCHEMA = 'https://vega.github.io/schema/vega-lite/v5.json'
+
+
+def _number(value):
+    # JSON has no NaN; a missing average is drawn as no bar
+    return None if value is None or math.isnan(value) else float(value)
+
+
+def pie_spec(degree_counts, title):
+    total = degree_counts.sum()
+    values = []
+    for order, (degree, count) in enumerate(degree_counts.items()):
+        pct = count / total * 100
+        values.append({
+            'degree': degree,
+            'students': int(count),
+            'share': pct / 100,
+            'order': order,
+            'legend': f"{degree}: {pct:.1f}%",
+            # Labels of slices 2% or less and percentages under 2% are left out, as in the PNG chart
+            'label': degree if pct > 2 else '',
+            'pct': f'{pct:.1f}%' if pct >= 2 else '',
+        })
+
+    return {
+        '$schema': SCHEMA,
+        'title': {'text': title, 'fontSize': 16},
+        'data': {'values': values},
+        'height': 420,
+        # Every layer stacks all slices in the same order, so the text lands on its own slice
+        'encoding': {
+            'theta': {'field': 'students', 'type': 'quantitative', 'stack': True},
+            'order': {'field': 'order', 'type': 'quantitative'},
+        },
+        'layer': [
+            {
+                'mark': {'type': 'arc', 'outerRadius': 150, 'stroke': 'white', 'strokeWidth': 2},
+                'encoding': {
+                    'color': {'field': 'legend', 'type': 'nominal', 'title': 'Degrees', 'sort': None,
+                              'scale': {'scheme': 'category20c'}, 'legend': {'labelLimit': 300}},
+                    'tooltip': [
+                        {'field': 'degree', 'type': 'nominal', 'title': 'Degree'},
+                        {'field': 'students', 'type': 'quantitative', 'title': 'Students'},
+                        {'field': 'share', 'type': 'quantitative', 'title': 'Share', 'format': '.1%'},
+                    ],
+                },
+            },
+            {'mark': {'type': 'text', 'radius': 180, 'fontSize': 13}, 'encoding': {'text': {'field': 'label'}}},
+            {'mark': {'type': 'text', 'radius': 125, 'fontSize': 12}, 'encoding': {'text': {'field': 'pct'}}},
+        ],
+        'view': {'stroke': None},
+    }
+
+
+def bar_spec(avg_gpa, by, title):
+    values = [
+        {by: str(label), 'gpa': _number(gpa), 'legend': f"{label} - {gpa:.2f}"}
+        for label, gpa in avg_gpa.items()
+    ]
+    x = {'field': by, 'type': 'nominal', 'title': by, 'sort': None, 'axis': {'labelAngle': 0}}
+    y = {'field': 'gpa', 'type': 'quantitative', 'title': 'Average GPA'}
+
+    return {
+        '$schema': SCHEMA,
+        'title': {'text': title, 'fontSize': 16},
+        'data': {'values': values},
+        'height': 400,
+        'encoding': {'x': x, 'y': y},
+        'layer': [
+            {
+                'mark': {'type': 'bar', 'stroke': 'black'},
+                'encoding': {
+                    'color': {'field': 'legend', 'type': 'nominal', 'sort': None, 'scale': {'scheme': 'paired'},
+                              'title': "Degrees and Avg GPA" if by == "Degree" else "Years and Avg GPA",
+                              'legend': {'labelLimit': 300}},
+                    'tooltip': [
+                        {'field': by, 'type': 'nominal'},
+                        {'field': 'gpa', 'type': 'quantitative', 'title': 'Average GPA', 'format': '.2f'},
+                    ],
+                },
+            },
+            {'mark': {'type': 'text', 'baseline': 'bottom', 'dy': -3}, 'encoding': {'text': {'field': 'gpa', 'format': '.2f'}}},
+        ],
+        'config': {'axisY': {'gridDash': [4, 4]}, 'axisX': {'grid': False}},
+    }
+
+
+# Specs of the charts of one selection, with the same notes render_charts gives when a chart is left out
+def chart_specs(aggregates, years, grad_school, work_type, degrees, show_pie):
+    specs, notes = [], []
+    with span('chart.spec', rows=aggregates.total, pie=show_pie) as record:
+        if show_pie:
+            degree_counts = degree_shares(aggregates, degrees)
+            if degree_counts is None:
+                notes.append("Pie chart is not displayed for a single degree selection or if no data is available.")
+            else:
+                specs.append(pie_spec(degree_counts, pie_title(years, work_type)))
+
+        if aggregates.empty:
+            notes.append("No data available for the selected filters. Cannot generate plot.")
+        else:
+            avg_gpa, by = gpa_series(aggregates, years)
+            if avg_gpa.empty:
+                notes.append("No GPA data available for the selected filters. Cannot generate plot.")
+            else:
+                specs.append(bar_spec(avg_gpa, by, bar_title(years, degrees, work_type, grad_school)))
+        record['bytes'] = len(json.dumps(specs))
+    return specs, notes
+
+
+def cohort_box_spec(stats, by_label, column):
+    # Box plot of precomputed quartiles: whiskers to min/max, box from q1 to q3, median tick and mean point
+    values = [
+        {'cohort': str(label), **{name: _number(row[name]) for name in
+                                  ['min', 'q1', 'median', 'q3', 'max', 'mean', 'mean_ci_low', 'mean_ci_high']},
+         'with_gpa': int(row['with_gpa'])}
+        for label, row in stats[stats['with_gpa'] > 0].iterrows()
+    ]
+    x = {'field': 'cohort', 'type': 'nominal', 'title': by_label, 'sort': None, 'axis': {'labelAngle': 0}}
+    tooltip = [{'field': 'cohort', 'type': 'nominal', 'title': by_label},
+               {'field': 'with_gpa', 'type': 'quantitative', 'title': 'Students with a GPA'}] + [
+        {'field': name, 'type': 'quantitative', 'format': '.2f', 'title': title}
+        for name, title in [('min', 'Min'), ('q1', 'Q1'), ('median', 'Median'), ('q3', 'Q3'), ('max', 'Max'),
+                            ('mean', 'Mean'), ('mean_ci_low', 'Mean 95% CI low'), ('mean_ci_high', 'Mean 95% CI high')]
+    ]
+
+    return {
+        '$schema': SCHEMA,
+        'title': {'text': f"{column} by {by_label}", 'fontSize': 16},
+        'data': {'values': values},
+        'height': 360,
+        'encoding': {'x': x, 'tooltip': tooltip},
+        'layer': [
+            {'mark': {'type': 'rule'}, 'encoding': {
+                'y': {'field': 'min', 'type': 'quantitative', 'title': column, 'scale': {'zero': False}}, 'y2': {'field': 'max'}}},
+            {'mark': {'type': 'bar', 'size': 28, 'stroke': 'black'}, 'encoding': {
+                'y': {'field': 'q1', 'type': 'quantitative'}, 'y2': {'field': 'q3'},
+                'color': {'field': 'cohort', 'type': 'nominal', 'sort': None, 'scale': {'scheme': 'paired'}, 'legend': None}}},
+            {'mark': {'type': 'tick', 'size': 28, 'thickness': 2, 'color': 'black'}, 'encoding': {
+                'y': {'field': 'median', 'type': 'quantitative'}}},
+            {'mark': {'type': 'point', 'shape': 'diamond', 'filled': True, 'color': 'white', 'stroke': 'black'}, 'encoding': {
+                'y': {'field': 'mean', 'type': 'quantitative'}}},
+        ],
+        'config': {'axisY': {'gridDash': [4, 4]}, 'axisX': {'grid': False}},
+    }
+
+
+def cohort_histogram_spec(histogram, by_label, column):
+    # Students per GPA bin, one bar per cohort side by side in each bin
+    values = [
+        {'bin': bin_label, 'cohort': str(label), 'students': int(count)}
+        for label, row in histogram.iterrows() for bin_label, count in row.items()
+    ]
+    return {
+        '$schema': SCHEMA,
+        'title': {'text': f"{column} distribution by {by_label}", 'fontSize': 16},
+        'data': {'values': values},
+        'height': 360,
+        'mark': {'type': 'bar'},
+        'encoding': {
+            'x': {'field': 'bin', 'type': 'ordinal', 'title': column, 'sort': None, 'axis': {'labelAngle': 0}},
+            'xOffset': {'field': 'cohort', 'type': 'nominal', 'sort': None},
+            'y': {'field': 'students', 'type': 'quantitative', 'title': 'Students'},
+            'color': {'field': 'cohort', 'type': 'nominal', 'sort': None, 'title': by_label, 'scale': {'scheme': 'paired'}},
+            'tooltip': [
+                {'field': 'cohort', 'type': 'nominal', 'title': by_label},
+                {'field': 'bin', 'type': 'ordinal', 'title': column},
+                {'field': 'students', 'type': 'quantitative', 'title': 'Students'},
+            ],
+        },
+        'config': {'axisY': {'gridDash': [4, 4]}, 'axisX': {'grid': False}},
+    }
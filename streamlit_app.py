@@ -1,48 +1,208 @@
+import os
+from pathlib import Path
+
 import streamlit as st
 import pandas as pd
-import numpy as np
-
-import matplotlib.pyplot as plt
-import matplotlib.cm as cm
-import matplotlib.colors as mcolors
-import matplotlib.patches as mpatches
 
 # import plotly.express as px
 # import plotly.graph_objects as go
 
-from IPython.display import clear_output
 #Version 5 - 'No Degree' to 'Workforce' & Blue Color Palet & Spaced Legend
 
+from outcomes.cache import ByteLRUCache, filter_signature
+from outcomes.cohorts import BOOTSTRAP_RESAMPLES, COMPARE_BY, GPA_COLUMNS
+from outcomes.compact import SIDE_COLUMNS
+from outcomes.dataset import Dataset
+from outcomes.delta import apply_delta
+from outcomes.engine import compare_cohorts, filter_outcomes, search_rows
+from outcomes.export import EXPORT_FORMATS, SENSITIVE_COLUMNS, cached_export
+from outcomes.ingest import fingerprint, load_workbooks, map_snapshot_columns, read_snapshot, snapshot_columns, workbooks_fingerprint
+from outcomes.precompute import Precomputer, selection_chart, selection_chart_specs, selection_result
+from outcomes.perf import clear as clear_spans, records as span_records, span, summarize_spans, to_jsonl
+from outcomes.schema import SHEET_NAME
+from outcomes.store import DatasetStore
+from outcomes.table import PAGE_SIZES, page_count, page_frame
+from outcomes.vega import cohort_box_spec, cohort_histogram_spec
+
+DATASET_CACHE_BYTES = int(os.environ.get('EHS_DATASET_CACHE_BYTES', 1024 * 1024 * 1024))
+CHART_CACHE_BYTES = int(os.environ.get('EHS_CHART_CACHE_BYTES', 64 * 1024 * 1024))
+RESULT_CACHE_BYTES = int(os.environ.get('EHS_RESULT_CACHE_BYTES', 64 * 1024 * 1024))
+EXPORT_CACHE_BYTES = int(os.environ.get('EHS_EXPORT_CACHE_BYTES', 128 * 1024 * 1024))
+# Prebuilt snapshot (python -m outcomes.ingest WORKBOOK --out FILE) shown until a workbook is uploaded
+DEFAULT_SNAPSHOT = os.environ.get('EHS_DEFAULT_SNAPSHOT')
+# Charts drawn by the browser from the aggregated numbers ('browser'), or rendered to PNG on the server ('image')
+CHART_MODES = {'browser': "Interactive (drawn in the browser)", 'image': "Image (rendered on the server)"}
+CHART_MODE = os.environ.get('EHS_CHART_MODE', 'browser')
+# Background threads precomputing the common selections of a loaded dataset (0 turns precomputation off)
+PRECOMPUTE_WORKERS = int(os.environ.get('EHS_PRECOMPUTE_WORKERS', 2))
+
 st.set_page_config(page_title="EHS Alumnae Outcomes Dashboard")
 st.title('EHS Student Outcomes Dashboard', anchor=False)
 st.link_button("By Christian Johnson", "https://linktr.ee/godgirl1?utm_source=linktree_profile_share&ltsid=4ed1c8e4-ed21-4aed-a83b-7f9aed0d584a")
 st.header('To start, upload the needed file :envelope_with_arrow: below!', divider='blue')
 st.subheader('Please make sure that all the data you would like to filter is in the "All Students" sheet of the workbook.', divider='gray')
 
-#Load Data
-uploaded_file = st.file_uploader("Upload 'EHS DataStatistics Phase II (Student Outcomes).xlsx' file", type=['xlsx'])
-if uploaded_file:
-    Outcomes = pd.read_excel(uploaded_file, sheet_name='All Students', index_col=None, usecols='A:S', dtype={
-        'SCHOLARS': 'string',
-        'LAST NAME': 'string',
-        'FIRST NAME': 'string',
-        '900#': 'string',
-        'MAJOR': 'category',
-        'SUPPORT': 'category',
-        'YEAR': 'string',
-        'CLASSIFICATION': 'category',
-        'CATEGORY': 'string',
-        'DEGREE': 'category',
-        'CUMMULATIVE GPA': float,
-        'OVERALL GPA': float,
-        'CELL PHONE NUMBER': 'string',
-        'GRADUATE SCHOOL?': 'category',
-        'WHAT GRADUATE SCHOOL?': 'string',
-        'GRADUATE SCHOOL TYPE (IF ANY)': 'string',
-        'MAJOR IN GRADUATE SCHOOL?': 'string',
-        'HIGHEST DEGREE FROM GRADUATE SCHOOL': 'category',
-        'DECIDED TO WORK/TYPE OF GRADUATE SCHOOL': 'category'
-    }, na_values=['N/A', 'NaN', ""])
+#Load Data (parsed once per distinct workbook, then reloaded from its Arrow snapshot)
+# Loaded datasets, one per workbook fingerprint shared by all sessions; a dataset a session shows is never evicted
+@st.cache_resource
+def get_dataset_store():
+    return DatasetStore(DATASET_CACHE_BYTES)
+
+# This session's hold on the dataset it shows, let go when the session ends
+def session_lease():
+    if "dataset_lease" not in st.session_state:
+        st.session_state["dataset_lease"] = get_dataset_store().lease()
+    return st.session_state["dataset_lease"]
+
+def load_dataset(dataset_key, workbooks, sheet_names, progress_area, previous_key=None):
+    dataset_store = get_dataset_store()
+
+    # Only runs when no session has this workbook loaded; sessions uploading it meanwhile wait for this load
+    def load():
+        # An upload is diffed only against the workbook this session had loaded, never another session's
+        previous = dataset_store.get(previous_key) if previous_key else None
+        # Report parsing progress (only happens on a snapshot miss)
+        def show_progress(fraction, rows_read):
+            progress_area.progress(fraction, text=f"Reading {', '.join(sheet_names)}... {rows_read:,} rows")
+
+        with st.spinner("Loading workbook..."):
+            Outcomes, _, report = load_workbooks(workbooks, sheet_names, key=dataset_key, progress=show_progress)
+            # Compact the frame; 900# and phone numbers are read back from the snapshot only when shown or exported
+            side_loader = snapshot_columns(dataset_key, SIDE_COLUMNS)
+            if previous is not None:
+                # A re-uploaded workbook: diff it against the previous one on 900# and update the filter bitmaps,
+                # option counts, aggregate cube and cached charts/downloads from the rows that changed
+                dataset, changes = apply_delta(previous, Outcomes, dataset_key, report, side_loader=side_loader, caches=[get_chart_cache(), get_export_cache()])
+                # The change summary is this session's (the dataset may be shared with other sessions)
+                st.session_state["dataset_changes"] = {**changes, 'key': dataset_key}
+            else:
+                dataset = Dataset(Outcomes, dataset_key, report, side_loader=side_loader)
+            del Outcomes
+            with span('index', rows=len(dataset)):
+                # Build the filter bitmaps, option counts and aggregate cube once per workbook (unless updated above)
+                dataset.filter_index
+                dataset.options
+                dataset.cube
+        return dataset
+
+    dataset = dataset_store.get_or_load(dataset_key, load, lease=session_lease())
+    progress_area.empty()
+    return dataset
+
+# Rendered chart PNGs, shared by all sessions and keyed by filter signature
+@st.cache_resource
+def get_chart_cache():
+    return ByteLRUCache(CHART_CACHE_BYTES)
+
+# Filtered rows and summaries, shared by all sessions and keyed by filter signature
+@st.cache_resource
+def get_result_cache():
+    return ByteLRUCache(RESULT_CACHE_BYTES)
+
+# Precomputes the common selections of each loaded dataset into the result and chart caches
+@st.cache_resource
+def get_precomputer():
+    return Precomputer(PRECOMPUTE_WORKERS, get_result_cache(), get_chart_cache(), chart_mode=CHART_MODE)
+
+# Exported files, shared by all sessions and keyed by filter signature, format and dropped columns
+@st.cache_resource
+def get_export_cache():
+    return ByteLRUCache(EXPORT_CACHE_BYTES)
+
+# The server's default dataset, read from its snapshot (no Excel parse) into the dataset store like an upload:
+# it counts toward the store's budget, and once the snapshot is replaced its old dataset is evicted when unheld
+def load_default_dataset(path):
+    snapshot = Path(path)
+    stat = snapshot.stat()
+    # Keyed by file identity rather than content, so a replaced snapshot is read again and gets fresh charts and downloads
+    dataset_key = fingerprint(f"{snapshot.resolve()}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+
+    def load():
+        with st.spinner("Loading the default dataset..."):
+            Outcomes, report = read_snapshot(snapshot)
+            with span('index', rows=len(Outcomes)):
+                dataset = Dataset(Outcomes, dataset_key, report, side_loader=map_snapshot_columns(snapshot, SIDE_COLUMNS))
+                dataset.filter_index
+                dataset.options
+                dataset.cube
+        return dataset
+
+    return get_dataset_store().get_or_load(dataset_key, load, lease=session_lease())
+
+uploaded_files = st.file_uploader("Upload 'EHS DataStatistics Phase II (Student Outcomes).xlsx' file(s)", type=['xlsx'], accept_multiple_files=True, help="Upload one workbook per cohort to combine them. Students appearing in several workbooks (same 900#) are kept once, from the last workbook uploaded.")
+sheet_names = st.text_input("Sheet(s) to read", SHEET_NAME, help="Comma-separated sheet names, read from every uploaded workbook.")
+sheet_names = [name.strip() for name in sheet_names.split(',') if name.strip()] or [SHEET_NAME]
+dataset = None
+if uploaded_files:
+    # The same files (upload ids and sizes) and sheets as the last run: reuse its fingerprint instead of hashing them again
+    upload = (tuple((uploaded_file.file_id, uploaded_file.size) for uploaded_file in uploaded_files), tuple(sheet_names))
+    if st.session_state.get("upload") == upload:
+        dataset = get_dataset_store().get(st.session_state.get("dataset_key"), lease=session_lease())
+    if dataset is None:
+        workbooks = [(uploaded_file.name, uploaded_file.getvalue()) for uploaded_file in uploaded_files]
+        dataset_key = workbooks_fingerprint(workbooks, sheet_names)
+        previous_key = st.session_state.get("dataset_key")
+        try:
+            dataset = load_dataset(dataset_key, workbooks, sheet_names, st.empty(), previous_key=previous_key)
+        except ValueError as error:
+            st.error(f"The workbook could not be read: {error}")
+            st.stop()
+        # A new workbook replaces the previous one: stop precomputing for it unless another session still shows it
+        if previous_key and previous_key != dataset_key and not get_dataset_store().holders(previous_key):
+            get_precomputer().cancel(previous_key)
+        st.session_state["dataset_key"] = dataset_key
+        st.session_state["upload"] = upload
+elif DEFAULT_SNAPSHOT:
+    try:
+        # The session's lease moves to the default dataset, so an upload it showed before can be evicted now
+        dataset = load_default_dataset(DEFAULT_SNAPSHOT)
+        st.info(f"Showing the default dataset ({len(dataset):,} students). Upload a workbook above to use your own instead.")
+    except (OSError, ValueError) as error:
+        st.warning(f"The default dataset could not be loaded: {error}")
+
+if dataset is not None:
+    Outcomes = dataset.frame
+    # Start preparing the common selections in the background (once per dataset)
+    precompute_job = get_precomputer().start(dataset)
+
+    # Rows with malformed cells are left out of the dashboard, list them for whoever maintains the workbook
+    if dataset.errors:
+        rejected_rows = len({(error['file'], error['sheet'], error['row']) for error in dataset.errors})
+        with st.expander(f"{rejected_rows} row(s) were skipped because of malformed values"):
+            st.dataframe(pd.DataFrame(dataset.errors), hide_index=True)
+
+    # Per-file parse timings and students whose rows disagree between workbooks
+    if len(dataset.report.get('parts', [])) > 1:
+        conflicts = dataset.report['conflicts']
+        with st.expander(f"Combined {len(dataset.report['parts'])} sheet(s): {len(Outcomes):,} students, {dataset.report['duplicates_dropped']:,} duplicate row(s) dropped, {len(conflicts):,} conflict(s)"):
+            st.dataframe(pd.DataFrame(dataset.report['parts']), hide_index=True)
+            if conflicts:
+                st.write("Students listed with different values in several workbooks (the last workbook's row is kept):")
+                st.dataframe(pd.DataFrame(conflicts), hide_index=True)
+
+    # What changed compared with the previously uploaded version of the workbook
+    changes = st.session_state.get("dataset_changes")
+    if changes and changes['key'] == dataset.key:
+        with st.expander(f"Updated from the previous upload: {changes['added']:,} added, {changes['removed']:,} removed and {changes['changed']:,} changed student(s)"):
+            st.write(f"{changes['unchanged']:,} student(s) are unchanged. {'Filters, option counts and charts were updated from the changed rows only' if changes['incremental'] else 'Most rows changed, so filters, option counts and charts were rebuilt'} ({changes['seconds']:.2f}s), and {changes['reused_cache_entries']:,} cached chart(s)/download(s) were kept.")
+            if changes['columns']:
+                st.dataframe(pd.Series(changes['columns'], name="Changed rows").rename_axis("Column"))
+            if changes['rows']:
+                st.dataframe(pd.DataFrame(changes['rows']), hide_index=True)
+
+    # Memory held by this dataset (shared by every session that uploads the same workbook)
+    with st.expander("Memory usage"):
+        memory = dataset.memory_report()
+        st.write(f"{memory.loc['Total', 'after'] / 1024 ** 2:,.2f} MB in memory, down from {memory.loc['Total', 'before'] / 1024 ** 2:,.2f} MB as read from the workbook, plus {(dataset.nbytes - memory.loc['Total', 'after']) / 1024 ** 2:,.2f} MB of filter, search and sort indexes built so far.")
+        if uploaded_files:
+            store = get_dataset_store().stats()
+            st.write(f"This dataset is shared by {get_dataset_store().holders(dataset.key):,} session(s). The server holds {store['datasets']:,} dataset(s) in {store['bytes'] / 1024 ** 2:,.2f} MB of its {store['max_bytes'] / 1024 ** 2:,.0f} MB budget, {store['held']:,} of them in use.")
+        st.dataframe(memory, column_config={
+            "before": st.column_config.NumberColumn("Bytes before", format="%d"),
+            "after": st.column_config.NumberColumn("Bytes after", format="%d"),
+            "storage": "Stored in",
+            "saved": st.column_config.NumberColumn("Saved", format="percent"),
+        })
 
 
     #Additional Information
@@ -54,424 +214,89 @@ if uploaded_file:
         - The GPA bar chart has multiple configurations:
           - If you only choose one year, the GPA bar chart will show the average GPA per filtered degree type and degree in that year. 
           - Otherwise, if you choose multiple years, the GPA bar chart will take the average GPA of all filtered students in that year. 
+        - The cohort comparison (at the bottom of the page) compares the cumulative or overall GPA of the filtered students per year, route, degree or graduate school status: quartiles, standard deviations, confidence intervals and histograms.
         """
     )
 
 
     # Sidebar Filters
-    st.sidebar.header("Filter Options")
-
-    # Function to get Degree options filtered by selected years and work type
-    print(Outcomes.columns)
-    def get_degree_options(selected_years, selected_work_type, grad_school):
-        # Filter data based on selected years
-        if selected_years and 'All Years' in selected_years:
-            filtered_data = Outcomes.copy()  # Include all data
-        else:
-            filtered_data = Outcomes[Outcomes['YEAR'].isin(selected_years)]
-        
-        # Apply work type filter only if "All" is not selected
-        if selected_work_type and 'All' not in selected_work_type:
-            filtered_data = filtered_data[filtered_data['DECIDED TO WORK/TYPE OF GRADUATE SCHOOL'].isin(selected_work_type)]
-
-        # Extract unique degrees
-        degrees = list(filtered_data['HIGHEST DEGREE FROM GRADUATE SCHOOL'].dropna().unique())
-        degrees.sort()
-
-        # Insert 'All Degrees' at the top of the list if not already present
-        if 'All Degrees' not in degrees:
-            degrees.insert(0, 'All Degrees')
-
-        if 'No Degree' in degrees:
-            degrees.remove('No Degree')
-            degrees.insert(len(degrees), 'No Degree')
-        
-        # Remove 'No Degree' from options when "Graduate School?" is "Yes"
-        if grad_school == "Yes" and 'No Degree' in degrees:
-            degrees.remove('No Degree')
-
-        return degrees
-
-    # Function to get Work Type options filtered by selected years
-    def get_work_type_options(selected_years, grad_school):
-        # Filter data based on selected years
-        if selected_years and 'All Years' in selected_years:
-            filtered_data = Outcomes.copy()  # Include all data
-        else:
-            filtered_data = Outcomes[Outcomes['YEAR'].isin(selected_years)]
-            
-        work_types = list(filtered_data['DECIDED TO WORK/TYPE OF GRADUATE SCHOOL'].dropna().unique())
-        work_types.sort()
-
-        if 'All' not in work_types:
-            work_types.insert(0, 'All')
-
-        if 'Unknown' in work_types:
-            work_types.remove('Unknown')
-
-        # Remove 'Work' from options when "Graduate School?" is "Yes"
-        if grad_school == "Yes" and 'Work' in work_types:
-            work_types.remove('Work')
-
-        return work_types
-
-    # Filter Widgets
-    # Year Selector
-    years = ["All Years"] + sorted(Outcomes['YEAR'].dropna().unique())
-    selected_years = st.sidebar.multiselect("Select Graduation Year(s):", years, default=["All Years"], label_visibility="visible", key="year_multiselect", help="Select one or more years to filter data by student graduation year.")
-
-    # Graduate School Selector (Added "All Students")
-    grad_school = st.sidebar.selectbox("Graduate School?", ["All Students", "Yes", "No"], help="Filter by whether or not the student(s) attended graduate school.")
-
-    # Degree and Work Type Selectors (Based on Graduate School Selection)
-    if grad_school == "Yes" or grad_school == "All Students":
-        # Work Type Selector (depends on selected years and graduate school status)
-        work_types = get_work_type_options(selected_years, grad_school)
-        selected_work_type = st.sidebar.multiselect("Post-Graduation Route:", work_types, default=["All"], label_visibility="visible", key="work_multiselect", help="Select the post-graduate route the student(s) pursued, or choose 'All' to include all routes.")
-
-        # Degree Selector (depends on selected years, work type, and graduate school status)
-        degree_options = get_degree_options(selected_years, selected_work_type, grad_school)
-        selected_degrees = st.sidebar.multiselect("Degree(s):", degree_options, label_visibility="visible", default=["All Degrees"], key="degree_multiselect", help="Select one or more degrees, or choose 'All Degrees' to include all available degrees, under the corresponding post-graduation route.")
-    else: #Disable work_type and degree filters, when grad_school == "No"
-        selected_work_type = None 
-        selected_degrees = None  
+    # A fragment: changing a filter reruns only the filters and their dependent option lists, not the whole page.
+    # The outcomes below are refreshed with the chosen filters when "Show Outcomes" is pressed.
+    @st.fragment
+    def show_filters():
+        st.header("Filter Options")
+
+        # Function to get Degree options (and their row counts) filtered by selected years and work type
+        def get_degree_options(selected_years, selected_work_type, grad_school):
+            with span('options', options='degree'):
+                return dataset.options.degree_options(selected_years, selected_work_type, grad_school)
+
+        # Function to get Work Type options (and their row counts) filtered by selected years
+        def get_work_type_options(selected_years, grad_school):
+            with span('options', options='work_type'):
+                return dataset.options.work_type_options(selected_years, grad_school)
+
+        # Show the number of matching rows next to each option, e.g. "Masters Professional (14)"
+        def option_label(counts):
+            return lambda option: f"{option} ({counts[option]})" if option in counts else option
+
+        # Filter Widgets
+        # Year Selector
+        years = ["All Years"] + dataset.options.years
+        selected_years = st.multiselect("Select Graduation Year(s):", years, default=["All Years"], label_visibility="visible", key="year_multiselect", help="Select one or more years to filter data by student graduation year.")
+
+        # Graduate School Selector (Added "All Students")
+        grad_school = st.selectbox("Graduate School?", ["All Students", "Yes", "No"], key="grad_school_select", help="Filter by whether or not the student(s) attended graduate school.")
+
+        # Degree and Work Type Selectors (Based on Graduate School Selection)
+        if grad_school == "Yes" or grad_school == "All Students":
+            # Work Type Selector (depends on selected years and graduate school status)
+            work_types, work_type_counts = get_work_type_options(selected_years, grad_school)
+            selected_work_type = st.multiselect("Post-Graduation Route:", work_types, default=["All"], format_func=option_label(work_type_counts), label_visibility="visible", key="work_multiselect", help="Select the post-graduate route the student(s) pursued, or choose 'All' to include all routes.")
+
+            # Degree Selector (depends on selected years, work type, and graduate school status)
+            degree_options, degree_counts = get_degree_options(selected_years, selected_work_type, grad_school)
+            selected_degrees = st.multiselect("Degree(s):", degree_options, label_visibility="visible", default=["All Degrees"], format_func=option_label(degree_counts), key="degree_multiselect", help="Select one or more degrees, or choose 'All Degrees' to include all available degrees, under the corresponding post-graduation route.")
+        else: #Disable work_type and degree filters, when grad_school == "No"
+            selected_work_type = None 
+            selected_degrees = None  
+
+        st.session_state["filter_selection"] = {'years': selected_years, 'grad_school': grad_school, 'work_type': selected_work_type, 'degrees': selected_degrees}
+
+    with st.sidebar:
+        show_filters()
+
+    # Progress of the background precomputation, refreshed every second while it runs
+    @st.fragment(run_every=1 if precompute_job and not precompute_job.finished else None)
+    def show_precompute_progress():
+        if precompute_job.finished:
+            st.rerun()  # A full rerun draws the page without the progress bar, and stops the refresh
+        st.progress(precompute_job.progress, text=f"Preparing common views: {precompute_job.done} of {precompute_job.total}")
+
+    if precompute_job and not precompute_job.finished:
+        with st.sidebar:
+            show_precompute_progress()
 
     # Main Filtering Function
     def filter_Outcomes(years=None, grad_school=None, degrees=None, work_type=None):
-        filtered = Outcomes.copy()
-
-        # Year Filter (only filter if not "All Years")
-        if years and "All Years" not in years:
-            print(f"Filtering for years: {years}")
-            filtered = filtered[filtered['YEAR'].isin(years)]
-        
-        # Graduate School Filter (only filter if not "All Students")
-        if grad_school and grad_school != "All Students":
-            print(f"Filtering for graduate school: {grad_school}")
-            filtered = filtered[filtered['GRADUATE SCHOOL?'] == grad_school]
-
-        # If "All Students" is selected, only apply degree & work filters to grad students
-        if grad_school == "All Students":
-            grad_students = filtered[filtered['GRADUATE SCHOOL?'] == "Yes"]
-
-            if degrees and "All Degrees" not in degrees:
-                print(f"Filtering for degrees: {degrees}")
-                grad_students = grad_students[grad_students['HIGHEST DEGREE FROM GRADUATE SCHOOL'].isin(degrees)]
-
-            if work_type and "All" not in work_type:
-                print(f"Filtering for work type: {work_type}")
-                grad_students = grad_students[grad_students['DECIDED TO WORK/TYPE OF GRADUATE SCHOOL'].isin(work_type)]
-
-            # Combine filtered grad students with non-grad students
-            non_grad_students = filtered[filtered['GRADUATE SCHOOL?'] == "No"]
-            filtered = pd.concat([grad_students, non_grad_students])
-
-        else:
-            # Apply filters normally if "Yes" or "No" is selected
-            if degrees and "All Degrees" not in degrees:
-                print(f"Filtering for degrees: {degrees}")
-                filtered = filtered[filtered['HIGHEST DEGREE FROM GRADUATE SCHOOL'].isin(degrees)]
-
-            if work_type and "All" not in work_type:
-                print(f"Filtering for work type: {work_type}")
-                filtered = filtered[filtered['DECIDED TO WORK/TYPE OF GRADUATE SCHOOL'].isin(work_type)]
-
-        print(f"Filtered data size: {filtered.shape}")
-        return filtered
+        # Combine the prebuilt per-value bitmaps into the positions of the matching rows (no rows are copied)
+        # (with "All Students", degree & work filters only apply to grad students, listed before non-grad students),
+        # together with the summary; reused when the same selection was shown or precomputed before
+        return selection_result(dataset, get_result_cache(), years=years, grad_school=grad_school, work_type=work_type, degrees=degrees)
     
-    def plot_pie_chart(ax, filtered_data, degrees, years=None, work_type=None, degree_col='HIGHEST DEGREE FROM GRADUATE SCHOOL'):
-        # Only consider degrees that are part of the filter
-        if 'All Degrees' not in degrees:
-            filtered_data = filtered_data[filtered_data[degree_col].isin(degrees)]
-
-        # Count occurrences of each degree in the filtered data
-        degree_counts = filtered_data[degree_col].value_counts()
-        degree_counts = degree_counts[degree_counts > 0] # Filter out degrees with zero occurrences
-
-        # Replace "No Degree" with "Workforce"
-        if "No Degree" in degree_counts:
-            degree_counts.index = degree_counts.index.str.replace("No Degree", "Workforce")
-        
-        # Calculate explode values based on slice size
-        total_count = degree_counts.sum()
-        explode = [(count / total_count) * 0.1 for count in degree_counts]  # Adjust 0.1 for desired explosion
-        explode = np.clip(explode, 0.005, 0.04)  # Set max and min values for explode so spacing won't be too big or small
-
-        # Define a custom formatting function that doesn't show percentages 2% or less
-        def autopct_format(pct):
-            return f'{pct:.1f}%' if pct >= 2 else ''  # Show percentages only if 2% or higher
-
-        # Define a custom label filter that doesn't show labels if percentage's are 2% or less
-        def filter_labels(labels, sizes):
-            return [label if size > 2 else '' for label, size in zip(labels, sizes)]
-        
-        sizes = degree_counts / total_count * 100
-        filtered_labels = filter_labels(degree_counts.index, sizes)
-        
-        # Plot pie chart only if there are multiple degrees or 'All Degrees' is selected and data exists
-        if (len(degree_counts) > 1 or 'All Degrees' in degrees) and not degree_counts.empty:
-            patches, labels, pct_texts = ax.pie(
-                degree_counts,
-                labels=filtered_labels,
-                autopct=autopct_format,
-                startangle=90,
-                colors=plt.cm.tab20c.colors, #plt.get_cmap('cool')(np.linspace(0.25, 1.0, len(degree_counts))),
-                explode=explode,
-                pctdistance=0.85,
-                labeldistance=1.17,
-                rotatelabels=False,
-                textprops={'fontsize': 18}
-            )
-            
-            # Rotate labels and percentages for slices with <4% for readability
-            for i, (patch, label, pct_text) in enumerate(zip(patches, labels, pct_texts)):
-                # Calculate the percentage value directly
-                percentage_value = (degree_counts.iloc[i] / total_count) * 100
-
-                # Only rotate slices with percentages <4%
-                if percentage_value < 5:
-                    angle = (patch.theta2 + patch.theta1) / 2  # Mid-angle of slice
-                    rotation = angle if 90 < angle < 270 else angle  # Adjust rotation for readability
-                    if label:
-                        label.set_rotation(rotation)
-                        label.set_horizontalalignment("center")
-                    if pct_text and pct_text.get_text():  # Ensure pct_text is not empty
-                        pct_text.set_rotation(rotation)
-            
-            #Create Legend with Labels
-            labels_with_pct = [
-                f"{degree}: {count / total_count * 100:.1f}%" for degree, count in degree_counts.items()
-            ]            
-            ax.legend(
-                patches,
-                labels_with_pct,
-                title="Degrees",
-                loc="center right",
-                bbox_to_anchor=(1.40, 0.5),
-                fontsize=15,
-                title_fontsize=15
-            )
-
-            # Set a dynamic title based on selected years and work type
-            years.sort()
-            if years == ['2019', '2021', '2022', '2023', '2024']:
-                years = ['All Years'] 
-            work_type.sort()
-            if work_type == ['Doctorate Biomedical', 'Doctorate Professional', 'Masters Biomedical', 'Masters Professional', 'Ph.D.']:
-                work_type = ['All']
-            elif work_type == ['Doctorate Biomedical', 'Doctorate Professional']:
-                work_type = ['All Doctorate']
-            elif work_type == ['Masters Biomedical', 'Masters Professional']:
-                work_type = ['All Masters']
-            elif work_type == ['Doctorate Biomedical', 'Doctorate Professional', 'Masters Biomedical', 'Masters Professional']:
-                work_type = ['All Doctorate & Masters']
-            elif work_type == ['Doctorate Biomedical', 'Masters Biomedical']:
-                work_type = ['All Biomedical']
-            elif work_type == ['Doctorate Professional', 'Masters Professional']:
-                work_type = ['All Professional']
-            
-            years_str = ', '.join(map(str, years)) if years else "Filtered Data"
-            work_str = ', '.join(work_type) if work_type else "Filtered Data"
-            ax.set_title(f"{work_str} Filtered Graduate Degrees' Distribution in {years_str}", pad=20, size=20)
-        else:
-            # Clear any previous output if conditions for pie chart are not met
-            clear_output()
-            st.write("Pie chart is not displayed for a single degree selection or if no data is available.")
-
-    #Plotting GPA Chart (calculate and plot the bar chart for average GPA per year)
-    def plot_bar_chart(ax, filtered_data, years, degrees, work, graduate):
-        # Clear the axis to prevent overplotting
-        ax.clear()
-
-        if filtered_data.empty:
-            st.write("No data available for the selected filters. Cannot generate plot.")
-            return  # Exit the function to prevent the error
-
-        else:
-            if "No Degree" in work:
-                work.index = work.index.str.replace("No Degree", "Workforce")
-
-            if len(years) == 1 and 'All Years' not in years:
-                # If only one year is selected, calculate GPA by degree for that year
-                year = years[0]
-                avg_gpa_data_per_degree = filtered_data[filtered_data['YEAR'] == year].groupby('HIGHEST DEGREE FROM GRADUATE SCHOOL', observed=False)['CUMMULATIVE GPA'].mean()
-
-                # Filter out degrees with zero occurrences
-                avg_gpa_per_degree = avg_gpa_data_per_degree[avg_gpa_data_per_degree > 0]
-
-                # Replace "No Degree" with "Workforce"
-                if "No Degree" in avg_gpa_per_degree:
-                    avg_gpa_per_degree.index = avg_gpa_per_degree.index.str.replace("No Degree", "Workforce")
-
-                # Generate bar colors using Pastel2 colormap
-                colors = cm.Paired(mcolors.Normalize()(range(len(avg_gpa_per_degree))))
-                
-                # Plot bar chart for GPA by degree
-                bars = avg_gpa_per_degree.plot(kind='bar', ax=ax, color=colors, edgecolor='black')
-
-                # Create dynamic legend
-                handles = [
-                    mpatches.Patch(color=colors[i], label=f"{degree} - {avg_gpa_per_degree[degree]:.2f}")
-                    for i, degree in enumerate(avg_gpa_per_degree.index)
-                ]
-                ax.legend(handles=handles, title="Degrees and Avg GPA", bbox_to_anchor=(1.20, 0.5), loc='center right', fontsize=15, title_fontsize=15)
-
-                # Set the labels
-                ax.tick_params(axis='both', which='major', labelsize=18)
-                ax.set_xlabel("Degree", fontsize = 18)
-                ax.set_ylabel("Average GPA", fontsize = 18)
-                
-                if graduate == 'No':
-                    title = f"Average GPA of Working Alumnae in {year}"
-                    ax.legend(handles=handles, title="Degrees and Avg GPA", bbox_to_anchor=(1.25, 0.5), loc='center right', fontsize=15, title_fontsize=15)
-                else:
-                    # Set Dynamic Title
-                    work.sort()
-                    if work == ['Doctorate Biomedical', 'Doctorate Professional', 'Masters Biomedical', 'Masters Professional', 'Ph.D.']:
-                        work= ['All']
-                    elif work == ['Doctorate Biomedical', 'Doctorate Professional']:
-                        work = ['All Doctorate']
-                    elif work == ['Masters Biomedical', 'Masters Professional']:
-                        work = ['All Masters']
-                    elif work == ['Doctorate Biomedical', 'Doctorate Professional', 'Masters Biomedical', 'Masters Professional']:
-                        work = ['All Doctorate & Masters']
-                    elif work == ['Doctorate Biomedical', 'Masters Biomedical']:
-                        work = ['All Biomedical']
-                    elif work == ['Doctorate Professional', 'Masters Professional']:
-                        work = ['All Professional']
-                    
-                    if "All" in work:
-                        title = f"Average GPA by Filtered Graduate Degrees in {year}"
-                    else:
-                        title = f"Average GPA of {', '.join(work)} Filtered Graduate Degrees by Degree in {year}"
-
-                # Set the title on the plot
-                ax.set_title(title, fontsize=20)
-
-                # Add numeric labels on top of each bar
-                for bar in bars.patches:
-                    ax.text(
-                        bar.get_x() + bar.get_width() / 2,
-                        bar.get_height(),
-                        f'{bar.get_height():.2f}',  # Format to 2 decimal places
-                        ha='center',
-                        va='bottom',
-                        fontsize = 18
-                    )
-
-            else:
-                # If multiple years are selected, calculate average GPA per year
-                avg_gpa_per_year = filtered_data.groupby('YEAR')['CUMMULATIVE GPA'].mean()
-
-                # Replace "No Degree" with "Workforce"
-                if "No Degree" in avg_gpa_per_year :
-                    avg_gpa_per_year.index = avg_gpa_per_year.index.str.replace("No Degree", "Workforce")
-
-                # Generate bar colors using Pastel2 colormap
-                colors = cm.Paired(mcolors.Normalize()(range(len(avg_gpa_per_year))))
-                
-                # Plot bar chart for average GPA per year
-                bars = avg_gpa_per_year.plot(kind='bar', ax=ax, color=colors, edgecolor='black')
-
-                # Create dynamic legend
-                handles = [
-                    mpatches.Patch(color=colors[i], label=f"{year} - {avg_gpa_per_year[year]:.2f}")
-                    for i, year in enumerate(avg_gpa_per_year.index)
-                ]
-                ax.legend(handles=handles, title="Years and Avg GPA", bbox_to_anchor=(1.20, 0.5), loc='center right', fontsize=15, title_fontsize=15)
-
-                # Set the labels
-                ax.tick_params(axis='both', which='major', labelsize=18)
-                ax.set_xlabel("Year", fontsize = 18)
-                ax.set_ylabel("Average GPA", fontsize = 18)
-
-                # Set Dynamic Title
-                years.sort()
-                if years == ['2019', '2021', '2022', '2023', '2024']:
-                    years = ['All Years'] 
-
-                if graduate == 'No':
-                    title = f"Average GPA of Working Alumnae per Year in {', '.join(map(str, years))}" if years else "Average GPA per Year"
-                    ax.legend(handles=handles, title="Years and Avg GPA", bbox_to_anchor=(1.25, 0.5), loc='center right', fontsize=15, title_fontsize=15)
-
-                else:
-                    # Check if work type is 'All'
-                    work.sort()
-                    if work == ['Doctorate Biomedical', 'Doctorate Professional', 'Masters Biomedical', 'Masters Professional', 'Ph.D.']:
-                        work= ['All']
-                    elif work == ['Doctorate Biomedical', 'Doctorate Professional']:
-                        work = ['All Doctorate']
-                    elif work == ['Masters Biomedical', 'Masters Professional']:
-                        work = ['All Masters']
-                    elif work == ['Doctorate Biomedical', 'Doctorate Professional', 'Masters Biomedical', 'Masters Professional']:
-                        work = ['All Doctorate & Masters']
-                    elif work == ['Doctorate Biomedical', 'Masters Biomedical']:
-                        work = ['All Biomedical']
-                    elif work == ['Doctorate Professional', 'Masters Professional']:
-                        work = ['All Professional']
-                        
-                    if "All" in work:
-                        # Handle title for all work types and degrees
-                        if len(degrees) <= 4 and "All Degrees" not in degrees:
-                            title = f"Average GPA of {', '.join(degrees)} Graduate Degrees per Year in {', '.join(map(str, years))}" if years else "Average GPA per Year"
-                        else:
-                            title = f"Average GPA of Multiple Graduate Degrees per Year in {', '.join(map(str, years))}" if years else "Average GPA per Year"
-                    else:
-                        # Handle title when specific work type is selected
-                        if len(degrees) <= 4 and "All Degrees" not in degrees:
-                            title = f"Average GPA of {', '.join(work)} ({', '.join(degrees)}) Graduate Degrees per Year in {', '.join(map(str, years))}"
-                        else:
-                            title = f"Average GPA of {', '.join(work)} Filtered Graduate Degrees per Year in {', '.join(map(str, years))}"
-
-                # Set the title on the plot
-                ax.set_title(title, fontsize=20)
-
-                # Add numeric labels on top of each bar
-                for bar in bars.patches:
-                    ax.text(
-                        bar.get_x() + bar.get_width() / 2,
-                        bar.get_height(),
-                        f'{bar.get_height():.2f}',  # Format to 2 decimal places
-                        ha='center',
-                        va='bottom',
-                        fontsize = 18
-                    )
-
-            # Add grid for readability
-            ax.grid(axis='y', linestyle='--', alpha=0.7)
-
-            # Rotate x-axis labels for readability
-            ax.tick_params(axis='x', rotation=0)
-
-            # Increase margins for readability (in case bar labels touch the edge)
-            ax.margins(y=0.1)
-            
+    # (PNG bytes, notes) of the matplotlib charts; reused when the same selection was rendered or precomputed before
+    def chart_png(years, grad_school, work_type, degrees, summary=None):
+        return selection_chart(dataset, get_chart_cache(), years, grad_school, work_type, degrees, summary=summary)
 
     # Modified main function to display both filtered data and charts
     def show_filtered_Outcomes(years, grad_school, work_type, degrees):
 
-        result = filter_Outcomes(years=years, grad_school=grad_school, degrees=degrees, work_type=work_type)
-        print(f"Result data size: {result.shape}")
-        # filtered_data_for_download = result  # Store the result DataFrame
-
-        total_filtered = len(result)
-        total_students = len(Outcomes)
-
-        if 'All Years' in selected_years:
-            total_students_in_years = total_students
-        else:
-            total_students_in_years = len(Outcomes[Outcomes['YEAR'].isin(selected_years)])
-        
-        # Count occurrences of each degree in the filtered data
-        filtered_data = result.copy()
-        if 'All Degrees' not in degrees:
-            filtered_data = result[result['HIGHEST DEGREE FROM GRADUATE SCHOOL'].isin(degrees)]
-
-        degree_counts = filtered_data['HIGHEST DEGREE FROM GRADUATE SCHOOL'].value_counts()
-        degree_counts = degree_counts[degree_counts > 0] # Filter out degrees with zero occurrences
-
-        # Clear previous output to prevent flashing
-        clear_output(wait=True)
+        # Rows, plus counts and GPA sums for the same selection read from the aggregate cube instead of the rows.
+        # Reruns that show the same selection again (e.g. after changing the chart options) reuse them.
+        result, summary = filter_Outcomes(years=years, grad_school=grad_school, degrees=degrees, work_type=work_type)
+        total_filtered = summary['total_filtered']
+        total_students = summary['total_students']
+        total_students_in_years = summary['total_in_years']
 
         # Display filtered Outcomes and statistics
         st.write("")
@@ -483,15 +308,13 @@ if uploaded_file:
             st.warning("No students found for the selected filters.")
             st.write(f"Percentage of filtered entries in selected years: 0.00%")
         else:
-            percentage_in_years = (total_filtered / total_students_in_years) * 100
-            st.write(f"Percentage of filtered entries in selected years: {percentage_in_years:.2f}%")
+            st.write(f"Percentage of filtered entries in selected years: {summary['percentage_in_years']:.2f}%")
         
         if total_students == 0:
             st.warning("No students found in the datasheet. Is there data in the 'All Students' sheet of the workbook?")
             st.write(f"Percentage of filtered entries in total Outcomes: 0.00%")
         else:
-            percentage = (total_filtered / total_students) * 100
-            st.write(f"Percentage of filtered entries in total Outcomes: {percentage:.2f}%")
+            st.write(f"Percentage of filtered entries in total Outcomes: {summary['percentage_of_total']:.2f}%")
       
         st.write("")
 
@@ -500,64 +323,152 @@ if uploaded_file:
             st.write("Degree(s): No Degree")
             st.write("")
             st.write("Graduate School is set to 'No'. No degree data to plot in the pie chart.")
+        elif not summary['show_pie']:
+            # If no data for pie chart, display only the bar chart
+            st.write("Pie chart is not displayed for a single degree selection or if no data is available.")
 
-            # Plot only the bar chart, occupying the entire plot area
-            fig, ax = plt.subplots(figsize=(15, 7.5))
-            plot_bar_chart(ax, result, years, degrees, work_type, grad_school)
-            
-            st.pyplot(fig)
-
+        if chart_mode == 'browser':
+            # Only the aggregated series are sent; the browser draws the charts
+            specs, notes = selection_chart_specs(dataset, get_chart_cache(), years, grad_school, work_type, degrees, summary=summary)
+            for note in notes:
+                st.write(note)
+            for spec in specs:
+                st.vega_lite_chart(spec, width="stretch")
+            if specs:
+                st.download_button(
+                    label="Download Charts (PNG Image)",
+                    data=lambda: chart_png(years, grad_school, work_type, degrees, summary)[0],
+                    file_name="outcomes_charts.png",
+                    mime="image/png",
+                    on_click="ignore"
+                )
         else:
-            # Check if there is data for the pie chart (i.e., degree data)
-            if ((total_filtered > 1 or 'All Degrees' in degrees) and len(degree_counts) > 1):
-                # Create subplots for pie chart and bar chart side by side
-                fig, axes = plt.subplots(2, 1, figsize=(20, 20))
-
-                # Plot pie chart for degree distribution
-                plot_pie_chart(axes[0], result, degrees, years=years, work_type=work_type)
-                
-                # Plot bar chart for average GPA per year
-                plot_bar_chart(axes[1], result, years, degrees, work_type, grad_school)
-                
-                plt.tight_layout(h_pad=5)
-
-                st.pyplot(fig)
-
-            else:
-                # If no data for pie chart, display only the bar chart
-                st.write("Pie chart is not displayed for a single degree selection or if no data is available.")
-                fig, ax = plt.subplots(figsize=(15, 7.5))
-                plot_bar_chart(ax, result, years, degrees, work_type, grad_school)
-                
-                st.pyplot(fig)
+            png, notes = chart_png(years, grad_school, work_type, degrees, summary)
+            for note in notes:
+                st.write(note)
+            st.image(png, width="stretch")
 
         st.write("")
-        # Return the DataFrame to ensure it’s displayed automatically
+        # Return the positions of the filtered rows for the table below
         return result
     
-    #Define the function to run when downlaod button clicked
-    def download_button_csv(dataframe, filename=None):
-        csv = dataframe.to_csv(index=False)
+    #Define the download button; the file is only built when it is clicked, then cached per selection and format
+    def download_button_export(years, grad_school, work_type, degrees, fmt='csv', drop_columns=()):
+        label, extension, mime = EXPORT_FORMATS[fmt]
+        signature = filter_signature(dataset.key, years, grad_school, work_type, degrees)
+        export_cache = get_export_cache()
+
+        def build_file():
+            return cached_export(export_cache, signature, fmt, drop_columns, lambda: filter_outcomes(dataset, years, grad_school, work_type, degrees))
+
         st.download_button(
-            label="Download Filtered Data (CSV File)",
-            data=csv,
-            file_name=filename,
-            mime='text/csv'
+            label=f"Download Filtered Data ({label} File)",
+            data=build_file,
+            file_name=f"filtered_data{extension}",
+            mime=mime,
+            on_click="ignore"
         )
 
 
+    # Paginated table: only the visible page is sent to the browser, and paging/sorting reruns just this fragment
+    @st.fragment
+    def show_results_table(rows):
+        # Server-side search over every filtered row, not just the page shown (exact, prefix and typo-tolerant matches)
+        query = st.text_input("Search names, graduate schools and majors:", key="table_search", placeholder="e.g. Emory, Johnson, public health")
+        if query.strip():
+            rows = search_rows(dataset, rows, query)
+        columns_area, sort_area, order_area, size_area = st.columns([3, 2, 1, 1])
+        columns = columns_area.multiselect("Columns:", dataset.columns, default=dataset.columns, key="table_columns")
+        sort_by = sort_area.selectbox("Sort by:", [None] + dataset.columns, format_func=lambda col: ("Best match" if query.strip() else "Workbook order") if col is None else col, key="table_sort_by")
+        descending = order_area.toggle("Descending", key="table_descending", disabled=sort_by is None)
+        page_size = size_area.selectbox("Rows per page:", PAGE_SIZES, key="table_page_size")
+
+        pages = page_count(len(rows), page_size)
+        if st.session_state.get("table_page", 1) > pages:
+            st.session_state["table_page"] = pages  # Stay in range when the page size or selection shrinks
+        page = st.number_input(f"Page (of {pages:,}):", min_value=1, max_value=pages, step=1, key="table_page")
+        first_row = (page - 1) * page_size
+        if not len(rows):
+            st.write("No filtered entries match the search.")
+            return
+        st.caption(f"Showing rows {first_row + 1:,}–{min(first_row + page_size, len(rows)):,} of {len(rows):,} {'matching' if query.strip() else 'filtered'} entries")
+        st.dataframe(page_frame(dataset, rows, page, page_size, sort_by=sort_by, ascending=not descending, columns=columns or None))
+
+
+    # Export Options (chosen before "Show Outcomes" so changing them doesn't clear the results)
+    st.sidebar.text('')
+    with st.sidebar.expander("Download Options"):
+        export_format = st.selectbox("File format:", list(EXPORT_FORMATS), format_func=lambda fmt: EXPORT_FORMATS[fmt][0], key="export_format")
+        drop_sensitive = st.checkbox(f"Leave out {' and '.join(SENSITIVE_COLUMNS)}", key="export_drop_sensitive", help="Remove contact and ID columns from the downloaded file.")
+
+    st.sidebar.text('')
+    with st.sidebar.expander("Chart Options"):
+        chart_mode = st.radio("Charts:", list(CHART_MODES), index=list(CHART_MODES).index(CHART_MODE) if CHART_MODE in CHART_MODES else 0, format_func=CHART_MODES.get, key="chart_mode", help="Interactive charts are drawn by your browser from the summary numbers. Images are rendered on the server and can also be downloaded from the interactive view.")
+
     # Trigger display of filtered data and charts
+    # (the shown selection is kept, so other reruns redraw the same outcomes until the button is pressed again)
     st.sidebar.text('')
     if st.sidebar.button('Show Outcomes'):      
-        result = show_filtered_Outcomes(selected_years, grad_school, selected_work_type, selected_degrees)
-        if not result.empty:
+        st.session_state["shown_selection"] = {'dataset_key': dataset.key, **st.session_state["filter_selection"]}
+    shown_selection = st.session_state.get("shown_selection")
+    if shown_selection and shown_selection['dataset_key'] != dataset.key:
+        shown_selection = None  # Chosen for another workbook
+    if shown_selection:
+        selection = {name: shown_selection[name] for name in ('years', 'grad_school', 'work_type', 'degrees')}
+        result = show_filtered_Outcomes(**selection)
+        if len(result):
             st.write("### Filtered Data Table")
-            st.text("Hover over the table to search by text or make the table full screen.")
-            download_button_csv(result, filename="filtered_data.csv")
-            st.dataframe(result)  # Display table after graphs
+            st.text("Search, sort, pick columns and page through the table below, or hover over it to make it full screen.")
+            download_button_export(**selection, fmt=export_format, drop_columns=SENSITIVE_COLUMNS if drop_sensitive else ())
+            show_results_table(result)  # Display table after graphs
         else:
             st.write("No data available for download.") 
+    else:
+        selection = st.session_state["filter_selection"]
+
+    # Cohort comparison: GPA distributions of the shown selection side by side, per year, route or degree.
+    # Only computed while the expander is open, and changing its options reruns just this fragment.
+    @st.fragment
+    def show_cohort_comparison(years, grad_school, work_type, degrees):
+        cohort_area = st.expander("Cohort comparison", key="cohort_comparison", on_change="rerun")
+        if not cohort_area.open:
+            return
+        with cohort_area:
+            by_area, column_area = st.columns(2)
+            by_label = by_area.selectbox("Compare by:", list(COMPARE_BY), key="cohort_by")
+            column = column_area.selectbox("GPA:", GPA_COLUMNS, format_func=str.title, key="cohort_column")
+            cohorts = compare_cohorts(dataset, years, grad_school, work_type, degrees, by=COMPARE_BY[by_label], column=column)
+            stats = cohorts['stats']
+            if not stats['with_gpa'].any():
+                st.write("No GPA data available for the selected filters.")
+                return
+            st.vega_lite_chart(cohort_box_spec(stats, by_label, column.title()), width="stretch")
+            st.dataframe(stats, column_config={
+                "students": st.column_config.NumberColumn("Students", format="%d"),
+                "with_gpa": st.column_config.NumberColumn("With GPA", format="%d"),
+                **{name: st.column_config.NumberColumn(title, format="%.2f") for name, title in [
+                    ("mean", "Mean"), ("std", "Std. dev."), ("min", "Min"), ("q1", "Q1"), ("median", "Median"), ("q3", "Q3"), ("max", "Max"),
+                    ("mean_ci_low", "Mean 95% CI low"), ("mean_ci_high", "Mean 95% CI high"),
+                    ("median_ci_low", "Median 95% CI low"), ("median_ci_high", "Median 95% CI high"),
+                ]},
+            })
+            st.caption(f"Confidence intervals are bootstrapped from {BOOTSTRAP_RESAMPLES:,} resamples of each cohort.")
+            st.vega_lite_chart(cohort_histogram_spec(cohorts['histogram'], by_label, column.title()), width="stretch")
+
+    show_cohort_comparison(**selection)
 else:
     st.subheader("No file detected!")
     st.write("Please upload, or reupload, the file 'EHS DataStatistics Phase II (Student Outcomes).xlsx' to start the app.")
     st.write("If the file does not upload, please refresh the page and try again.") 
+
+# Performance panel (opt-in): timings of the stages of recent requests, from every session of this server
+st.sidebar.text('')
+if st.sidebar.toggle("Show performance data", key="show_performance", help="Wall time, row counts and peak memory growth of ingest, option counts, filtering, aggregation, plotting, rasterization and export."):
+    with st.sidebar.expander("Performance", expanded=True):
+        spans = span_records()
+        st.write(f"{len(spans):,} span(s) recorded")
+        st.dataframe(summarize_spans(spans), hide_index=True)
+        st.write("Most recent:")
+        st.dataframe(pd.DataFrame(spans[-50:][::-1]), hide_index=True)
+        st.download_button("Download spans (JSON lines)", data=lambda: to_jsonl(span_records()), file_name="performance.jsonl", mime="application/jsonl", on_click="ignore")
+        st.button("Clear", on_click=clear_spans)
@@ -0,0 +1,101 @@
+"""The dashboard's original pandas computations, the reference the indexes and caches are tested against.
+
+These are the functions of the first streamlit_app.py, taking Outcomes as
+an argument instead of reading the global and without their prints.
+"""
+
+import pandas as pd
+
+from outcomes.schema import DEGREE, GPA, GRAD_SCHOOL, ROUTE, YEAR
+
+
+def filter_outcomes(outcomes, years=None, grad_school=None, degrees=None, work_type=None):
+    filtered = outcomes.copy()
+
+    # Year Filter (only filter if not "All Years")
+    if years and "All Years" not in years:
+        filtered = filtered[filtered[YEAR].isin(years)]
+
+    # Graduate School Filter (only filter if not "All Students")
+    if grad_school and grad_school != "All Students":
+        filtered = filtered[filtered[GRAD_SCHOOL] == grad_school]
+
+    # If "All Students" is selected, only apply degree & work filters to grad students
+    if grad_school == "All Students":
+        grad_students = filtered[filtered[GRAD_SCHOOL] == "Yes"]
+        if degrees and "All Degrees" not in degrees:
+            grad_students = grad_students[grad_students[DEGREE].isin(degrees)]
+        if work_type and "All" not in work_type:
+            grad_students = grad_students[grad_students[ROUTE].isin(work_type)]
+
+        # Combine filtered grad students with non-grad students
+        non_grad_students = filtered[filtered[GRAD_SCHOOL] == "No"]
+        filtered = pd.concat([grad_students, non_grad_students])
+    else:
+        if degrees and "All Degrees" not in degrees:
+            filtered = filtered[filtered[DEGREE].isin(degrees)]
+        if work_type and "All" not in work_type:
+            filtered = filtered[filtered[ROUTE].isin(work_type)]
+    return filtered
+
+
+def in_years(outcomes, selected_years):
+    if selected_years and 'All Years' in selected_years:
+        return outcomes.copy()
+    return outcomes[outcomes[YEAR].isin(selected_years)]
+
+
+def work_type_options(outcomes, selected_years, grad_school):
+    work_types = list(in_years(outcomes, selected_years)[ROUTE].dropna().unique())
+    work_types.sort()
+    if 'All' not in work_types:
+        work_types.insert(0, 'All')
+    if 'Unknown' in work_types:
+        work_types.remove('Unknown')
+    # Remove 'Work' from options when "Graduate School?" is "Yes"
+    if grad_school == "Yes" and 'Work' in work_types:
+        work_types.remove('Work')
+    return work_types
+
+
+def degree_options(outcomes, selected_years, selected_work_type, grad_school):
+    filtered_data = in_years(outcomes, selected_years)
+    # Apply work type filter only if "All" is not selected
+    if selected_work_type and 'All' not in selected_work_type:
+        filtered_data = filtered_data[filtered_data[ROUTE].isin(selected_work_type)]
+
+    degrees = list(filtered_data[DEGREE].dropna().unique())
+    degrees.sort()
+    if 'All Degrees' not in degrees:
+        degrees.insert(0, 'All Degrees')
+    if 'No Degree' in degrees:
+        degrees.remove('No Degree')
+        degrees.insert(len(degrees), 'No Degree')
+    # Remove 'No Degree' from options when "Graduate School?" is "Yes"
+    if grad_school == "Yes" and 'No Degree' in degrees:
+        degrees.remove('No Degree')
+    return degrees
+
+
+def total_in_years(outcomes, selected_years):
+    if 'All Years' in selected_years:
+        return len(outcomes)
+    return len(outcomes[outcomes[YEAR].isin(selected_years)])
+
+
+def degree_counts(result, degrees):
+    # Students per degree of the filtered rows, restricted to the chosen degrees (none chosen with graduate
+    # school "No", where the sidebar passes None)
+    filtered_data = result.copy()
+    if degrees is not None and 'All Degrees' not in degrees:
+        filtered_data = result[result[DEGREE].isin(degrees)]
+    counts = filtered_data[DEGREE].value_counts()
+    return counts[counts > 0]
+
+
+def average_gpa(filtered_data, years):
+    # The bar chart: average GPA per degree for a single year, per year otherwise
+    if len(years) == 1 and 'All Years' not in years:
+        avg_gpa = filtered_data[filtered_data[YEAR] == years[0]].groupby(DEGREE, observed=False)[GPA].mean()
+        return avg_gpa[avg_gpa > 0]
+    return filtered_data.groupby(YEAR)[GPA].mean()
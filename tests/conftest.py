@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+from benchmarks.generate import generate_outcomes, write_workbook
+from outcomes.dataset import Dataset
+from outcomes.ingest import ingest_workbooks
+from outcomes.schema import DEGREE, GPA, GRAD_SCHOOL, ROUTE, YEAR
+
+
+@pytest.fixture(scope='session')
+def workbook(tmp_path_factory):
+    # (file name, bytes) of a small generated "All Students" workbook
+    path = write_workbook(generate_outcomes(400, seed=1), tmp_path_factory.mktemp('workbooks') / 'outcomes.xlsx')
+    return path.name, path.read_bytes()
+
+
+@pytest.fixture(scope='session')
+def outcomes(workbook):
+    # (Outcomes, ingest report) of the workbook
+    return ingest_workbooks([workbook])
+
+
+@pytest.fixture
+def dataset(outcomes):
+    df, report = outcomes
+    return Dataset(df, 'test', report)
+
+
+@pytest.fixture(scope='session', params=['complete', 'blanks'])
+def outcomes_frame(request, outcomes):
+    # Outcomes as ingested, and with blank filter values and GPAs scattered over different rows of each column
+    df, _ = outcomes
+    if request.param == 'blanks':
+        positions = np.arange(len(df))
+        df = df.assign(**{col: df[col].where((positions + 3 * i) % 11 != 0) for i, col in enumerate([YEAR, GRAD_SCHOOL, DEGREE, ROUTE, GPA])})
+    return df
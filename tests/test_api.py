@@ -0,0 +1,74 @@
+import json
+import math
+
+import pytest
+
+from outcomes.api import QueryAPI
+from outcomes.dataset import Dataset
+from tests import baseline
+
+
+@pytest.fixture
+def api(outcomes_frame):
+    return QueryAPI(Dataset(outcomes_frame, 'test'))
+
+
+def _get(api, target, if_none_match=None):
+    status, headers, body = api.handle(target, if_none_match)
+    return status, headers, json.loads(body) if body else None
+
+
+@pytest.mark.parametrize('query, selection', [
+    ('', dict(years=['All Years'], grad_school='All Students', work_type=['All'], degrees=['All Degrees'])),
+    ('?years=2021&years=2019&grad_school=Yes&work_type=Ph.D.',
+     dict(years=['2019', '2021'], grad_school='Yes', work_type=['Ph.D.'], degrees=['All Degrees'])),
+    ('?years=2022&degrees=M.P.H.&degrees=No+Degree',
+     dict(years=['2022'], grad_school='All Students', work_type=['All'], degrees=['M.P.H.', 'No Degree'])),
+    ('?years=2013&years=2014&grad_school=No', dict(years=['2013', '2014'], grad_school='No', work_type=None, degrees=None)),
+])
+def test_summary_matches_original(api, outcomes_frame, query, selection):
+    status, headers, summary = _get(api, '/summary' + query)
+    assert status == 200 and headers['Content-Type'] == 'application/json'
+    assert summary['selection'] == selection
+
+    result = baseline.filter_outcomes(outcomes_frame, **selection)
+    assert summary['total_filtered'] == len(result)
+    assert summary['total_in_years'] == baseline.total_in_years(outcomes_frame, selection['years'])
+    assert summary['degree_counts'] == baseline.degree_counts(result, selection['degrees']).to_dict()
+    avg_gpa = baseline.average_gpa(result, selection['years']).rename(index={'No Degree': 'Workforce'})
+    assert summary['average_gpa']['values'] == {
+        str(label): None if math.isnan(gpa) else round(gpa, 4) for label, gpa in avg_gpa.items()
+    }
+
+
+def test_options_match_original(api, outcomes_frame):
+    status, _, options = _get(api, '/options?years=2019&years=2020&work_type=Ph.D.')
+    assert status == 200
+    assert options['work_type']['options'] == baseline.work_type_options(outcomes_frame, ['2019', '2020'], 'All Students')
+    assert options['degrees']['options'] == baseline.degree_options(outcomes_frame, ['2019', '2020'], ['Ph.D.'], 'All Students')
+
+
+def test_unchanged_selection_is_not_modified(api):
+    status, headers, _ = _get(api, '/summary?years=2019&years=2021')
+    assert status == 200
+    etag = headers['ETag']
+    # The same selection in another order has the same ETag
+    assert _get(api, '/summary?years=2021&years=2019', etag)[0] == 304
+    assert _get(api, '/summary?years=2021&years=2019', f'W/{etag}, "other"')[0] == 304
+    assert _get(api, '/summary?years=2021', etag)[0] == 200
+
+
+@pytest.mark.parametrize('target', [
+    '/summary?year=2021',
+    '/summary?grad_school=Maybe',
+    '/summary?grad_school=Yes&grad_school=No',
+    '/options?grad_school=No&degrees=M.D.',
+])
+def test_bad_request(api, target):
+    status, _, body = _get(api, target)
+    assert status == 400 and body['error']
+
+
+def test_unknown_endpoint(api):
+    status, _, body = _get(api, '/students')
+    assert status == 404 and body['error']
@@ -0,0 +1,48 @@
+import json
+
+import pandas as pd
+
+from outcomes import batch
+from outcomes.batch import enumerate_selections, generate_report, selection_slug
+from outcomes.dataset import Dataset
+from outcomes.engine import normalize_selection
+from outcomes.schema import YEAR
+from tests import baseline
+
+
+def _sidebar_selections(df):
+    # Every selection of the original sidebar, one route and one degree at a time
+    for years in [['All Years']] + [[year] for year in sorted(df[YEAR].dropna().unique())]:
+        for grad_school in ['All Students', 'Yes', 'No']:
+            if grad_school == 'No':
+                yield normalize_selection(years, grad_school)
+                continue
+            for work_type in baseline.work_type_options(df, years, grad_school):
+                for degree in baseline.degree_options(df, years, [work_type], grad_school):
+                    yield normalize_selection(years, grad_school, [work_type], [degree])
+
+
+def test_report_matches_original(outcomes, tmp_path, monkeypatch):
+    # The charts are rendered as in the app (see engine.render_selection); here only the numbers and rows count
+    monkeypatch.setattr(batch, 'render_selection', lambda *args, **kwargs: (b'', []))
+    df, report = outcomes
+    df = df.head(60)
+    dataset = Dataset(df, 'test', report)
+    selections = list(enumerate_selections(dataset))
+    assert selections == list(_sidebar_selections(df))
+
+    rows = generate_report(dataset, tmp_path, workers=1, log=lambda message: None)
+    assert len(rows) == len(selections)
+    for selection in selections:
+        folder = tmp_path / selection_slug(selection)
+        summary = json.loads((folder / 'summary.json').read_text())
+        result = baseline.filter_outcomes(df, **selection)
+        total_in_years = baseline.total_in_years(df, selection['years'])
+
+        assert summary['total_filtered'] == len(result)
+        assert summary['total_in_years'] == total_in_years
+        assert summary['percentage_in_years'] == round(len(result) / total_in_years * 100, 2)
+        assert summary['percentage_of_total'] == round(len(result) / len(df) * 100, 2)
+        assert summary['degree_counts'] == baseline.degree_counts(result, selection['degrees']).to_dict()
+        written = pd.read_csv(folder / 'outcomes.csv', dtype={'900#': str})
+        assert list(written['900#']) == list(result['900#'])
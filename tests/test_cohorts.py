@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from outcomes.cohorts import COMPARE_BY, GPA_COLUMNS, CohortStats
+from outcomes.engine import filter_outcomes
+from outcomes.schema import DEGREE
+
+SELECTIONS = [
+    dict(years=['All Years'], grad_school='All Students', work_type=['All'], degrees=['All Degrees']),
+    dict(years=['2019', '2020', '2021'], grad_school='Yes', work_type=['Masters Professional', 'Ph.D.'], degrees=['All Degrees']),
+    dict(years=['2022', '2023', '2024'], grad_school='All Students', work_type=['All'], degrees=['M.P.H.', 'Ph.D.']),
+    dict(years=['2015'], grad_school='No', work_type=None, degrees=None),
+]
+
+
+def _expected(rows, by, column):
+    # The cohort statistics computed the plain way, with pandas on the selected rows
+    labels = rows[by].astype('string').fillna('(blank)')
+    if by == DEGREE:
+        labels = labels.str.replace("No Degree", "Workforce")
+    grouped = rows[column].astype(np.float64).groupby(labels.to_numpy())
+    return pd.DataFrame({
+        'students': grouped.size(),
+        'with_gpa': grouped.count(),
+        'mean': grouped.mean(),
+        'std': grouped.std(),
+        'min': grouped.min(),
+        'q1': grouped.quantile(0.25),
+        'median': grouped.median(),
+        'q3': grouped.quantile(0.75),
+        'max': grouped.max(),
+    })
+
+
+@pytest.mark.parametrize('column', GPA_COLUMNS)
+@pytest.mark.parametrize('by', list(COMPARE_BY.values()))
+@pytest.mark.parametrize('selection', SELECTIONS)
+def test_cohort_stats_match_pandas(dataset, selection, by, column):
+    result = CohortStats(dataset.frame).compare(**selection, by=by, column=column)
+    stats, histogram = result['stats'], result['histogram']
+    expected = _expected(filter_outcomes(dataset, **selection), by, column)
+
+    assert sorted(stats.index) == sorted(expected.index)
+    stats = stats.loc[expected.index]
+    pd.testing.assert_frame_equal(stats[expected.columns], expected, check_dtype=False, check_names=False, check_index_type=False)
+    # Every student with a GPA falls in one histogram bin
+    np.testing.assert_array_equal(histogram.loc[expected.index].sum(axis=1), expected['with_gpa'])
+    # The bootstrap intervals hold their estimate
+    with_gpa = stats['with_gpa'] > 0
+    assert (stats.loc[with_gpa, 'mean_ci_low'] <= stats.loc[with_gpa, 'mean'] + 1e-9).all()
+    assert (stats.loc[with_gpa, 'mean'] <= stats.loc[with_gpa, 'mean_ci_high'] + 1e-9).all()
+
+
+@pytest.mark.parametrize('selection', [
+    dict(years=['1999'], grad_school='All Students', work_type=['All'], degrees=['All Degrees']),
+    dict(years=['All Years'], grad_school='Yes', work_type=['Masters Biomedical'], degrees=['M.D.']),
+])
+def test_cohort_stats_of_selection_without_gpas(dataset, selection):
+    result = CohortStats(dataset.frame).compare(**selection)
+    stats = result['stats']
+    assert not stats['with_gpa'].any()
+    assert stats[['mean', 'mean_ci_low', 'mean_ci_high', 'median_ci_low', 'median_ci_high']].isna().all().all()
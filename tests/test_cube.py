@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from outcomes.cache import filter_signature
+from outcomes.charts import gpa_series
+from outcomes.dataset import Dataset
+from outcomes.engine import filter_outcomes, normalize_selection, summarize
+from outcomes.schema import DEGREE
+from tests import baseline
+
+
+def test_no_degree_chosen_hides_the_pie(dataset):
+    # The original pie chart counted only the chosen degrees, so an emptied degree multiselect counted none
+    selection = dict(years=['All Years'], grad_school='Yes', work_type=['All'], degrees=[])
+    summary = summarize(dataset, **selection)
+    assert summary['degree_counts'].empty and not summary['show_pie']
+    # The rows themselves are not restricted by an empty degree list
+    assert summary['total_filtered'] == len(filter_outcomes(dataset, **selection)) > 0
+    assert normalize_selection(**selection)['degrees'] == []
+    assert filter_signature('k', **selection) != filter_signature('k', **{**selection, 'degrees': None})
+
+
+def test_no_degree_filter_counts_every_degree(dataset):
+    selection = dict(years=['All Years'], grad_school='No', work_type=None, degrees=None)
+    counts = summarize(dataset, **selection)['degree_counts']
+    expected = filter_outcomes(dataset, **selection)[DEGREE].value_counts()
+    assert counts.to_dict() == expected[expected > 0].to_dict()
+
+
+@pytest.mark.parametrize('selection', [
+    dict(years=['All Years'], grad_school='All Students', work_type=['All'], degrees=['All Degrees']),
+    dict(years=['2019', '2020', '2021'], grad_school='All Students', work_type=['Ph.D.', 'Masters Professional'], degrees=['All Degrees']),
+    dict(years=['2022'], grad_school='All Students', work_type=['All'], degrees=['M.P.H.', 'No Degree']),
+    dict(years=['2015'], grad_school='Yes', work_type=['All'], degrees=['All Degrees']),
+    dict(years=['2022', '2015'], grad_school='Yes', work_type=['All'], degrees=['M.S.', 'Ph.D.']),
+    dict(years=['2013', '2014', '2015'], grad_school='No', work_type=None, degrees=None),
+    dict(years=['1999'], grad_school='All Students', work_type=['All'], degrees=['All Degrees']),
+    # The 2011 D.D.S. has no GPA on record: a year without an average
+    dict(years=['2008', '2011'], grad_school='Yes', work_type=['All'], degrees=['D.D.S.']),
+])
+def test_summary_matches_original(outcomes_frame, selection):
+    result = baseline.filter_outcomes(outcomes_frame, **selection)
+    summary = summarize(Dataset(outcomes_frame, 'test'), **selection)
+    assert summary['total_filtered'] == len(result)
+    assert summary['total_in_years'] == baseline.total_in_years(outcomes_frame, selection['years'])
+
+    # Same students per degree, largest first
+    expected_counts = baseline.degree_counts(result, selection['degrees'])
+    assert summary['degree_counts'].to_dict() == expected_counts.to_dict()
+    assert list(summary['degree_counts']) == sorted(expected_counts, reverse=True)
+
+    # Same average GPA per year (per degree for one year), averaged over the workbook's float64 GPAs
+    if not result.empty:
+        avg_gpa, _ = gpa_series(summary['aggregates'], selection['years'])
+        expected = baseline.average_gpa(result, selection['years']).rename(index={'No Degree': 'Workforce'})
+        assert list(avg_gpa.index) == list(expected.index)
+        np.testing.assert_allclose(avg_gpa.to_numpy(), expected.to_numpy(dtype=np.float64), rtol=0, atol=1e-12)
@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.generate import generate_outcomes, write_workbook
+from outcomes.cache import ByteLRUCache, filter_signature
+from outcomes.cube import CUBE_KEYS
+from outcomes.dataset import Dataset
+from outcomes.delta import apply_delta
+from outcomes.engine import filter_outcomes
+from outcomes.ingest import ingest_workbooks
+from outcomes.options import OPTION_KEYS
+from outcomes.precompute import common_selections
+
+
+def _updated_outcomes(tmp_path):
+    # The fixture workbook, edited like a new export of it: moved and rerouted students, some dropped, some added
+    raw = generate_outcomes(400, seed=1)
+    raw.loc[0:9, 'YEAR'] = 2024
+    grads = np.flatnonzero(raw['GRADUATE SCHOOL?'] == 'Yes')[:5]
+    raw.loc[grads, 'DECIDED TO WORK/TYPE OF GRADUATE SCHOOL'] = 'Ph.D.'
+    raw.loc[40:44, 'CUMMULATIVE GPA'] = 3.99
+    raw = raw.drop(index=range(20, 30))
+    added = generate_outcomes(15, seed=2)
+    added['900#'] = [f"91{i:07d}" for i in range(len(added))]
+    path = write_workbook(pd.concat([raw, added], ignore_index=True), tmp_path / 'updated.xlsx')
+    df, report = ingest_workbooks([(path.name, path.read_bytes())])
+    return df, report
+
+
+def _rows(dataset, selection):
+    # A selection's rows as a value that does not depend on their positions
+    return filter_outcomes(dataset, **selection).sort_values('900#').reset_index(drop=True)
+
+
+def _selections(dataset):
+    selections = common_selections(dataset)
+    for year in dataset.options.years:
+        selections.append({'years': [year], 'grad_school': 'No', 'work_type': None, 'degrees': None})
+    return selections
+
+
+@pytest.fixture
+def delta(outcomes, tmp_path):
+    df, report = outcomes
+    previous = Dataset(df, 'previous', report)
+    previous.filter_index
+    previous.options
+    previous.cube
+    cache = ByteLRUCache(1 << 30)
+    selections = _selections(previous)
+    for selection in selections:
+        cache.put(filter_signature(previous.key, **selection), _rows(previous, selection), 1)
+
+    frame, report = _updated_outcomes(tmp_path)
+    dataset, changes = apply_delta(previous, frame, 'updated', report, caches=[cache])
+    return dataset, changes, Dataset(frame, 'rebuilt', report), cache, selections
+
+
+def test_delta_reports_the_edits(delta):
+    _, changes, _, _, _ = delta
+    assert changes['incremental']
+    assert changes['added'] == 15 and changes['removed'] == 10
+    assert changes['changed'] > 0
+    assert {'YEAR', 'DECIDED TO WORK/TYPE OF GRADUATE SCHOOL', 'CUMMULATIVE GPA'} <= changes['columns'].keys()
+
+
+def test_delta_bitmaps_match_rebuild(delta):
+    dataset, _, rebuilt, _, _ = delta
+    assert 'filter_index' in dataset.__dict__
+    assert dataset.filter_index.bitmaps.keys() == rebuilt.filter_index.bitmaps.keys()
+    for col, bitmaps in rebuilt.filter_index.bitmaps.items():
+        assert dataset.filter_index.bitmaps[col].keys() == bitmaps.keys(), col
+        for value, bitmap in bitmaps.items():
+            np.testing.assert_array_equal(dataset.filter_index.bitmaps[col][value], bitmap, err_msg=f"{col} = {value}")
+
+
+def test_delta_options_match_rebuild(delta):
+    dataset, _, rebuilt, _, _ = delta
+    assert 'options' in dataset.__dict__
+
+    def table(options):
+        return options.table.sort_values(OPTION_KEYS).reset_index(drop=True)
+
+    pd.testing.assert_frame_equal(table(dataset.options), table(rebuilt.options), check_dtype=False, check_categorical=False)
+    assert dataset.options.years == rebuilt.options.years
+
+
+def test_delta_cube_matches_rebuild(delta):
+    dataset, _, rebuilt, _, _ = delta
+    assert 'cube' in dataset.__dict__
+
+    def cells(cube):
+        return cube.cells.sort_values(CUBE_KEYS).reset_index(drop=True)
+
+    pd.testing.assert_frame_equal(cells(dataset.cube), cells(rebuilt.cube), check_dtype=False, check_categorical=False)
+
+
+def test_delta_carries_only_unchanged_selections(delta):
+    dataset, changes, rebuilt, cache, selections = delta
+    carried = [selection for selection in selections if filter_signature(dataset.key, **selection) in cache]
+    assert changes['reused_cache_entries'] == len(carried)
+    assert 0 < len(carried) < len(selections)
+    for selection in carried:
+        pd.testing.assert_frame_equal(cache.get(filter_signature(dataset.key, **selection)), _rows(rebuilt, selection))
@@ -0,0 +1,69 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+from outcomes.charts import gpa_series
+from outcomes.compact import FLOAT32_COLUMNS
+from outcomes.dataset import Dataset
+from outcomes.engine import compare_cohorts, summarize
+from outcomes.export import export_bytes
+from outcomes.schema import GPA, YEAR
+
+
+@pytest.mark.parametrize('fmt', ['csv', 'parquet', 'xlsx'])
+def test_export_restores_gpa_values_and_dtype(dataset, outcomes, fmt):
+    # GPAs are stored as float32, but downloads must hold the workbook's float64 values
+    df, _ = outcomes
+    data = export_bytes(dataset.filter(years=['All Years'], grad_school='All Students'), fmt)
+    if fmt == 'csv':
+        exported = pd.read_csv(io.BytesIO(data), dtype={'YEAR': str, '900#': str})
+    elif fmt == 'parquet':
+        schema = pq.read_schema(io.BytesIO(data))
+        for col in FLOAT32_COLUMNS:
+            assert str(schema.field(col).type) == 'double'
+        exported = pd.read_parquet(io.BytesIO(data))
+    else:
+        exported = pd.read_excel(io.BytesIO(data), dtype={'YEAR': str, '900#': str})
+
+    source = df.set_index('900#')
+    exported = exported.set_index('900#').loc[source.index]
+    for col in FLOAT32_COLUMNS:
+        assert exported[col].dtype == np.float64
+        np.testing.assert_array_equal(exported[col].to_numpy(), source[col].to_numpy(dtype=np.float64))
+
+
+def test_take_widens_float32_columns(dataset, outcomes):
+    df, _ = outcomes
+    taken = dataset.take(np.arange(len(dataset)))
+    for col in FLOAT32_COLUMNS:
+        assert dataset.frame[col].dtype == np.float32
+        assert taken[col].dtype == np.float64
+        np.testing.assert_array_equal(taken[col].to_numpy(), df[col].to_numpy(dtype=np.float64))
+
+
+def _labels(avg_gpa):
+    return {year: f"{gpa:.2f}" for year, gpa in avg_gpa.items()}
+
+
+@pytest.mark.parametrize('half_way', [False, True])
+def test_gpa_averages_match_workbook_values(outcomes, half_way):
+    # Averages are taken over the workbook's float64 GPAs, not their float32 storage, so the .2f bar labels are
+    # the original ones: 2.00 and 2.13 average to 2.065, labelled 2.06 in float64 but 2.07 from float32
+    df, report = outcomes
+    if half_way:
+        df = df.head(2).assign(**{YEAR: '2019', GPA: [2.0, 2.13]})
+    dataset = Dataset(df, 'test', report)
+    selection = dict(years=['All Years'], grad_school='All Students', work_type=['All'], degrees=['All Degrees'])
+    expected = df.groupby(YEAR, observed=True)[GPA].mean().dropna()
+
+    avg_gpa, _ = gpa_series(summarize(dataset, **selection)['aggregates'], selection['years'])
+    assert _labels(avg_gpa) == _labels(expected)
+    if half_way:
+        assert _labels(avg_gpa) == {'2019': '2.06'}
+    np.testing.assert_allclose(avg_gpa.loc[expected.index].to_numpy(), expected.to_numpy(), rtol=0, atol=1e-12)
+
+    stats = compare_cohorts(dataset, **selection)['stats']
+    np.testing.assert_allclose(stats.loc[expected.index, 'mean'].to_numpy(), expected.to_numpy(), rtol=0, atol=1e-12)
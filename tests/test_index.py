@@ -0,0 +1,32 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from outcomes.dataset import Dataset
+from outcomes.engine import filter_outcomes
+from outcomes.index import FilterIndex
+from tests import baseline
+
+SELECTIONS = [
+    dict(years=['All Years'], grad_school='All Students', work_type=['All'], degrees=['All Degrees']),
+    dict(years=['2019', '2020', '2021'], grad_school='All Students', work_type=['Ph.D.', 'Masters Professional'], degrees=['All Degrees']),
+    dict(years=['All Years'], grad_school='All Students', work_type=['All'], degrees=['M.P.H.', 'No Degree']),
+    dict(years=['2022', '2015'], grad_school='Yes', work_type=['All'], degrees=['M.S.', 'Ph.D.']),
+    dict(years=['2022'], grad_school='Yes', work_type=['Doctorate Professional'], degrees=['All Degrees']),
+    dict(years=['2013', '2014', '2015'], grad_school='No', work_type=None, degrees=None),
+    dict(years=['1999'], grad_school='All Students', work_type=['All'], degrees=['All Degrees']),
+    dict(years=[], grad_school='All Students', work_type=[], degrees=[]),
+]
+
+
+@pytest.mark.parametrize('selection', SELECTIONS)
+def test_select_matches_filter_outcomes(outcomes_frame, selection):
+    # Same rows in the same order as the original filter: with "All Students", the matching grad students, then
+    # the non-grad students; rows with a blank filter value match no value (and neither Yes nor No)
+    expected = baseline.filter_outcomes(outcomes_frame, **selection)
+    np.testing.assert_array_equal(FilterIndex(outcomes_frame).select(**selection), expected.index.to_numpy())
+
+    filtered = filter_outcomes(Dataset(outcomes_frame, 'test'), **selection)
+    assert list(filtered.index) == list(expected.index)
+    # Same values too, once the compacted columns are cast back to the workbook's types
+    pd.testing.assert_frame_equal(filtered.astype(expected.dtypes.to_dict()), expected, check_index_type=False)
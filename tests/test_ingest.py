@@ -0,0 +1,49 @@
+import io
+
+import openpyxl
+import pandas as pd
+
+from benchmarks.generate import generate_outcomes, write_workbook
+from outcomes import ingest
+from outcomes.ingest import load_workbooks, snapshot_path, stream_workbook
+from outcomes.schema import DTYPES, NA_VALUES, SHEET_NAME
+
+
+def read_excel(data):
+    # The dashboard's original ingest (see benchmarks/run.py)
+    return pd.read_excel(io.BytesIO(data), sheet_name=SHEET_NAME, index_col=None, usecols='A:S', dtype=DTYPES, na_values=NA_VALUES)
+
+
+def test_stream_matches_read_excel(workbook):
+    _, data = workbook
+    streamed, errors = stream_workbook(data, chunk_rows=64)
+    assert errors == []
+    pd.testing.assert_frame_equal(streamed, read_excel(data))
+
+
+def test_stream_skips_blank_rows(tmp_path):
+    path = write_workbook(generate_outcomes(50, seed=3), tmp_path / 'blank_rows.xlsx')
+    book = openpyxl.load_workbook(path)
+    book[SHEET_NAME].insert_rows(10, amount=2)
+    book[SHEET_NAME].append([None] * 19)
+    book.save(path)
+    data = path.read_bytes()
+
+    streamed, errors = stream_workbook(data)
+    assert errors == [] and len(streamed) == 50
+    # The only difference from read_excel: it keeps the blank rows within the sheet
+    expected = read_excel(data).dropna(how='all').reset_index(drop=True)
+    pd.testing.assert_frame_equal(streamed, expected)
+
+
+def test_snapshot_version_bump_parses_again(workbook, tmp_path, monkeypatch):
+    df, key, _ = load_workbooks([workbook], snapshot_dir=tmp_path)
+    written = snapshot_path(key, tmp_path)
+    assert written.exists()
+
+    parsed = []
+    monkeypatch.setattr(ingest, 'SNAPSHOT_VERSION', ingest.SNAPSHOT_VERSION + 1)
+    monkeypatch.setattr(ingest, 'ingest_workbooks', lambda *args, **kwargs: parsed.append(args) or (df, {}))
+    _, bumped_key, _ = load_workbooks([workbook], snapshot_dir=tmp_path)
+    assert bumped_key == key and len(parsed) == 1
+    assert snapshot_path(key, tmp_path) != written and snapshot_path(key, tmp_path).exists()
@@ -0,0 +1,37 @@
+import pytest
+
+from outcomes.options import OptionTable
+from outcomes.schema import DEGREE, ROUTE, YEAR
+from tests import baseline
+
+YEARS = [['All Years'], ['2022'], ['2019', '2020', '2021'], ['1999'], []]
+WORK_TYPES = [['All'], ['Ph.D.'], ['Masters Professional', 'Work'], []]
+
+
+def _counts(rows, col):
+    counts = rows[col].value_counts()
+    return {value: int(count) for value, count in counts.items() if count > 0}
+
+
+@pytest.mark.parametrize('grad_school', ['All Students', 'Yes'])
+@pytest.mark.parametrize('years', YEARS)
+def test_work_type_options_match_original(outcomes_frame, years, grad_school):
+    work_types, counts = OptionTable(outcomes_frame).work_type_options(years, grad_school)
+    assert work_types == baseline.work_type_options(outcomes_frame, years, grad_school)
+    assert counts == _counts(baseline.in_years(outcomes_frame, years), ROUTE)
+
+
+@pytest.mark.parametrize('grad_school', ['All Students', 'Yes'])
+@pytest.mark.parametrize('work_type', WORK_TYPES)
+@pytest.mark.parametrize('years', YEARS)
+def test_degree_options_match_original(outcomes_frame, years, work_type, grad_school):
+    degrees, counts = OptionTable(outcomes_frame).degree_options(years, work_type, grad_school)
+    assert degrees == baseline.degree_options(outcomes_frame, years, work_type, grad_school)
+    rows = baseline.in_years(outcomes_frame, years)
+    if work_type and 'All' not in work_type:
+        rows = rows[rows[ROUTE].isin(work_type)]
+    assert counts == _counts(rows, DEGREE)
+
+
+def test_years_are_the_sorted_years_on_record(outcomes_frame):
+    assert OptionTable(outcomes_frame).years == sorted(outcomes_frame[YEAR].dropna().unique())
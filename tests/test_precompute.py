@@ -0,0 +1,32 @@
+import time
+
+import numpy as np
+
+from outcomes.cache import ByteLRUCache, filter_signature
+from outcomes.dataset import Dataset
+from outcomes.engine import selection_specs
+from outcomes.precompute import Precomputer, common_selections
+from tests import baseline
+
+
+def test_precomputed_results_match_original(outcomes_frame):
+    dataset = Dataset(outcomes_frame, 'test')
+    result_cache, chart_cache = ByteLRUCache(64 * 1024 * 1024), ByteLRUCache(64 * 1024 * 1024)
+    job = Precomputer(2, result_cache, chart_cache).start(dataset)
+    deadline = time.monotonic() + 60
+    while not job.finished and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert job.finished and job.failed == 0
+
+    for selection in common_selections(dataset):
+        signature = filter_signature(dataset.key, **selection)
+        rows, summary = result_cache.get(signature)
+        result = baseline.filter_outcomes(outcomes_frame, **selection)
+        np.testing.assert_array_equal(rows, result.index.to_numpy())
+        assert summary['total_filtered'] == len(result)
+        assert summary['total_in_years'] == baseline.total_in_years(outcomes_frame, selection['years'])
+        assert summary['degree_counts'].to_dict() == baseline.degree_counts(result, selection['degrees']).to_dict()
+
+        # Browser mode prepares the specs the dashboard would build, and no PNG
+        assert chart_cache.get((signature, 'vega')) == selection_specs(dataset, **selection)
+        assert signature not in chart_cache
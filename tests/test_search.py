@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from outcomes.dataset import Dataset
+from outcomes.engine import search_rows, select_rows
+from outcomes.search import (EXACT_SCORE, FUZZY_SCORE, PREFIX_SCORE, SEARCH_COLUMNS, edit_distance, max_edits,
+                             tokenize)
+
+SELECTION = dict(years=['All Years'], grad_school='All Students', work_type=['All'], degrees=['All Degrees'])
+
+
+def _scan(df, rows, query):
+    # The search done the slow way: every query word against every word of each row, best match per word
+    def word_score(term, word):
+        if word == term:
+            return EXACT_SCORE
+        if word.startswith(term):
+            return PREFIX_SCORE
+        distance = edit_distance(term, word, max_edits(term))
+        return FUZZY_SCORE - 0.25 * (distance - 1) if 0 < distance <= max_edits(term) else 0.0
+
+    terms = list(dict.fromkeys(tokenize(query)))
+    scored = []
+    for row in rows:
+        words = {word for col in SEARCH_COLUMNS if df[col].notna().iloc[row] for word in tokenize(df[col].iloc[row])}
+        scores = [max((word_score(term, word) for word in words), default=0.0) for term in terms]
+        if all(scores):
+            scored.append((row, sum(scores)))
+    # Best matches first, ties in the order of rows
+    return [row for row, _ in sorted(scored, key=lambda item: -item[1])]
+
+
+@pytest.mark.parametrize('query', [
+    'thompson',           # exact
+    'thom',               # prefix
+    'tompson',            # one edit
+    'Jonhs Hopkins',      # transposition, then a second word
+    'emory medicine',     # broad: matches more than a sixteenth of the rows
+    'EMORY   Universty',  # case, spacing and a typo
+    'zzzz',               # nothing
+])
+def test_search_matches_scan(outcomes, query):
+    df, report = outcomes
+    dataset = Dataset(df, 'test', report)
+    rows = select_rows(dataset, **SELECTION)
+    np.testing.assert_array_equal(search_rows(dataset, rows, query), _scan(df, rows, query))
+
+
+def test_empty_query_keeps_every_row(dataset):
+    rows = select_rows(dataset, **SELECTION)
+    np.testing.assert_array_equal(search_rows(dataset, rows, ' ,. '), rows)
@@ -0,0 +1,28 @@
+from outcomes.dataset import Dataset
+from outcomes.store import DatasetStore
+
+
+def test_store_charges_structures_built_after_put(dataset):
+    store = DatasetStore(max_bytes=1 << 40)
+    lease = store.lease()
+    store.put('test', dataset, dataset.nbytes, lease=lease)
+    loaded = store.total_bytes
+
+    dataset.search_index
+    dataset.cohorts
+    dataset.sort_index.permutation('LAST NAME')
+    assert store.total_bytes == dataset.nbytes > loaded
+
+
+def test_store_evicts_unheld_dataset_once_another_grows_past_budget(outcomes):
+    df, report = outcomes
+    kept, evicted = Dataset(df, 'kept', report), Dataset(df, 'evicted', report)
+    store = DatasetStore(max_bytes=kept.nbytes + evicted.nbytes)
+    lease = store.lease()
+    store.put('evicted', evicted, evicted.nbytes)
+    store.put('kept', kept, kept.nbytes, lease=lease)
+    assert 'evicted' in store
+
+    kept.filter_index
+    assert 'evicted' not in store
+    assert 'kept' in store and store.total_bytes == kept.nbytes
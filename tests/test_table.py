@@ -0,0 +1,28 @@
+import warnings
+
+import pandas as pd
+import pytest
+
+from outcomes.engine import filter_outcomes, select_rows
+from outcomes.table import page_count, page_frame
+
+SELECTION = dict(years=['2019', '2020', '2021', '2022'], grad_school='All Students', work_type=['All'], degrees=['All Degrees'])
+
+
+@pytest.mark.parametrize('ascending', [True, False])
+@pytest.mark.parametrize('sort_by', ['LAST NAME', 'YEAR', 'CUMMULATIVE GPA', '900#', 'WHAT GRADUATE SCHOOL?'])
+def test_pages_match_sorted_filtered_rows(dataset, sort_by, ascending):
+    # The original table: the filtered rows sorted by the clicked column (stable, missing values last), then sliced
+    expected = filter_outcomes(dataset, **SELECTION).sort_values(sort_by, ascending=ascending, kind='stable', na_position='last')
+    rows = select_rows(dataset, **SELECTION)
+    page_size = 25
+    with warnings.catch_warnings():
+        warnings.simplefilter('error', FutureWarning)
+        pages = [page_frame(dataset, rows, page, page_size, sort_by, ascending) for page in range(1, page_count(len(rows), page_size) + 1)]
+    pd.testing.assert_frame_equal(pd.concat(pages), expected)
+
+
+def test_page_count():
+    assert page_count(0, 25) == 1
+    assert page_count(25, 25) == 1
+    assert page_count(26, 25) == 2
@@ -0,0 +1,49 @@
+import json
+import math
+
+import pytest
+
+from outcomes.dataset import Dataset
+from outcomes.engine import selection_specs
+from tests import baseline
+
+
+def _workforce(series):
+    return series.rename(index={'No Degree': 'Workforce'})
+
+
+@pytest.mark.parametrize('selection', [
+    dict(years=['All Years'], grad_school='All Students', work_type=['All'], degrees=['All Degrees']),
+    dict(years=['2019', '2020', '2021'], grad_school='Yes', work_type=['Ph.D.', 'Masters Professional'], degrees=['All Degrees']),
+    dict(years=['2022'], grad_school='All Students', work_type=['All'], degrees=['M.P.H.', 'No Degree']),
+    dict(years=['2008', '2011'], grad_school='Yes', work_type=['All'], degrees=['D.D.S.']),
+    dict(years=['2013', '2014', '2015'], grad_school='No', work_type=None, degrees=None),
+    dict(years=['1999'], grad_school='All Students', work_type=['All'], degrees=['All Degrees']),
+])
+def test_specs_hold_original_numbers(outcomes_frame, selection):
+    specs, _ = selection_specs(Dataset(outcomes_frame, 'test'), **selection)
+    # Plain JSON: a missing average is null, not NaN
+    json.dumps(specs, allow_nan=False)
+    pies = [spec for spec in specs if spec['layer'][0]['mark']['type'] == 'arc']
+    bars = [spec for spec in specs if spec['layer'][0]['mark']['type'] == 'bar']
+
+    result = baseline.filter_outcomes(outcomes_frame, **selection)
+    degree_counts = _workforce(baseline.degree_counts(result, selection['degrees']))
+    if selection['grad_school'] != 'No' and len(degree_counts) > 1:
+        [pie] = pies
+        values = pie['data']['values']
+        assert {value['degree']: value['students'] for value in values} == degree_counts.to_dict()
+        assert [value['students'] for value in values] == sorted(degree_counts, reverse=True)
+        assert math.isclose(sum(value['share'] for value in values), 1.0)
+    else:
+        assert not pies
+
+    avg_gpa = _workforce(baseline.average_gpa(result, selection['years'])) if not result.empty else []
+    if len(avg_gpa):
+        [bar] = bars
+        by = bar['encoding']['x']['field']
+        assert [value[by] for value in bar['data']['values']] == [str(label) for label in avg_gpa.index]
+        for value, gpa in zip(bar['data']['values'], avg_gpa):
+            assert value['gpa'] is None if math.isnan(gpa) else math.isclose(value['gpa'], gpa, rel_tol=0, abs_tol=1e-12)
+    else:
+        assert not bars